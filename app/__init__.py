@@ -1,4 +1,5 @@
 import os
+import json
 import logging
 import time
 from flask import Flask
@@ -32,6 +33,19 @@ def create_app(config_mode=None):
     # 기본 설정
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
     app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'dev-secret-key-1234')
+    # 글 목록/상세 조회를 워커 메모리의 카탈로그 스냅샷으로 처리할지 여부
+    app.config['TEXT_CATALOG_CACHE'] = os.getenv('TEXT_CATALOG_CACHE', 'true').lower() == 'true'
+    # 엔드포인트별 Cache-Control 값 (예: {"text.get_all_texts": "public, max-age=30"})
+    app.config['CACHE_CONTROL'] = json.loads(os.getenv('CACHE_CONTROL', '{}'))
+    # 결과 저장 write-behind 모드 (true면 큐에 넣고 202 응답, flusher가 묶어서 저장)
+    app.config['RESULT_WRITE_BEHIND'] = os.getenv('RESULT_WRITE_BEHIND', 'false').lower() == 'true'
+    app.config['RESULT_QUEUE_MAX'] = int(os.getenv('RESULT_QUEUE_MAX', '10000'))
+    app.config['RESULT_FLUSH_INTERVAL_MS'] = int(os.getenv('RESULT_FLUSH_INTERVAL_MS', '20'))
+    app.config['RESULT_FLUSH_BATCH'] = int(os.getenv('RESULT_FLUSH_BATCH', '500'))
+    # CPM 백분위 히스토그램 증분을 DB에 반영하는 주기 (초, 0 이하면 종료 시에만)
+    app.config['HISTOGRAM_FLUSH_INTERVAL'] = float(os.getenv('HISTOGRAM_FLUSH_INTERVAL', '5'))
+    # Idempotency-Key로 저장한 응답의 보관 시간 (초)
+    app.config['IDEMPOTENCY_TTL'] = int(os.getenv('IDEMPOTENCY_TTL', '86400'))
 
     # 환경별 DB 설정
     if ENV == 'testing':
@@ -97,6 +111,13 @@ def create_app(config_mode=None):
     app.register_blueprint(text_blueprint, url_prefix='/text')
     app.register_blueprint(user_blueprint, url_prefix='/user')
     app.register_blueprint(report_blueprint, url_prefix='/admin')
+
+    # 관리 명령 (flask archive-periods / flask ranking-formula)
+    from .periods import archive_periods_command
+    from .scoring import ranking_formula_command
+    app.cli.add_command(archive_periods_command)
+    app.cli.add_command(ranking_formula_command)
+
     # 4. 사용자 로더
     @login_manager.user_loader
     def load_user(user_id):
@@ -128,6 +149,8 @@ def create_app(config_mode=None):
         try:
             from app.redis_client import init_redis
             if init_redis():
+                from app.routes.text.catalog import sync_catalog_version
+                sync_catalog_version()
                 app.logger.info("✅ Redis 캐시 연결 성공")
             elif os.getenv("REDIS_URL"):
                 app.logger.warning("⚠️ Redis 연결 실패 - 캐시 없이 동작")
@@ -136,6 +159,14 @@ def create_app(config_mode=None):
         except Exception as e:
             app.logger.warning(f"ℹ️ Redis 초기화 생략: {e}")
 
+        # 랭킹 리더보드 적재 (Redis 정렬 집합, 미설정 시 워커 메모리)
+        try:
+            from app.leaderboard import rebuild_leaderboard
+            app.logger.info(f"🏆 랭킹 리더보드 적재 완료 ({rebuild_leaderboard()}명)")
+        except Exception as e:
+            db.session.rollback()
+            app.logger.warning(f"⚠️ 랭킹 리더보드 적재 실패 - 첫 조회 시 다시 적재합니다: {e}")
+
         app.logger.info("="*50)
 
     return app
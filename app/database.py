@@ -1,3 +1,5 @@
+import math
+
 from sqlalchemy import MetaData, event
 from sqlalchemy.engine import Engine
 from flask_sqlalchemy import SQLAlchemy
@@ -21,4 +23,9 @@ def set_sqlite_pragma(dbapi_connection, connection_record):
         cursor = dbapi_connection.cursor()
         cursor.execute("PRAGMA foreign_keys=ON")
         cursor.close()
+        # 결과 저장 UPDATE의 점수/폼 감쇠 계산에 쓰는 MySQL 내장 수학 함수 (수학 함수 없이 빌드된 SQLite 대비)
+        for name, fn in (('exp', math.exp), ('ln', math.log), ('floor', math.floor)):
+            dbapi_connection.create_function(
+                name, 1, lambda value, fn=fn: None if value is None else fn(value), deterministic=True
+            )
     # MySQL(pymysql)인 경우에는 아무 작업도 하지 않고 넘어갑니다.
\ No newline at end of file
@@ -0,0 +1,253 @@
+"""
+CPM 분포 히스토그램 ("상위 X%" 백분위 조회용)
+
+- 고정 구간 히스토그램: CPM_BIN_WIDTH 단위로 CPM_BIN_COUNT칸 (마지막 칸은 그 이상 전부).
+  글별로 최대 CPM_BIN_COUNT행, 전체 결과(text_id=GLOBAL_HISTOGRAM)도 같은 크기입니다.
+- 결과 저장/삭제가 커밋되면 워커 메모리의 증분 버퍼에 (글, 구간)별로 더하기만 하고 (O(1)),
+  flusher 스레드가 HISTOGRAM_FLUSH_INTERVAL초마다 UPDATE count = count + 증분 으로 DB에 반영합니다.
+  구간별 개수의 합이므로 여러 워커의 증분을 순서와 상관없이 그대로 합칠 수 있습니다.
+- 조회는 워커별로 누적합 배열을 HISTOGRAM_CACHE_TTL초 동안 캐시하므로 백분위 계산은 O(1)입니다.
+- 버퍼는 워커 메모리에 있으므로 비정상 종료 시 마지막 flush 이후 증분은 유실될 수 있습니다. (표시용 근사치)
+"""
+import atexit
+import os
+import threading
+from itertools import accumulate
+
+from flask import current_app, has_app_context
+from sqlalchemy import event, update, insert, delete
+from sqlalchemy.exc import IntegrityError
+
+from app.database import db
+from app.models import TypingResult, TypingText, CpmHistogramBin, GLOBAL_HISTOGRAM
+from app.redis_client import LocalCache
+
+CPM_BIN_WIDTH = 10
+CPM_BIN_COUNT = 200
+HISTOGRAM_CACHE_MAX = int(os.getenv('HISTOGRAM_CACHE_MAX', '1024'))
+HISTOGRAM_CACHE_TTL = float(os.getenv('HISTOGRAM_CACHE_TTL', '30'))
+
+_PENDING_KEY = 'histogram_changes'
+
+
+def cpm_bin(cpm):
+    """CPM이 속한 구간 번호 (0 ~ CPM_BIN_COUNT-1)"""
+    return min(max(int(cpm), 0) // CPM_BIN_WIDTH, CPM_BIN_COUNT - 1)
+
+
+class Histogram:
+    """구간별 개수와 누적합 (백분위 O(1) 조회)"""
+
+    def __init__(self, counts):
+        self.counts = counts
+        self.below = [0] + list(accumulate(counts))  # below[b] = b번 구간보다 아래 결과 수
+        self.total = self.below[-1]
+
+    def percentile(self, cpm):
+        """cpm보다 낮은 결과의 비율 (%, 구간 안에서는 균등 분포로 보간). 결과가 없으면 None."""
+        if self.total <= 0:
+            return None
+        b = cpm_bin(cpm)
+        if b == CPM_BIN_COUNT - 1:
+            fraction = 0.5  # 마지막 칸은 폭이 정해져 있지 않음
+        else:
+            fraction = (max(cpm, 0) - b * CPM_BIN_WIDTH) / CPM_BIN_WIDTH
+        beaten = self.below[b] + self.counts[b] * fraction
+        return round(min(max(beaten / self.total * 100, 0.0), 100.0), 1)
+
+
+class HistogramBuffer:
+    """커밋된 결과의 (글, 구간)별 증분을 모아 두는 워커 메모리 버퍼"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._deltas = {}
+
+    def add(self, text_id, cpm, delta):
+        b = cpm_bin(cpm)
+        with self._lock:
+            for key in ((text_id, b), (GLOBAL_HISTOGRAM, b)):
+                self._deltas[key] = self._deltas.get(key, 0) + delta
+
+    def drain(self):
+        with self._lock:
+            deltas, self._deltas = self._deltas, {}
+        return deltas
+
+    def restore(self, deltas):
+        """flush에 실패한 증분을 다음 flush로 되돌려 놓습니다."""
+        with self._lock:
+            for key, delta in deltas.items():
+                self._deltas[key] = self._deltas.get(key, 0) + delta
+
+    def __len__(self):
+        return len(self._deltas)
+
+
+_buffer = HistogramBuffer()
+_cache = LocalCache(HISTOGRAM_CACHE_MAX, HISTOGRAM_CACHE_TTL)
+
+_flusher = None
+_flusher_lock = threading.Lock()
+
+
+def _add_bin(text_id, b, delta):
+    conditional_update = update(CpmHistogramBin).where(
+        CpmHistogramBin.text_id == text_id,
+        CpmHistogramBin.bin == b
+    ).values(count=CpmHistogramBin.count + delta).execution_options(synchronize_session=False)
+
+    if db.session.execute(conditional_update).rowcount:
+        return
+    try:
+        with db.session.begin_nested():
+            db.session.execute(insert(CpmHistogramBin).values(text_id=text_id, bin=b, count=delta))
+    except IntegrityError:
+        db.session.execute(conditional_update)
+
+
+def flush_histograms():
+    """
+    버퍼의 증분을 DB에 반영합니다. (구간당 UPDATE 1번, commit 포함)
+    그 사이 삭제된 글의 증분은 버리고 남은 히스토그램 행도 정리합니다.
+
+    Returns:
+        int: 반영한 (글, 구간) 수
+    """
+    deltas = _buffer.drain()
+    if not deltas:
+        return 0
+    try:
+        text_ids = {text_id for text_id, _ in deltas if text_id != GLOBAL_HISTOGRAM}
+        existing = {tid for (tid,) in db.session.query(TypingText.id).filter(TypingText.id.in_(text_ids))} \
+            if text_ids else set()
+
+        applied = 0
+        # (글, 구간) 순서로 갱신하여 여러 워커의 flush끼리 행 잠금 순서가 엇갈리지 않도록 함
+        for (text_id, b), delta in sorted(deltas.items()):
+            if delta == 0 or (text_id != GLOBAL_HISTOGRAM and text_id not in existing):
+                continue
+            _add_bin(text_id, b, delta)
+            applied += 1
+
+        removed = text_ids - existing
+        if removed:
+            db.session.execute(
+                delete(CpmHistogramBin).where(CpmHistogramBin.text_id.in_(removed))
+                .execution_options(synchronize_session=False)
+            )
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        _buffer.restore(deltas)
+        raise
+    return applied
+
+
+class HistogramFlusher:
+    """HISTOGRAM_FLUSH_INTERVAL초마다 버퍼를 DB에 반영하는 백그라운드 스레드"""
+
+    def __init__(self, app, interval):
+        self.app = app
+        self.interval = interval
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='histogram-flusher', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            self.flush()
+
+    def flush(self):
+        with self.app.app_context():
+            try:
+                return flush_histograms()
+            except Exception as e:
+                self.app.logger.error(f"❌ [CPM 히스토그램] flush 중 에러: {str(e)}")
+                return 0
+            finally:
+                db.session.remove()
+
+    def stop(self):
+        self._stopped.set()
+        return self.flush()
+
+
+def _ensure_flusher():
+    """워커당 하나의 flusher를 시작합니다. (HISTOGRAM_FLUSH_INTERVAL이 0 이하면 수동 flush만)"""
+    global _flusher
+    if _flusher is not None or not has_app_context():
+        return
+    interval = current_app.config.get('HISTOGRAM_FLUSH_INTERVAL', 5)
+    if interval <= 0:
+        return
+    with _flusher_lock:
+        if _flusher is None:
+            _flusher = HistogramFlusher(current_app._get_current_object(), interval)
+            atexit.register(_flusher.stop)
+
+
+def _load_histogram(text_id):
+    counts = [0] * CPM_BIN_COUNT
+    for b, count in db.session.query(CpmHistogramBin.bin, CpmHistogramBin.count)\
+            .filter(CpmHistogramBin.text_id == text_id).all():
+        if 0 <= b < CPM_BIN_COUNT:
+            counts[b] = max(int(count), 0)
+    return Histogram(counts)
+
+
+def get_histogram(text_id=GLOBAL_HISTOGRAM):
+    """글(기본: 전체)의 히스토그램 (워커 메모리에 HISTOGRAM_CACHE_TTL초 캐시)"""
+    histogram = _cache.get(text_id)
+    if not isinstance(histogram, Histogram):
+        histogram = _load_histogram(text_id)
+        _cache.set(text_id, histogram)
+    return histogram
+
+
+def clear_histogram_cache():
+    _cache.clear()
+
+
+def get_cpm_percentile(cpm, text_id=None):
+    """
+    cpm이 전체 / 글별 결과 중 몇 %보다 높은지 반환합니다.
+
+    Returns:
+        dict: {"global": {"percentile", "total"}, "text": {"percentile", "total"} 또는 None}
+    """
+    overall = get_histogram(GLOBAL_HISTOGRAM)
+    data = {"global": {"percentile": overall.percentile(cpm), "total": overall.total}, "text": None}
+    if text_id is not None:
+        per_text = get_histogram(text_id)
+        data["text"] = {"percentile": per_text.percentile(cpm), "total": per_text.total}
+    return data
+
+
+@event.listens_for(db.session, 'after_flush')
+def _collect_changes(session, flush_context):
+    """flush되는 결과 저장/삭제를 모아 둡니다."""
+    for obj in session.new:
+        if isinstance(obj, TypingResult):
+            session.info.setdefault(_PENDING_KEY, []).append((obj.text_id, obj.cpm, 1))
+    for obj in session.deleted:
+        if isinstance(obj, TypingResult):
+            session.info.setdefault(_PENDING_KEY, []).append((obj.text_id, obj.cpm, -1))
+
+
+@event.listens_for(db.session, 'after_commit')
+def _record_committed_changes(session):
+    changes = session.info.pop(_PENDING_KEY, None)
+    if not changes:
+        return
+    for text_id, cpm, delta in changes:
+        _buffer.add(text_id, cpm, delta)
+    _ensure_flusher()
+
+
+@event.listens_for(db.session, 'after_soft_rollback')
+def _discard_changes(session, previous_transaction):
+    # 세이브포인트 / 실패한 flush의 하위 트랜잭션 롤백은 무시 (leaderboard와 같은 이유)
+    if previous_transaction.parent is not None:
+        return
+    session.info.pop(_PENDING_KEY, None)
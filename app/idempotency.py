@@ -0,0 +1,275 @@
+"""
+Idempotency-Key 헤더 처리 모듈.
+
+같은 Idempotency-Key로 다시 들어온 요청은 핸들러를 다시 실행하지 않고 최초의 성공 응답(2xx)을 그대로 돌려줍니다.
+(모바일 클라이언트 재시도 시 결과 중복 저장 / play_count 중복 증가 방지)
+
+- 선점: REDIS_URL이 설정되어 있으면 Redis(SET NX + EX), 없거나 Redis 오류 시 DB(idempotency_keys 테이블)
+- 완료 응답은 항상 DB에 남깁니다. 결과를 저장하는 핸들러는 record_response()로 결과와 같은 트랜잭션에 응답을 기록하고,
+  Redis로 선점해도 DB 항목을 먼저 확인하므로 요청마다 선점 저장소가 달라져도 같은 키로 두 번 저장되지 않습니다.
+  (둘이 동시에 실행되더라도 기본 키 중복으로 늦게 커밋하는 쪽의 트랜잭션이 롤백됨)
+- 항목: 요청 본문 지문 + 상태 코드 + 응답 본문(압축 JSON), IDEMPOTENCY_TTL초 후 자동 만료
+- 같은 키로 본문이 다른 요청이 오면 422, 최초 요청이 아직 처리 중이면 409를 반환합니다.
+- 실패 응답(4xx/5xx)은 저장하지 않으므로 같은 키로 다시 시도할 수 있습니다.
+"""
+import hashlib
+import json
+import random
+from datetime import datetime, timedelta
+from functools import wraps
+
+from flask import request, current_app, g
+from sqlalchemy import delete
+from sqlalchemy.exc import IntegrityError
+
+from app.database import db
+from app.models import IdempotencyKey, KST
+from app.redis_client import get_redis, cache_add, raw_get, raw_set, cache_delete
+from app.utils import api_response
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+REPLAYED_HEADER = 'Idempotent-Replayed'
+MAX_KEY_LENGTH = 100
+# 최초 요청 처리 중 상태의 유효 시간 (처리 도중 프로세스가 죽어도 이 시간 뒤에는 재시도 가능)
+PENDING_TTL = 60
+# DB 저장소에서 만료된 항목을 정리하는 확률 (요청 100번에 1번 꼴)
+PURGE_PROBABILITY = 0.01
+
+
+def _fingerprint():
+    """요청 본문 지문 (JSON이면 키 순서와 공백을 무시)"""
+    body = request.get_json(silent=True)
+    if body is not None:
+        raw = json.dumps(body, sort_keys=True, separators=(',', ':'), ensure_ascii=False).encode()
+    else:
+        raw = request.get_data()
+    return hashlib.blake2b(raw, digest_size=16).hexdigest()
+
+
+def _encode(fingerprint, status_code=None, body=None):
+    return json.dumps({"f": fingerprint, "s": status_code, "b": body}, separators=(',', ':'), ensure_ascii=False)
+
+
+def _decode(value):
+    data = json.loads(value)
+    return {"fingerprint": data["f"], "status_code": data["s"], "body": data["b"]}
+
+
+def _minify(body):
+    """응답 본문 JSON의 공백을 제거해 저장 크기를 줄입니다."""
+    try:
+        return json.dumps(json.loads(body), separators=(',', ':'), ensure_ascii=False)
+    except ValueError:
+        return body
+
+
+def _purge_expired(key, now):
+    """만료된 같은 키 항목을 지웁니다. (가끔은 다른 키의 만료 항목도 함께 정리, commit은 호출하는 쪽에서)"""
+    expired = IdempotencyKey.expires_at <= now
+    db.session.execute(
+        delete(IdempotencyKey).where(expired if random.random() < PURGE_PROBABILITY
+                                     else (IdempotencyKey.key == key) & expired)
+    )
+
+
+class RedisIdempotencyStore:
+    """Redis 저장소: SET NX로 선점하고, 완료 응답은 DB에 기록한 뒤 빠른 재응답용으로 TTL과 함께 덮어씁니다."""
+
+    def reserve(self, key, fingerprint):
+        """
+        키를 선점합니다.
+
+        Returns:
+            tuple: (선점 성공 여부, 기존 항목 dict 또는 None) / Redis 오류 시 None
+        """
+        added = cache_add(key, _encode(fingerprint), PENDING_TTL)
+        if added is None:
+            return None
+        if added:
+            return True, None
+        value = raw_get(key)
+        if value is False:
+            return None
+        return False, _decode(value) if value else None
+
+    def stage(self, key, fingerprint, status_code, body, ttl):
+        """
+        완료 응답을 현재 DB 트랜잭션에 추가합니다. (Redis는 결과와 같은 트랜잭션에 쓸 수 없으므로)
+        같은 키로 DB에 선점/완료된 요청이 있으면 커밋 시 기본 키 중복으로 결과와 함께 롤백됩니다.
+        """
+        now = datetime.now(KST)
+        _purge_expired(key, now)
+        db.session.add(IdempotencyKey(key=key, fingerprint=fingerprint, status_code=status_code,
+                                      response=body, expires_at=now + timedelta(seconds=ttl)))
+
+    def complete(self, key, fingerprint, status_code, body, ttl):
+        """커밋된 응답을 Redis에도 저장합니다. (실패해도 DB 항목으로 재응답)"""
+        raw_set(key, _encode(fingerprint, status_code, body), ttl)
+
+    def release(self, key):
+        cache_delete(key)
+
+
+class DatabaseIdempotencyStore:
+    """DB 저장소: 기본 키 중복으로 선점하고, expires_at이 지난 항목은 없는 것으로 취급합니다."""
+
+    def reserve(self, key, fingerprint):
+        now = datetime.now(KST)
+        try:
+            _purge_expired(key, now)
+            db.session.add(IdempotencyKey(
+                key=key, fingerprint=fingerprint, expires_at=now + timedelta(seconds=PENDING_TTL)
+            ))
+            db.session.commit()
+            return True, None
+        except IntegrityError:
+            db.session.rollback()
+        return False, self.lookup(key)
+
+    @staticmethod
+    def lookup(key):
+        """만료되지 않은 DB 항목 (없으면 None)"""
+        row = IdempotencyKey.query.filter(IdempotencyKey.key == key,
+                                          IdempotencyKey.expires_at > datetime.now(KST)).first()
+        if not row:
+            return None
+        return {"fingerprint": row.fingerprint, "status_code": row.status_code, "body": row.response}
+
+    def stage(self, key, fingerprint, status_code, body, ttl):
+        """선점한 항목에 완료 응답을 현재 트랜잭션으로 기록합니다. (commit은 결과를 저장하는 쪽에서)"""
+        IdempotencyKey.query.filter_by(key=key).update({
+            "status_code": status_code,
+            "response": body,
+            "expires_at": datetime.now(KST) + timedelta(seconds=ttl)
+        }, synchronize_session=False)
+
+    def complete(self, key, fingerprint, status_code, body, ttl):
+        """stage()가 결과와 함께 커밋되었으므로 할 일이 없습니다."""
+
+    def release(self, key):
+        db.session.rollback()
+        IdempotencyKey.query.filter_by(key=key).delete()
+        db.session.commit()
+
+
+def _reserve(key, fingerprint):
+    """
+    Redis를 우선 사용하고, 없거나 오류가 나면 DB 저장소를 사용합니다.
+    Redis로 선점했거나 Redis 항목이 아직 처리 중이어도 DB 항목(완료 응답 또는 Redis 장애 중 DB로 선점한 요청)이
+    있으면 그 항목을 따릅니다.
+    """
+    if get_redis():
+        store = RedisIdempotencyStore()
+        reserved = store.reserve(key, fingerprint)
+        if reserved is not None:
+            claimed, entry = reserved
+            if claimed or entry is None or entry["status_code"] is None:
+                durable = DatabaseIdempotencyStore.lookup(key)
+                if durable is not None:
+                    if claimed:
+                        store.release(key)
+                    return store, (False, durable)
+            return store, reserved
+    store = DatabaseIdempotencyStore()
+    return store, store.reserve(key, fingerprint)
+
+
+def record_response(response):
+    """
+    Idempotency-Key 요청이면 응답을 결과와 같은 트랜잭션에 기록합니다. (결과를 저장하는 핸들러가 commit 직전에 호출)
+    키가 없는 요청이면 아무것도 하지 않습니다.
+
+    Returns:
+        전달받은 응답 (그대로 반환하면 됨)
+    """
+    claim = g.get('idempotency_claim')
+    if claim is None:
+        return response
+    rendered = current_app.make_response(response)
+    if 200 <= rendered.status_code < 300:
+        body = _minify(rendered.get_data(as_text=True))
+        claim['store'].stage(claim['key'], claim['fingerprint'], rendered.status_code, body, _ttl())
+        claim['staged'] = True
+    return response
+
+
+def _ttl():
+    return current_app.config.get('IDEMPOTENCY_TTL', 86400)
+
+
+def _replay(entry):
+    """저장된 최초 응답을 그대로 돌려줍니다."""
+    response = current_app.response_class(entry["body"], status=entry["status_code"], mimetype='application/json')
+    response.headers[REPLAYED_HEADER] = 'true'
+    return response
+
+
+def idempotent(view):
+    """
+    Idempotency-Key 헤더가 있으면 최초 성공 응답을 저장하고, 같은 키의 재요청에는 저장된 응답을 반환합니다.
+    헤더가 없으면 그대로 핸들러를 실행합니다.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        raw_key = request.headers.get(IDEMPOTENCY_HEADER)
+        if not raw_key:
+            return view(*args, **kwargs)
+
+        if len(raw_key) > MAX_KEY_LENGTH:
+            return api_response(success=False, error_code=400,
+                                message=f"{IDEMPOTENCY_HEADER}는 {MAX_KEY_LENGTH}자 이하여야 합니다.", status_code=400)
+
+        key = f"idem:{request.endpoint}:{raw_key}"
+        fingerprint = _fingerprint()
+        store, (reserved, entry) = _reserve(key, fingerprint)
+
+        if not reserved:
+            if entry is None:
+                # 조회 직전에 만료된 경우 한 번 더 선점 시도
+                store, (reserved, entry) = _reserve(key, fingerprint)
+
+        if not reserved and entry is None:
+            # 다시 시도해도 선점하지 못했으면 키 없이 실행하지 않고 재시도를 요청합니다.
+            return api_response(success=False, error_code=409,
+                                message="같은 Idempotency-Key의 요청을 처리 중입니다. 잠시 후 다시 시도해주세요.",
+                                status_code=409)
+
+        if not reserved:
+            if entry["fingerprint"] != fingerprint:
+                return api_response(success=False, error_code=422,
+                                    message="같은 Idempotency-Key로 다른 요청 본문이 전송되었습니다.", status_code=422)
+            if entry["status_code"] is None:
+                return api_response(success=False, error_code=409,
+                                    message="같은 Idempotency-Key의 요청을 처리 중입니다. 잠시 후 다시 시도해주세요.",
+                                    status_code=409)
+            current_app.logger.info(f"🔁 [멱등 요청] {key} 저장된 응답({entry['status_code']})을 반환합니다.")
+            return _replay(entry)
+
+        claim = g.idempotency_claim = {"store": store, "key": key, "fingerprint": fingerprint, "staged": False}
+        try:
+            response = current_app.make_response(view(*args, **kwargs))
+        except Exception:
+            store.release(key)
+            raise
+        finally:
+            g.pop('idempotency_claim', None)
+
+        if not 200 <= response.status_code < 300:
+            store.release(key)
+            return response
+
+        ttl = _ttl()
+        body = _minify(response.get_data(as_text=True))
+        if not claim["staged"]:
+            # 결과를 직접 커밋하지 않은 성공 응답(write-behind 접수 등)은 여기서 기록
+            try:
+                store.stage(key, fingerprint, response.status_code, body, ttl)
+                db.session.commit()
+            except IntegrityError:
+                db.session.rollback()
+                current_app.logger.warning(f"⚠️ [멱등 요청] {key} 응답 기록 충돌 (같은 키의 다른 요청이 먼저 기록)")
+                return response
+        store.complete(key, fingerprint, response.status_code, body, ttl)
+        return response
+
+    return wrapper
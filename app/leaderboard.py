@@ -0,0 +1,436 @@
+"""
+유저 랭킹 리더보드 (ranking_score 내림차순 정렬 집합)
+
+- REDIS_URL 설정 시: Redis Sorted Set(leaderboard:ranking:v2)에 user_id → ranking_score를 보관 (명령당 O(log n))
+  동점은 두 방식 모두 user_id 오름차순
+- 미설정 또는 Redis 장애 시: 워커 메모리의 정렬 컨테이너(LocalLeaderboard) 사용
+  (다른 워커의 변경은 보이지 않으므로 LEADERBOARD_LOCAL_TTL초마다 DB에서 다시 적재)
+
+User.ranking_score가 바뀐 트랜잭션이 커밋되면 바뀐 유저만 반영합니다.
+(after_flush에서 신규/변경/삭제 유저를 모아 두었다가 after_commit에 적용, 최상위 트랜잭션 롤백 시 버림)
+앱 시작 시 DB에서 전체를 다시 적재합니다.
+"""
+import threading
+import time
+from bisect import bisect_left, insort
+
+from sqlalchemy import event
+from sqlalchemy.orm import attributes
+
+from app.database import db
+from app.models import User
+from app.redis_client import get_redis, report_redis_error
+
+# v2: 멤버를 _member()로 인코딩 (이전 형식의 멤버와 섞이지 않도록 키를 바꿈)
+LEADERBOARD_KEY = 'leaderboard:ranking:v2'
+# 멤버 인코딩용 (user_id는 이 값보다 작아야 함)
+MEMBER_ID_SPAN = 10 ** 12
+# Redis 없이 동작할 때 워커 메모리 리더보드를 DB에서 다시 적재하는 주기 (초)
+LEADERBOARD_LOCAL_TTL = 30
+# 재적재 시 ZADD 한 번에 넣는 유저 수
+REBUILD_CHUNK = 1000
+
+_PENDING_KEY = 'leaderboard_changes'
+
+
+class OrderStatisticList:
+    """
+    정렬된 키 목록 (버킷 리스트 + 버킷 크기 Fenwick 트리)
+    - 추가/삭제: 버킷 찾기 O(log n) + 버킷 내부 이동 O(load)
+    - 키의 순위 조회, 순위로 키 접근: O(log n)
+    """
+
+    def __init__(self, keys=(), load=256):
+        self.load = load
+        self._build(sorted(keys))
+
+    def _build(self, keys):
+        self._buckets = [keys[i:i + self.load] for i in range(0, len(keys), self.load)]
+        self._maxes = [bucket[-1] for bucket in self._buckets]
+        self._len = len(keys)
+        self._rebuild_index()
+
+    def _rebuild_index(self):
+        """버킷 크기 Fenwick 트리를 O(버킷 수)로 다시 만듭니다."""
+        size = len(self._buckets)
+        tree = [0] * (size + 1)
+        for i, bucket in enumerate(self._buckets, 1):
+            tree[i] += len(bucket)
+            parent = i + (i & -i)
+            if parent <= size:
+                tree[parent] += tree[i]
+        self._tree = tree
+
+    def _index_add(self, bucket_index, delta):
+        i = bucket_index + 1
+        while i < len(self._tree):
+            self._tree[i] += delta
+            i += i & -i
+
+    def _prefix(self, bucket_index):
+        """bucket_index 이전 버킷들의 원소 수 합"""
+        total = 0
+        i = bucket_index
+        while i > 0:
+            total += self._tree[i]
+            i -= i & -i
+        return total
+
+    def _locate(self, position):
+        """전체 순위 position이 들어있는 (버킷 번호, 버킷 내 위치)"""
+        bucket_index = 0
+        remaining = position
+        step = 1 << (len(self._tree) - 1).bit_length()
+        while step:
+            nxt = bucket_index + step
+            if nxt < len(self._tree) and self._tree[nxt] <= remaining:
+                bucket_index = nxt
+                remaining -= self._tree[nxt]
+            step >>= 1
+        return bucket_index, remaining
+
+    def __len__(self):
+        return self._len
+
+    def add(self, key):
+        if not self._buckets:
+            self._build([key])
+            return
+        i = bisect_left(self._maxes, key)
+        if i == len(self._maxes):
+            i -= 1
+        bucket = self._buckets[i]
+        insort(bucket, key)
+        self._maxes[i] = bucket[-1]
+        self._len += 1
+        if len(bucket) > self.load * 2:
+            # 버킷이 너무 커지면 반으로 나누고 인덱스를 다시 만듦
+            half = len(bucket) // 2
+            self._buckets[i:i + 1] = [bucket[:half], bucket[half:]]
+            self._maxes[i:i + 1] = [bucket[half - 1], bucket[-1]]
+            self._rebuild_index()
+        else:
+            self._index_add(i, 1)
+
+    def remove(self, key):
+        """키를 삭제합니다. 없으면 False."""
+        i = bisect_left(self._maxes, key)
+        if i == len(self._maxes):
+            return False
+        bucket = self._buckets[i]
+        j = bisect_left(bucket, key)
+        if j == len(bucket) or bucket[j] != key:
+            return False
+        del bucket[j]
+        self._len -= 1
+        if bucket:
+            self._maxes[i] = bucket[-1]
+            self._index_add(i, -1)
+        else:
+            del self._buckets[i]
+            del self._maxes[i]
+            self._rebuild_index()
+        return True
+
+    def index(self, key):
+        """키의 0부터 시작하는 순위. 없으면 None."""
+        i = bisect_left(self._maxes, key)
+        if i == len(self._maxes):
+            return None
+        bucket = self._buckets[i]
+        j = bisect_left(bucket, key)
+        if j == len(bucket) or bucket[j] != key:
+            return None
+        return self._prefix(i) + j
+
+    def slice(self, start, stop):
+        """순위 [start, stop) 구간의 키 목록"""
+        start, stop = max(0, start), min(self._len, stop)
+        if start >= stop:
+            return []
+        i, j = self._locate(start)
+        keys = []
+        while len(keys) < stop - start:
+            bucket = self._buckets[i]
+            keys.extend(bucket[j:j + (stop - start - len(keys))])
+            i, j = i + 1, 0
+        return keys
+
+
+class LocalLeaderboard:
+    """워커 메모리 리더보드 ((-점수, user_id) 키로 정렬: 점수 내림차순, 동점이면 id 오름차순)"""
+
+    def __init__(self):
+        self._scores = {}
+        self._list = OrderStatisticList()
+        self._lock = threading.RLock()
+        self.loaded_at = None
+
+    def load(self, rows):
+        with self._lock:
+            self._scores = {user_id: score for user_id, score in rows}
+            self._list = OrderStatisticList((-score, user_id) for user_id, score in self._scores.items())
+            self.loaded_at = time.monotonic()
+
+    def is_stale(self):
+        return self.loaded_at is None or time.monotonic() - self.loaded_at > LEADERBOARD_LOCAL_TTL
+
+    def apply(self, changes):
+        with self._lock:
+            for user_id, score in changes.items():
+                old = self._scores.pop(user_id, None)
+                if old is not None:
+                    self._list.remove((-old, user_id))
+                if score is not None:
+                    self._scores[user_id] = score
+                    self._list.add((-score, user_id))
+
+    def count(self):
+        return len(self._list)
+
+    def page(self, offset, limit):
+        """[(user_id, score), ...] 순위 offset부터 limit명"""
+        with self._lock:
+            return [(user_id, -neg_score) for neg_score, user_id in self._list.slice(offset, offset + limit)]
+
+    def rank(self, user_id):
+        """(0부터 시작하는 순위, 점수) 또는 None"""
+        with self._lock:
+            score = self._scores.get(user_id)
+            if score is None:
+                return None
+            return self._list.index((-score, user_id)), score
+
+    def around(self, user_id, k):
+        """(유저 순위, 구간 시작 순위, [(user_id, score), ...]) 또는 None - 유저 위아래 k명씩"""
+        with self._lock:
+            found = self.rank(user_id)
+            if found is None:
+                return None
+            rank = found[0]
+            start = max(0, rank - k)
+            return rank, start, self.page(start, rank + k + 1 - start)
+
+
+def _member(user_id):
+    """
+    정렬 집합 멤버 문자열. ZREVRANGE는 동점을 멤버의 사전순 역순으로 놓으므로,
+    (MEMBER_ID_SPAN - user_id)를 고정 길이로 채워 두면 동점은 user_id 오름차순이 됩니다.
+    (LocalLeaderboard / scoring._ranks와 같은 순서)
+    """
+    return f"{MEMBER_ID_SPAN - int(user_id):012d}"
+
+
+def _user_id(member):
+    return MEMBER_ID_SPAN - int(member)
+
+
+class RedisLeaderboard:
+    """Redis Sorted Set 리더보드 (명령 실패 시 예외를 그대로 올려 호출하는 쪽에서 대체 경로 사용)"""
+
+    def __init__(self, client):
+        self.r = client
+
+    def load(self, rows):
+        # 임시 키에 채운 뒤 RENAME으로 한 번에 교체 (재적재 중에도 기존 순위 조회 가능)
+        tmp_key = f"{LEADERBOARD_KEY}:rebuild"
+        pipe = self.r.pipeline(transaction=True)
+        pipe.delete(tmp_key)
+        for i in range(0, len(rows), REBUILD_CHUNK):
+            pipe.zadd(tmp_key, {_member(user_id): score for user_id, score in rows[i:i + REBUILD_CHUNK]})
+        if rows:
+            pipe.rename(tmp_key, LEADERBOARD_KEY)
+        else:
+            pipe.delete(LEADERBOARD_KEY)
+        pipe.execute()
+
+    def apply(self, changes):
+        pipe = self.r.pipeline(transaction=False)
+        for user_id, score in changes.items():
+            if score is None:
+                pipe.zrem(LEADERBOARD_KEY, _member(user_id))
+            else:
+                pipe.zadd(LEADERBOARD_KEY, {_member(user_id): score})
+        pipe.execute()
+
+    def count(self):
+        return self.r.zcard(LEADERBOARD_KEY)
+
+    def page(self, offset, limit):
+        if limit <= 0:
+            return []
+        rows = self.r.zrevrange(LEADERBOARD_KEY, offset, offset + limit - 1, withscores=True)
+        return [(_user_id(member), int(score)) for member, score in rows]
+
+    def rank(self, user_id):
+        pipe = self.r.pipeline(transaction=False)
+        pipe.zrevrank(LEADERBOARD_KEY, _member(user_id))
+        pipe.zscore(LEADERBOARD_KEY, _member(user_id))
+        rank, score = pipe.execute()
+        if rank is None:
+            return None
+        return rank, int(score)
+
+    def around(self, user_id, k):
+        rank = self.r.zrevrank(LEADERBOARD_KEY, _member(user_id))
+        if rank is None:
+            return None
+        start = max(0, rank - k)
+        return rank, start, self.page(start, rank + k + 1 - start)
+
+
+_local = LocalLeaderboard()
+# Redis 반영에 실패한 변경이 있으면 True (다음에 Redis를 쓸 수 있을 때 DB에서 재적재)
+_redis_stale = False
+
+
+def _load_rows():
+    return [(user_id, score) for user_id, score in
+            db.session.query(User.id, User.ranking_score).filter(User.ranking_score != None).all()]
+
+
+def rebuild_leaderboard():
+    """DB의 ranking_score로 리더보드를 다시 적재합니다. (Redis가 있으면 Redis, 없으면 워커 메모리)"""
+    global _redis_stale
+    rows = _load_rows()
+    r = get_redis()
+    if r:
+        try:
+            RedisLeaderboard(r).load(rows)
+            _redis_stale = False
+        except Exception as e:
+            report_redis_error(e)
+            _redis_stale = True
+    _local.load(rows)
+    return len(rows)
+
+
+def get_leaderboard():
+    """조회에 사용할 리더보드를 반환합니다. (Redis 우선, 없으면 필요 시 DB에서 재적재한 메모리 리더보드)"""
+    global _redis_stale
+    r = get_redis()
+    if r:
+        if not _redis_stale:
+            return RedisLeaderboard(r)
+        try:
+            RedisLeaderboard(r).load(_load_rows())
+            _redis_stale = False
+            return RedisLeaderboard(r)
+        except Exception as e:
+            report_redis_error(e)
+    if _local.is_stale():
+        _local.load(_load_rows())
+    return _local
+
+
+def _read(operation):
+    """리더보드 조회를 실행하고, Redis 오류 시 메모리 리더보드로 다시 실행합니다."""
+    board = get_leaderboard()
+    try:
+        return operation(board)
+    except Exception as e:
+        if board is _local:
+            raise
+        report_redis_error(e)
+        if _local.is_stale():
+            _local.load(_load_rows())
+        return operation(_local)
+
+
+def get_ranking_page(offset, limit):
+    """
+    순위 offset부터 limit명을 반환합니다.
+
+    Returns:
+        tuple: ([(user_id, ranking_score), ...], 전체 인원)
+    """
+    return _read(lambda board: (board.page(offset, limit), board.count()))
+
+
+def get_user_rank(user_id):
+    """
+    유저의 순위를 반환합니다.
+
+    Returns:
+        dict or None: {"rank": 1부터 시작하는 순위, "ranking_score", "total"} (리더보드에 없으면 None)
+    """
+    def operation(board):
+        found = board.rank(user_id)
+        if found is None:
+            return None
+        rank, score = found
+        return {"rank": rank + 1, "ranking_score": score, "total": board.count()}
+    return _read(operation)
+
+
+def get_ranking_around(user_id, k):
+    """
+    유저 위아래로 k명씩의 순위를 반환합니다. (순위 조회 O(log n) + 구간 조회 O(log n + k))
+
+    Returns:
+        dict or None: {"rank": 유저 순위(1부터), "first_rank": 구간 첫 순위, "players": [(user_id, score), ...], "total"}
+    """
+    def operation(board):
+        found = board.around(user_id, k)
+        if found is None:
+            return None
+        rank, start, players = found
+        return {"rank": rank + 1, "first_rank": start + 1, "players": players, "total": board.count()}
+    return _read(operation)
+
+
+def apply_leaderboard_changes(changes):
+    """{user_id: ranking_score 또는 None(삭제)}를 리더보드에 반영합니다."""
+    global _redis_stale
+    if not changes:
+        return
+    r = get_redis()
+    if r and not _redis_stale:
+        try:
+            RedisLeaderboard(r).apply(changes)
+        except Exception as e:
+            report_redis_error(e)
+            _redis_stale = True
+    # 메모리 리더보드는 이미 적재된 경우에만 반영 (미적재 상태면 다음 조회 시 DB에서 적재)
+    if _local.loaded_at is not None:
+        _local.apply(changes)
+
+
+def record_score_changes(session, scores):
+    """
+    Core UPDATE로 바꾼 ranking_score({user_id: 점수})를 모아 두었다가 커밋 시 리더보드에 반영합니다.
+    (ORM 변경 추적을 거치지 않고 DB에서 점수를 계산하는 결과 저장 경로용)
+    """
+    if scores:
+        session.info.setdefault(_PENDING_KEY, {}).update(scores)
+
+
+@event.listens_for(db.session, 'after_flush')
+def _collect_changes(session, flush_context):
+    """flush되는 유저 중 ranking_score가 바뀐 유저를 모아 둡니다."""
+    for obj in session.new:
+        if isinstance(obj, User):
+            changes = session.info.setdefault(_PENDING_KEY, {})
+            changes[obj.id] = obj.ranking_score
+    for obj in session.dirty:
+        if isinstance(obj, User) and attributes.get_history(obj, 'ranking_score').has_changes():
+            changes = session.info.setdefault(_PENDING_KEY, {})
+            changes[obj.id] = obj.ranking_score
+    for obj in session.deleted:
+        if isinstance(obj, User):
+            changes = session.info.setdefault(_PENDING_KEY, {})
+            changes[obj.id] = None
+
+
+@event.listens_for(db.session, 'after_commit')
+def _apply_committed_changes(session):
+    apply_leaderboard_changes(session.info.pop(_PENDING_KEY, None))
+
+
+@event.listens_for(db.session, 'after_soft_rollback')
+def _discard_changes(session, previous_transaction):
+    # 세이브포인트(begin_nested)나 실패한 flush의 하위 트랜잭션 롤백은
+    # 바깥 트랜잭션이 그대로 커밋될 수 있으므로 무시합니다.
+    if previous_transaction.parent is not None:
+        return
+    session.info.pop(_PENDING_KEY, None)
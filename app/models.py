@@ -1,11 +1,18 @@
 from flask_sqlalchemy import SQLAlchemy
 from app.database import db
 from flask_login import UserMixin
+import math
 from datetime import datetime, timedelta, timezone
 
 # 한국 시간대 정의
 KST = timezone(timedelta(hours=9))
 
+# 현재 폼(최근 실력) 지수이동평균: 한 판의 가중치와, 마지막 플레이 후 폼이 절반이 되는 기간
+FORM_ALPHA = 0.2
+FORM_HALF_LIFE_DAYS = 7
+FORM_DECAY_PER_SECOND = math.log(2) / (FORM_HALF_LIFE_DAYS * 86400)
+FORM_EPOCH = datetime(2026, 1, 1, tzinfo=KST)
+
 favorites = db.Table('favorites',
     db.Column('user_id', db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True),
     db.Column('text_id', db.Integer, db.ForeignKey('typing_texts.id', ondelete='CASCADE'), primary_key=True),
@@ -14,6 +21,12 @@ favorites = db.Table('favorites',
 
 class User(UserMixin, db.Model):
     __tablename__ = 'users'
+    __table_args__ = (
+        # /user/users?sort=ranking_score 키셋 페이지네이션용 복합 인덱스
+        db.Index('ix_users_ranking_score_id', 'ranking_score', 'id'),
+        # /user/ranking/form 키셋 페이지네이션용 복합 인덱스 (ORDER BY form_key DESC, id DESC)
+        db.Index('ix_users_form_key_id', 'form_key', 'id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False)
@@ -23,6 +36,8 @@ class User(UserMixin, db.Model):
     
     # 랭킹 시스템의 핵심: 계산된 종합 점수
     ranking_score = db.Column(db.Integer, default=0, nullable=False)
+    # ranking_score를 계산한 공식 버전 (공식을 바꾸면 이 값이 다른 행만 다시 계산)
+    formula_version = db.Column(db.Integer, default=1, server_default='1', nullable=False)
 
     # 기본 통계 필드
     play_count = db.Column(db.Integer, default=0, nullable=False) 
@@ -33,6 +48,18 @@ class User(UserMixin, db.Model):
     best_wpm = db.Column(db.Integer, default=0, nullable=False)  
     avg_wpm = db.Column(db.Float, default=0.0, nullable=False)   
 
+    # 평균 계산용 누적 합계 (평균 = 합계 / play_count, 결과 삭제 시 빼기만 하면 됨)
+    total_cpm = db.Column(db.BigInteger, default=0, nullable=False)
+    total_wpm = db.Column(db.BigInteger, default=0, nullable=False)
+    total_accuracy = db.Column(db.Float, default=0.0, nullable=False)
+
+    # 현재 폼: 최근 판에 가중치를 둔 CPM/정확도 지수이동평균 (판마다 O(1) 갱신)
+    form_cpm = db.Column(db.Float, default=0.0, nullable=False)
+    form_accuracy = db.Column(db.Float, default=0.0, nullable=False)
+    form_played_at = db.Column(db.DateTime, nullable=True)
+    # ln(폼 점수) + 감쇠율 * 마지막 플레이 시각: 어느 시점에서든 이 값의 순서 = 감쇠된 폼의 순서
+    form_key = db.Column(db.Float, default=0.0, nullable=False)
+
     # Relationships
     favorite_texts = db.relationship('TypingText', 
                                     secondary=favorites, 
@@ -45,24 +72,60 @@ class User(UserMixin, db.Model):
 
     # ✅ [핵심 추가] 실력 기반 점수 산출 로직
     def update_ranking_score(self):
-        """
-        가중치를 적용하여 유저의 실력 점수를 갱신합니다.
-        공식: (최고타수 * 0.5) + (평균정확도 * 5) + (평균타수 * 0.2) + (최고콤보 * 0.1) + 판수보너스
-        """
-        score = (
-            (self.best_cpm * 0.5) +          # 최고 퍼포먼스 비중 높음
-            (self.avg_accuracy * 5.0) +     # 정확도 1%당 5점 (변별력 강화)
-            (self.avg_cpm * 0.2) +          # 평소 실력 반영
-            (self.max_combo * 0.1)          # 집중력 가점
+        """가중치를 적용하여 유저의 실력 점수를 갱신합니다. (공식은 calculate_ranking_score 참고)"""
+        from app.scoring import get_active_formula
+        formula = get_active_formula()
+        self.ranking_score = formula.score(
+            self.best_cpm, self.avg_accuracy, self.avg_cpm, self.max_combo, self.play_count
         )
-        
-        # 성실도 가점: 10판당 1점 (최대 50점)
-        play_bonus = min((self.play_count // 10), 50)
-        
-        self.ranking_score = int(score + play_bonus)
+        self.formula_version = formula.version
+
+    def update_form_key(self):
+        """지수이동평균 갱신 후 폼 랭킹 정렬 키를 다시 계산합니다."""
+        self.form_key = calculate_form_key(self.form_cpm, self.form_accuracy, self.form_played_at)
+
+    def current_form(self, now=None):
+        """조회 시점까지 감쇠를 적용한 현재 폼 점수 (기록이 없으면 0)"""
+        if not self.play_count or self.form_played_at is None:
+            return 0.0
+        return decayed_form(self.form_key, now)
+
+def _form_seconds(moment):
+    """FORM_EPOCH 기준 경과 초 (tzinfo 없는 값은 KST로 간주)"""
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=KST)
+    return (moment - FORM_EPOCH).total_seconds()
+
+def calculate_form_key(form_cpm, form_accuracy, played_at):
+    """
+    폼 점수(form_cpm * 정확도)는 마지막 플레이 이후 반감기 FORM_HALF_LIFE_DAYS로 줄어듭니다.
+    ln(현재 폼) = ln(폼 점수) + 감쇠율 * 마지막 플레이 시각 - 감쇠율 * 지금 이므로,
+    앞의 두 항만 저장해 두면 시간이 지나도 다시 계산하지 않고 인덱스 순서로 랭킹을 매길 수 있습니다.
+    """
+    if played_at is None:
+        return 0.0
+    rating = form_cpm * form_accuracy / 100
+    return math.log(max(rating, 1.0)) + FORM_DECAY_PER_SECOND * _form_seconds(played_at)
+
+def decayed_form(form_key, now=None):
+    """정렬 키에서 now 시점의 감쇠된 폼 점수를 복원합니다."""
+    elapsed_key = form_key - FORM_DECAY_PER_SECOND * _form_seconds(now or datetime.now(KST))
+    return round(math.exp(min(elapsed_key, 700.0)), 2)
+
+def calculate_ranking_score(best_cpm, avg_accuracy, avg_cpm, max_combo, play_count):
+    """
+    현재 사용 중인 공식으로 실력 점수를 계산합니다. (전체 랭킹과 기간별 랭킹에서 함께 사용)
+    공식과 버전은 app.scoring.RANKING_FORMULAS 참고
+    """
+    from app.scoring import get_active_formula
+    return get_active_formula().score(best_cpm, avg_accuracy, avg_cpm, max_combo, play_count)
 
 class TypingText(db.Model):
     __tablename__ = 'typing_texts'
+    __table_args__ = (
+        # 장르별 목록의 id 키셋 페이지네이션용 복합 인덱스
+        db.Index('ix_typing_texts_genre_id', 'genre', 'id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     genre = db.Column(db.String(50), nullable=False)
@@ -83,6 +146,16 @@ class TypingText(db.Model):
 
 class TypingResult(db.Model):
     __tablename__ = 'typing_results'
+    __table_args__ = (
+        # 유저-글별 최고 기록(personal_bests) 재계산용 복합 인덱스
+        db.Index('ix_typing_results_user_text_cpm', 'user_id', 'text_id', 'cpm'),
+        # 결과 삭제 시 유저 최고 기록(best_cpm / best_wpm / max_combo) 재계산용 인덱스 (MAX가 인덱스 끝에서 바로 조회됨)
+        db.Index('ix_typing_results_user_cpm', 'user_id', 'cpm'),
+        db.Index('ix_typing_results_user_wpm', 'user_id', 'wpm'),
+        db.Index('ix_typing_results_user_combo', 'user_id', 'combo'),
+        # 유저 히스토리 (created_at, id) 최신순 키셋 페이지네이션용 인덱스
+        db.Index('ix_typing_results_user_created_id', 'user_id', 'created_at', 'id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=True)
@@ -93,10 +166,202 @@ class TypingResult(db.Model):
     accuracy = db.Column(db.Float, nullable=False)
     combo = db.Column(db.Integer, nullable=False)
     created_at = db.Column(db.DateTime, default=lambda: datetime.now(KST))
+    # write-behind로 접수된 결과의 접수 ID (202 응답의 provisional_id, 동기 저장이면 NULL)
+    receipt_id = db.Column(db.String(32), nullable=True, unique=True)
 
     def __repr__(self):
         return f'<Result ID:{self.id} User:{self.user_id} CPM:{self.cpm}>'
 
+class FailedResult(db.Model):
+    """
+    write-behind 저장에 실패한 결과의 접수 ID (GET /text/results/receipt/<receipt_id> 조회용)
+    한 건씩 다시 시도해도 저장되지 않은 결과만 남으므로 행 수는 적습니다.
+    """
+    __tablename__ = 'failed_results'
+
+    receipt_id = db.Column(db.String(32), primary_key=True)
+    user_id = db.Column(db.Integer, nullable=True)
+    text_id = db.Column(db.Integer, nullable=True)
+    error = db.Column(db.String(255), nullable=True)
+    created_at = db.Column(db.DateTime, default=lambda: datetime.now(KST))
+
+    def __repr__(self):
+        return f'<FailedResult {self.receipt_id} User:{self.user_id}>'
+
+class PersonalBest(db.Model):
+    """
+    유저별 글별 최고 기록 (TypingResult에서 cpm이 가장 높은 기록, 동점이면 먼저 세운 기록)
+    결과 저장 시 갱신되고, 최고 기록이 삭제되면 남은 기록으로 다시 채워집니다.
+    """
+    __tablename__ = 'personal_bests'
+    __table_args__ = (
+        # 글별 상위 기록(명예의 전당) 재구성용 복합 인덱스
+        db.Index('ix_personal_bests_text_cpm', 'text_id', 'cpm'),
+    )
+
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    text_id = db.Column(db.Integer, db.ForeignKey('typing_texts.id', ondelete='CASCADE'), primary_key=True)
+    result_id = db.Column(db.Integer, db.ForeignKey('typing_results.id', ondelete='CASCADE'), nullable=False)
+
+    cpm = db.Column(db.Integer, nullable=False)
+    wpm = db.Column(db.Integer, nullable=False)
+    accuracy = db.Column(db.Float, nullable=False)
+    combo = db.Column(db.Integer, nullable=False)
+    created_at = db.Column(db.DateTime)
+
+    def __repr__(self):
+        return f'<PersonalBest User:{self.user_id} Text:{self.text_id} CPM:{self.cpm}>'
+
+class HallOfFame(db.Model):
+    """
+    글별 명예의 전당 (personal_bests 중 cpm 상위 HALL_OF_FAME_SIZE명, 동점이면 먼저 세운 기록 우선)
+    유저당 한 줄이며, 결과 저장/삭제 시 함께 갱신됩니다.
+    """
+    __tablename__ = 'hall_of_fame'
+
+    text_id = db.Column(db.Integer, db.ForeignKey('typing_texts.id', ondelete='CASCADE'), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    result_id = db.Column(db.Integer, db.ForeignKey('typing_results.id', ondelete='CASCADE'), nullable=False)
+
+    cpm = db.Column(db.Integer, nullable=False)
+    wpm = db.Column(db.Integer, nullable=False)
+    accuracy = db.Column(db.Float, nullable=False)
+    combo = db.Column(db.Integer, nullable=False)
+    created_at = db.Column(db.DateTime)
+
+    def __repr__(self):
+        return f'<HallOfFame Text:{self.text_id} User:{self.user_id} CPM:{self.cpm}>'
+
+# genre_bests에서 전체 장르 기록을 나타내는 장르 값
+ALL_GENRES = '*'
+
+class GenreBest(db.Model):
+    """
+    장르별 유저 최고 기록 (장르/지표별 랭킹용, genre=ALL_GENRES는 전체 장르)
+    결과 저장 시 조건부 UPDATE로 갱신되고, 최고 기록이 삭제되면 해당 장르의 남은 기록으로 다시 채워집니다.
+    """
+    __tablename__ = 'genre_bests'
+    __table_args__ = (
+        # 장르별 지표 랭킹 조회용 복합 인덱스 (ORDER BY 지표 DESC, user_id DESC 키셋 조회가 인덱스 끝에서 바로 조회됨)
+        db.Index('ix_genre_bests_genre_cpm_user_id', 'genre', 'best_cpm', 'user_id'),
+        db.Index('ix_genre_bests_genre_wpm_user_id', 'genre', 'best_wpm', 'user_id'),
+        db.Index('ix_genre_bests_genre_accuracy_user_id', 'genre', 'best_accuracy', 'user_id'),
+        db.Index('ix_genre_bests_genre_combo_user_id', 'genre', 'max_combo', 'user_id'),
+    )
+
+    genre = db.Column(db.String(50), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+
+    best_cpm = db.Column(db.Integer, default=0, nullable=False)
+    best_wpm = db.Column(db.Integer, default=0, nullable=False)
+    best_accuracy = db.Column(db.Float, default=0.0, nullable=False)
+    max_combo = db.Column(db.Integer, default=0, nullable=False)
+    updated_at = db.Column(db.DateTime, default=lambda: datetime.now(KST))
+
+    def __repr__(self):
+        return f'<GenreBest {self.genre} User:{self.user_id} CPM:{self.best_cpm}>'
+
+# cpm_histogram_bins에서 전체 결과 히스토그램을 나타내는 text_id
+GLOBAL_HISTOGRAM = 0
+
+class CpmHistogramBin(db.Model):
+    """
+    CPM 분포 히스토그램의 한 구간 (글별 / text_id=GLOBAL_HISTOGRAM은 전체 결과)
+    삭제된 글의 행도 정리해야 하고 전체 히스토그램(0)도 담으므로 FK를 걸지 않습니다.
+    """
+    __tablename__ = 'cpm_histogram_bins'
+
+    text_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    bin = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    count = db.Column(db.BigInteger, default=0, nullable=False)
+
+    def __repr__(self):
+        return f'<CpmHistogramBin text:{self.text_id} bin:{self.bin} count:{self.count}>'
+
+class IdempotencyKey(db.Model):
+    """
+    Idempotency-Key 헤더로 받은 요청의 최초 응답 저장소 (Redis가 없을 때 사용)
+    status_code가 NULL이면 최초 요청을 처리 중인 상태입니다.
+    """
+    __tablename__ = 'idempotency_keys'
+
+    key = db.Column(db.String(200), primary_key=True)
+    fingerprint = db.Column(db.String(32), nullable=False)
+    status_code = db.Column(db.Integer, nullable=True)
+    response = db.Column(db.Text, nullable=True)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+    def __repr__(self):
+        return f'<IdempotencyKey {self.key} status:{self.status_code}>'
+
+class PeriodStat(db.Model):
+    """
+    기간별(일간/주간/시즌) 랭킹용 유저 누적값
+    결과 저장/삭제 시 증분으로 갱신하고, 기간이 끝나면 PeriodSnapshot으로 보관한 뒤 삭제합니다.
+    """
+    __tablename__ = 'period_stats'
+    __table_args__ = (
+        db.Index('ix_period_stats_period_score', 'period_type', 'period_key', 'score'),
+    )
+
+    period_type = db.Column(db.String(10), primary_key=True)  # 'day' | 'week' | 'season'
+    period_key = db.Column(db.String(10), primary_key=True)   # '2026-10-17' | '2026-W42' | '2026-Q4'
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+
+    play_count = db.Column(db.Integer, default=0, nullable=False)
+    total_cpm = db.Column(db.BigInteger, default=0, nullable=False)
+    total_wpm = db.Column(db.BigInteger, default=0, nullable=False)
+    total_accuracy = db.Column(db.Float, default=0.0, nullable=False)
+    best_cpm = db.Column(db.Integer, default=0, nullable=False)
+    best_wpm = db.Column(db.Integer, default=0, nullable=False)
+    max_combo = db.Column(db.Integer, default=0, nullable=False)
+    score = db.Column(db.Integer, default=0, nullable=False)
+    formula_version = db.Column(db.Integer, default=1, server_default='1', nullable=False)
+    updated_at = db.Column(db.DateTime, default=lambda: datetime.now(KST))
+
+    def __repr__(self):
+        return f'<PeriodStat {self.period_type}:{self.period_key} user:{self.user_id} score:{self.score}>'
+
+class PeriodSnapshot(db.Model):
+    """끝난 기간 랭킹의 불변 스냅샷 (상위 유저를 압축 JSON 배열로 보관)"""
+    __tablename__ = 'period_snapshots'
+
+    period_type = db.Column(db.String(10), primary_key=True)
+    period_key = db.Column(db.String(10), primary_key=True)
+    participants = db.Column(db.Integer, default=0, nullable=False)
+    entries = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, default=lambda: datetime.now(KST))
+
+    def __repr__(self):
+        return f'<PeriodSnapshot {self.period_type}:{self.period_key} ({self.participants}명)>'
+
+class TextChange(db.Model):
+    """
+    글 카탈로그 변경 로그 (델타 동기화용)
+    version은 app_state의 카탈로그 버전과 같은 값이며, 삭제된 글은 op='delete' 툼스톤으로 남습니다.
+    """
+    __tablename__ = 'text_changes'
+
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.BigInteger, nullable=False, index=True)
+    # 삭제 후에도 툼스톤을 유지해야 하므로 FK를 걸지 않습니다.
+    text_id = db.Column(db.Integer, nullable=False)
+    op = db.Column(db.String(10), nullable=False)  # 'add' | 'delete'
+    created_at = db.Column(db.DateTime, default=lambda: datetime.now(KST))
+
+    def __repr__(self):
+        return f'<TextChange v{self.version} {self.op} text:{self.text_id}>'
+
+class AppState(db.Model):
+    """워커 간에 공유해야 하는 단일 값(카탈로그 버전 등)을 보관하는 key-value 테이블"""
+    __tablename__ = 'app_state'
+
+    key = db.Column(db.String(100), primary_key=True)
+    value = db.Column(db.BigInteger, default=0, nullable=False)
+
+    def __repr__(self):
+        return f'<AppState {self.key}={self.value}>'
+
 class TestReport(db.Model):
     __tablename__ = 'test_reports'
     id = db.Column(db.Integer, primary_key=True)
@@ -0,0 +1,401 @@
+"""
+기간별(일간/주간/시즌) 랭킹
+
+- period_stats: (기간 종류, 기간 키, 유저)별 누적 합계/최고 기록/점수. 결과 저장/삭제 시 증분으로만 갱신합니다.
+  (typing_results를 다시 집계하지 않음, 삭제된 결과가 기간 최고 기록이었을 때만 해당 기간의 MAX로 복구)
+- period_snapshots: 끝난 기간의 상위 PERIOD_SNAPSHOT_SIZE명을 압축 JSON 한 줄로 보관하는 불변 스냅샷.
+  기간이 끝나면 flask archive-periods (기간 경계 직후 cron)로 스냅샷을 만든 뒤 그 기간의 period_stats 행을 삭제합니다.
+  조회는 쓰지 않으며, 아직 보관되지 않은 끝난 기간은 period_stats에서 그대로 읽습니다.
+
+기간 키 (KST 기준): 일간 '2026-10-17', 주간 ISO 주 '2026-W42', 시즌(분기) '2026-Q4'
+"""
+import json
+from datetime import datetime, timedelta
+
+import click
+from flask.cli import with_appcontext
+
+from sqlalchemy import update, insert, delete, func, case, literal
+from sqlalchemy.exc import IntegrityError
+
+from app.database import db
+from app.models import User, TypingResult, PeriodStat, PeriodSnapshot, KST, calculate_ranking_score
+from app.scoring import active_score_sql, active_version_sql
+
+PERIOD_TYPES = ('day', 'week', 'season')
+# 끝난 기간 스냅샷에 보관하는 최대 인원
+PERIOD_SNAPSHOT_SIZE = 100
+
+
+def _as_kst(moment):
+    """DB에서 읽은 naive datetime은 KST로 간주합니다."""
+    if moment is None:
+        return datetime.now(KST)
+    if moment.tzinfo is None:
+        return moment.replace(tzinfo=KST)
+    return moment.astimezone(KST)
+
+
+def period_key(period_type, moment=None):
+    """moment(기본: 현재)가 속한 기간의 키"""
+    moment = _as_kst(moment)
+    if period_type == 'day':
+        return moment.strftime('%Y-%m-%d')
+    if period_type == 'week':
+        year, week, _ = moment.isocalendar()
+        return f"{year}-W{week:02d}"
+    if period_type == 'season':
+        return f"{moment.year}-Q{(moment.month - 1) // 3 + 1}"
+    raise ValueError(f"알 수 없는 기간 종류입니다: {period_type}")
+
+
+def period_bounds(period_type, key):
+    """기간 키의 [시작, 끝) 시각 (KST naive, DB에 저장된 created_at과 같은 기준)"""
+    if period_type == 'day':
+        start = datetime.strptime(key, '%Y-%m-%d')
+        return start, start + timedelta(days=1)
+    if period_type == 'week':
+        year, week = key.split('-W')
+        start = datetime.fromisocalendar(int(year), int(week), 1)
+        return start, start + timedelta(weeks=1)
+    if period_type == 'season':
+        year, quarter = key.split('-Q')
+        start = datetime(int(year), (int(quarter) - 1) * 3 + 1, 1)
+        end = datetime(start.year + 1, 1, 1) if start.month == 10 else datetime(start.year, start.month + 3, 1)
+        return start, end
+    raise ValueError(f"알 수 없는 기간 종류입니다: {period_type}")
+
+
+def _greatest(column, new_value):
+    return case((column < new_value, new_value), else_=column)
+
+
+def _period_score_sql(best_cpm, total_accuracy, total_cpm, max_combo, play_count):
+    """기간 누적값(SQL 식)으로 계산한 현재 공식 점수 (판수가 0이면 평균을 0으로)"""
+    count = case((play_count > 0, play_count), else_=1)
+    return active_score_sql(best_cpm, total_accuracy / count, total_cpm / count, max_combo, play_count)
+
+
+def _refresh_period_scores(keys):
+    """(기간 종류, 기간 키, 유저) 행들의 점수를 현재 저장된 누적값으로 다시 계산합니다. (SQL UPDATE)"""
+    for period_type, key, user_id in keys:
+        db.session.execute(
+            update(PeriodStat).where(
+                PeriodStat.period_type == period_type,
+                PeriodStat.period_key == key,
+                PeriodStat.user_id == user_id
+            ).values(
+                score=_period_score_sql(PeriodStat.best_cpm, PeriodStat.total_accuracy, PeriodStat.total_cpm,
+                                        PeriodStat.max_combo, PeriodStat.play_count),
+                formula_version=active_version_sql()
+            ).execution_options(synchronize_session=False)
+        )
+
+
+def apply_period_delta(user_id, moment, count, sum_cpm, sum_wpm, sum_accuracy, best_cpm, best_wpm, max_combo):
+    """
+    moment가 속한 일간/주간/시즌 기간의 유저 누적값에 결과 count개를 더합니다. (기간별 UPDATE 1번, 첫 결과면 INSERT)
+    점수도 같은 문장 안에서 더한 뒤의 값과 현재 공식 버전으로 계산합니다.
+    결과를 저장하는 트랜잭션 안에서 호출합니다. (commit은 호출하는 쪽에서)
+    """
+    for period_type in PERIOD_TYPES:
+        key = period_key(period_type, moment)
+        # MySQL은 SET 절을 왼쪽부터 평가하므로 점수를 누적값보다 먼저 둡니다.
+        conditional_update = update(PeriodStat).where(
+            PeriodStat.period_type == period_type,
+            PeriodStat.period_key == key,
+            PeriodStat.user_id == user_id
+        ).ordered_values(
+            (PeriodStat.score, _period_score_sql(
+                _greatest(PeriodStat.best_cpm, best_cpm), PeriodStat.total_accuracy + sum_accuracy,
+                PeriodStat.total_cpm + sum_cpm, _greatest(PeriodStat.max_combo, max_combo),
+                PeriodStat.play_count + count
+            )),
+            (PeriodStat.formula_version, active_version_sql()),
+            (PeriodStat.play_count, PeriodStat.play_count + count),
+            (PeriodStat.total_cpm, PeriodStat.total_cpm + sum_cpm),
+            (PeriodStat.total_wpm, PeriodStat.total_wpm + sum_wpm),
+            (PeriodStat.total_accuracy, PeriodStat.total_accuracy + sum_accuracy),
+            (PeriodStat.best_cpm, _greatest(PeriodStat.best_cpm, best_cpm)),
+            (PeriodStat.best_wpm, _greatest(PeriodStat.best_wpm, best_wpm)),
+            (PeriodStat.max_combo, _greatest(PeriodStat.max_combo, max_combo)),
+            (PeriodStat.updated_at, datetime.now(KST)),
+        ).execution_options(synchronize_session=False)
+
+        if not db.session.execute(conditional_update).rowcount:
+            # 이 기간의 첫 결과: 다른 요청이 먼저 만들었다면 UPDATE로 다시 더합니다.
+            try:
+                with db.session.begin_nested():
+                    db.session.execute(insert(PeriodStat).values(
+                        period_type=period_type, period_key=key, user_id=user_id,
+                        play_count=count, total_cpm=sum_cpm, total_wpm=sum_wpm, total_accuracy=sum_accuracy,
+                        best_cpm=best_cpm, best_wpm=best_wpm, max_combo=max_combo,
+                        score=_period_score_sql(literal(best_cpm), literal(sum_accuracy), literal(sum_cpm),
+                                                literal(max_combo), literal(count)),
+                        formula_version=active_version_sql(), updated_at=datetime.now(KST)
+                    ))
+            except IntegrityError:
+                db.session.execute(conditional_update)
+
+
+def apply_result_to_periods(result):
+    """저장한 결과 1개를 기간별 누적값에 반영합니다. (결과 flush 후 호출)"""
+    apply_period_delta(result.user_id, result.created_at, 1, result.cpm, result.wpm, result.accuracy,
+                       result.cpm, result.wpm, result.combo)
+
+
+def apply_results_to_periods(results):
+    """
+    묶음으로 저장한 결과들을 유저-일자별로 합쳐 기간별 누적값에 반영합니다. (결과 flush 후 호출)
+    유저 id 순서로 갱신하여 동시에 도는 묶음끼리 행 잠금 순서가 엇갈리지 않도록 합니다.
+    """
+    groups = {}
+    for r in results:
+        moment = _as_kst(r.created_at)
+        d = groups.setdefault((r.user_id, period_key('day', moment)), {
+            'moment': moment, 'count': 0, 'sum_cpm': 0, 'sum_wpm': 0, 'sum_accuracy': 0.0,
+            'best_cpm': 0, 'best_wpm': 0, 'max_combo': 0
+        })
+        d['count'] += 1
+        d['sum_cpm'] += r.cpm
+        d['sum_wpm'] += r.wpm
+        d['sum_accuracy'] += r.accuracy
+        d['best_cpm'] = max(d['best_cpm'], r.cpm)
+        d['best_wpm'] = max(d['best_wpm'], r.wpm)
+        d['max_combo'] = max(d['max_combo'], r.combo)
+
+    for (user_id, _), d in sorted(groups.items()):
+        apply_period_delta(user_id, **d)
+
+
+def remove_result_from_periods(result):
+    """
+    삭제된 결과를 아직 끝나지 않은(보관 전) 기간의 누적값에서 뺍니다. (결과 삭제를 flush한 뒤 호출)
+    삭제된 값이 그 기간의 최고 기록이었다면 그 기간 안의 남은 결과로 복구하고,
+    남은 결과가 없으면 행을 지웁니다. 이미 스냅샷으로 보관된 기간은 건드리지 않습니다.
+    """
+    touched = []
+    for period_type in PERIOD_TYPES:
+        key = period_key(period_type, result.created_at)
+        row = db.session.query(PeriodStat).filter_by(
+            period_type=period_type, period_key=key, user_id=result.user_id
+        ).populate_existing().first()
+        if row is None:
+            continue
+        if row.play_count <= 1:
+            db.session.delete(row)
+            continue
+
+        db.session.execute(
+            update(PeriodStat).where(
+                PeriodStat.period_type == period_type,
+                PeriodStat.period_key == key,
+                PeriodStat.user_id == result.user_id
+            ).values(
+                play_count=PeriodStat.play_count - 1,
+                total_cpm=PeriodStat.total_cpm - result.cpm,
+                total_wpm=PeriodStat.total_wpm - result.wpm,
+                total_accuracy=PeriodStat.total_accuracy - result.accuracy,
+                updated_at=datetime.now(KST)
+            ).execution_options(synchronize_session=False)
+        )
+
+        repairs = {}
+        start, end = period_bounds(period_type, key)
+        for best_field, column in (('best_cpm', TypingResult.cpm),
+                                   ('best_wpm', TypingResult.wpm),
+                                   ('max_combo', TypingResult.combo)):
+            if getattr(result, column.key) >= getattr(row, best_field):
+                repairs[best_field] = db.session.query(func.coalesce(func.max(column), 0)).filter(
+                    TypingResult.user_id == result.user_id,
+                    TypingResult.created_at >= start,
+                    TypingResult.created_at < end
+                ).scalar()
+        if repairs:
+            db.session.execute(
+                update(PeriodStat).where(
+                    PeriodStat.period_type == period_type,
+                    PeriodStat.period_key == key,
+                    PeriodStat.user_id == result.user_id
+                ).values(**repairs).execution_options(synchronize_session=False)
+            )
+        touched.append((period_type, key, result.user_id))
+
+    _refresh_period_scores(touched)
+
+
+def _ranking_rows(period_type, key, limit):
+    """기간 랭킹 상위 limit명 (인덱스 ix_period_stats_period_score 사용)"""
+    return db.session.query(PeriodStat, User)\
+        .join(User, User.id == PeriodStat.user_id)\
+        .filter(PeriodStat.period_type == period_type, PeriodStat.period_key == key)\
+        .order_by(PeriodStat.score.desc(), PeriodStat.best_cpm.desc(), PeriodStat.user_id.asc())\
+        .limit(limit).all()
+
+
+def _entry(rank, stat, user_id, username, profile_pic):
+    count = stat['play_count'] or 1
+    return {
+        "rank": rank,
+        "account": {"user_id": user_id, "username": username, "profile_pic": profile_pic},
+        "stats": {
+            "score": stat['score'],
+            "play_count": stat['play_count'],
+            "best_cpm": stat['best_cpm'],
+            "best_wpm": stat['best_wpm'],
+            "max_combo": stat['max_combo'],
+            "avg_cpm": round(stat['total_cpm'] / count, 2),
+            "avg_accuracy": round(stat['total_accuracy'] / count, 2)
+        }
+    }
+
+
+# 스냅샷 한 줄의 필드 순서 (키 이름을 반복하지 않도록 배열로 저장)
+_SNAPSHOT_FIELDS = ('user_id', 'username', 'profile_pic', 'score', 'play_count', 'best_cpm', 'best_wpm',
+                    'max_combo', 'total_cpm', 'total_accuracy')
+
+
+def _snapshot_stat(stat, user):
+    """period_stats 행 -> 스냅샷 한 줄 (_SNAPSHOT_FIELDS 순서)"""
+    return [user.id, user.username, user.profile_pic, stat.score, stat.play_count, stat.best_cpm, stat.best_wpm,
+            stat.max_combo, stat.total_cpm, round(stat.total_accuracy, 2)]
+
+
+def _merge_late_rows(period_type, key):
+    """
+    이미 보관된 기간에 늦게 커밋된 결과(스냅샷 생성 이후 갱신된 period_stats 행)를 스냅샷에 합칩니다.
+    스냅샷 생성 이전 값의 행은 동시에 보관 중인 다른 워커가 이미 스냅샷에 담은 행이므로 합치지 않습니다.
+    스냅샷 상위 목록 밖의 유저는 늦은 결과만으로 새 항목이 됩니다. (보관 시 상위 PERIOD_SNAPSHOT_SIZE명만 남기므로)
+    """
+    # 스냅샷 / 늦은 행을 잠가서 동시에 합치는 워커가 같은 행을 두 번 더하지 않도록 함
+    snapshot = db.session.query(PeriodSnapshot).filter_by(period_type=period_type, period_key=key)\
+        .with_for_update().populate_existing().first()
+    late = db.session.query(PeriodStat, User)\
+        .join(User, User.id == PeriodStat.user_id)\
+        .filter(PeriodStat.period_type == period_type, PeriodStat.period_key == key,
+                PeriodStat.updated_at > snapshot.created_at)\
+        .with_for_update(of=PeriodStat).all()
+    if not late:
+        return 0
+
+    entries = {values[0]: dict(zip(_SNAPSHOT_FIELDS, values)) for values in json.loads(snapshot.entries)}
+    for stat, user in late:
+        late_values = dict(zip(_SNAPSHOT_FIELDS, _snapshot_stat(stat, user)))
+        entry = entries.get(user.id)
+        if entry is None:
+            entries[user.id] = entry = late_values
+            snapshot.participants += 1
+        else:
+            for field in ('play_count', 'total_cpm', 'total_accuracy'):
+                entry[field] += late_values[field]
+            for field in ('best_cpm', 'best_wpm', 'max_combo'):
+                entry[field] = max(entry[field], late_values[field])
+            entry['total_accuracy'] = round(entry['total_accuracy'], 2)
+        count = entry['play_count'] or 1
+        entry['score'] = calculate_ranking_score(
+            entry['best_cpm'], entry['total_accuracy'] / count, entry['total_cpm'] / count,
+            entry['max_combo'], entry['play_count']
+        )
+
+    # _ranking_rows와 같은 순서로 다시 정렬
+    merged = sorted(entries.values(), key=lambda e: (-e['score'], -e['best_cpm'], e['user_id']))
+    snapshot.entries = json.dumps([[e[f] for f in _SNAPSHOT_FIELDS] for e in merged[:PERIOD_SNAPSHOT_SIZE]],
+                                  separators=(',', ':'), ensure_ascii=False)
+    return len(late)
+
+
+def archive_period(period_type, key):
+    """
+    끝난 기간의 상위 PERIOD_SNAPSHOT_SIZE명을 스냅샷으로 보관하고 그 기간의 period_stats 행을 삭제합니다.
+    이미 스냅샷이 있으면 (다른 워커가 보관했거나, 보관 후 늦게 커밋된 결과) 늦은 행만 스냅샷에 합칩니다.
+    """
+    created = False
+    if db.session.get(PeriodSnapshot, (period_type, key)) is None:
+        rows = _ranking_rows(period_type, key, PERIOD_SNAPSHOT_SIZE)
+        entries = [_snapshot_stat(stat, user) for stat, user in rows]
+        participants = db.session.query(func.count(PeriodStat.user_id)).filter(
+            PeriodStat.period_type == period_type, PeriodStat.period_key == key
+        ).scalar()
+        try:
+            with db.session.begin_nested():
+                db.session.execute(insert(PeriodSnapshot).values(
+                    period_type=period_type, period_key=key, participants=participants,
+                    entries=json.dumps(entries, separators=(',', ':'), ensure_ascii=False),
+                    created_at=datetime.now(KST)
+                ))
+            created = True
+        except IntegrityError:
+            pass
+    if not created:
+        _merge_late_rows(period_type, key)
+    db.session.execute(
+        delete(PeriodStat).where(PeriodStat.period_type == period_type, PeriodStat.period_key == key)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def archive_closed_periods(now=None):
+    """
+    현재 기간보다 이전 키로 남아 있는 period_stats를 모두 스냅샷으로 보관합니다. (commit 포함)
+
+    Returns:
+        list: 보관한 (기간 종류, 기간 키) 목록
+    """
+    archived = []
+    for period_type in PERIOD_TYPES:
+        current = period_key(period_type, now)
+        closed_keys = [key for (key,) in db.session.query(PeriodStat.period_key).filter(
+            PeriodStat.period_type == period_type, PeriodStat.period_key < current
+        ).distinct().all()]
+        for key in sorted(closed_keys):
+            archive_period(period_type, key)
+            archived.append((period_type, key))
+    db.session.commit()
+    return archived
+
+
+def get_period_ranking(period_type, key=None, limit=10):
+    """
+    기간 랭킹을 반환합니다. (읽기만 하며 보관은 flask archive-periods가 담당)
+    진행 중인 기간과 아직 보관되지 않은 끝난 기간은 period_stats에서, 보관된 기간은 스냅샷에서 읽습니다.
+
+    Returns:
+        dict or None: {"period_type", "period_key", "archived", "participants", "ranking": [...]}
+                      (끝난 기간의 스냅샷도 집계 행도 없으면 None)
+    """
+    current = period_key(period_type)
+    key = key or current
+
+    snapshot = db.session.get(PeriodSnapshot, (period_type, key)) if key < current else None
+    if snapshot is None:
+        rows = _ranking_rows(period_type, key, limit)
+        participants = db.session.query(func.count(PeriodStat.user_id)).filter(
+            PeriodStat.period_type == period_type, PeriodStat.period_key == key
+        ).scalar()
+        ranking = [
+            _entry(rank, {
+                'score': stat.score, 'play_count': stat.play_count, 'best_cpm': stat.best_cpm,
+                'best_wpm': stat.best_wpm, 'max_combo': stat.max_combo,
+                'total_cpm': stat.total_cpm, 'total_accuracy': stat.total_accuracy
+            }, user.id, user.username, user.profile_pic)
+            for rank, (stat, user) in enumerate(rows, 1)
+        ]
+        if key < current and not participants:
+            return None
+        return {"period_type": period_type, "period_key": key, "archived": False,
+                "participants": participants, "ranking": ranking}
+
+    ranking = []
+    for rank, values in enumerate(json.loads(snapshot.entries)[:limit], 1):
+        stat = dict(zip(_SNAPSHOT_FIELDS, values))
+        ranking.append(_entry(rank, stat, stat['user_id'], stat['username'], stat['profile_pic']))
+    return {"period_type": period_type, "period_key": key, "archived": True,
+            "participants": snapshot.participants, "ranking": ranking}
+
+
+@click.command('archive-periods')
+@with_appcontext
+def archive_periods_command():
+    """끝난 일간/주간/시즌 랭킹을 스냅샷으로 보관합니다. (기간 경계 직후 cron 실행용)"""
+    archived = archive_closed_periods()
+    click.echo(f"📦 기간 랭킹 {len(archived)}개 보관: {', '.join(f'{t}:{k}' for t, k in archived) or '-'}")
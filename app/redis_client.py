@@ -2,72 +2,683 @@
 Redis 클라이언트 모듈.
 REDIS_URL 환경변수가 설정되어 있으면 Redis 캐시를 사용하고,
 없으면 None을 반환하여 캐시 없이 DB 직접 조회합니다.
+
+Redis를 사용할 때는 워커 메모리의 작은 LRU 캐시(LOCAL_CACHE_TTL초)를 앞단에 두어
+자주 읽는 키는 Redis 왕복과 디코딩 없이 반환합니다.
+(다른 워커에서 무효화한 값은 최대 LOCAL_CACHE_TTL초 늦게 반영될 수 있습니다.)
+
+캐시 값은 [헤더 1바이트][본문] 형식의 바이트로 저장합니다.
+- 헤더 상위 4비트: 직렬화 방식 (1=json, 2=msgpack), 하위 4비트: 압축 방식 (0=없음, 1=zlib, 2=brotli)
+- 직렬화는 CACHE_SERIALIZER(기본 msgpack), 본문이 CACHE_COMPRESS_MIN_BYTES 이상이면 CACHE_COMPRESSION으로 압축
+- 헤더 없이 '{' 또는 '['로 시작하는 값은 이전 버전이 저장한 JSON으로 읽습니다.
+
+Redis 연결은 크기 제한 연결 풀 + 짧은 타임아웃을 사용하고, 연결 오류가 반복되면 차단기(CircuitBreaker)가 열려
+재연결 확인 전까지 Redis를 건너뜁니다. (장애 중에는 캐시 없이 DB 조회 지연만 발생)
 """
 import os
 import json
+import logging
+import random
+import threading
+import time
+import uuid
+import zlib
+from collections import OrderedDict, deque
+
+import msgpack
+
+try:
+    import brotli
+except ImportError:  # brotli 미설치 시 zlib만 사용
+    brotli = None
 
 _redis_client = None
 
 # 유저 관련 캐시 TTL (초)
 USER_CACHE_TTL = 180  # 3분
+# 만료 시각이 한꺼번에 몰리지 않도록 TTL에 더하는 무작위 비율 (0 ~ 10%)
+CACHE_TTL_JITTER = 0.1
+
+# 워커 메모리 캐시 (최대 항목 수 / TTL 초)
+LOCAL_CACHE_MAX = int(os.getenv("LOCAL_CACHE_MAX", "1024"))
+LOCAL_CACHE_TTL = float(os.getenv("LOCAL_CACHE_TTL", "2"))
+
+# 캐시 채우기 락 (한 키를 한 워커만 다시 계산)
+FILL_LOCK_TTL = 5            # Redis 락 유지 시간 (초, 계산 중 프로세스가 죽어도 이 시간 뒤 해제)
+FILL_WAIT_TIMEOUT = 2.0      # 다른 워커의 계산 결과를 기다리는 최대 시간 (초)
+FILL_POLL_INTERVAL = 0.05
+
+# 캐시 값 직렬화/압축 설정
+CACHE_SERIALIZER = os.getenv("CACHE_SERIALIZER", "msgpack")
+CACHE_COMPRESSION = os.getenv("CACHE_COMPRESSION", "zlib")
+CACHE_COMPRESS_MIN_BYTES = int(os.getenv("CACHE_COMPRESS_MIN_BYTES", "1024"))
+
+_MISSING = object()
+
+
+class JsonSerializer:
+    """JSON 직렬화 (이전 버전과 같은 형식, 알 수 없는 타입은 문자열로 변환)"""
+    id = 1
+
+    @staticmethod
+    def dumps(value):
+        return json.dumps(value, default=str, separators=(',', ':'), ensure_ascii=False).encode()
+
+    @staticmethod
+    def loads(data):
+        return json.loads(data)
+
+
+class MsgpackSerializer:
+    """msgpack 직렬화 (JSON보다 작고 디코딩이 빠름, 알 수 없는 타입은 문자열로 변환)"""
+    id = 2
+
+    @staticmethod
+    def dumps(value):
+        return msgpack.packb(value, default=str, use_bin_type=True)
+
+    @staticmethod
+    def loads(data):
+        return msgpack.unpackb(data, raw=False, strict_map_key=False)
+
+
+class ZlibCompressor:
+    id = 1
+
+    @staticmethod
+    def compress(data):
+        return zlib.compress(data, 1)  # 레벨 1: 6 대비 크기는 비슷하고 압축 시간은 1/3 수준
+
+    @staticmethod
+    def decompress(data):
+        return zlib.decompress(data)
+
+
+class BrotliCompressor:
+    id = 2
+
+    @staticmethod
+    def compress(data):
+        return brotli.compress(data, quality=4)
+
+    @staticmethod
+    def decompress(data):
+        return brotli.decompress(data)
+
+
+# 이름으로 선택할 수 있는 직렬화/압축 방식 (새 방식은 고유한 id(1~15)와 함께 여기에 등록)
+SERIALIZERS = {'json': JsonSerializer, 'msgpack': MsgpackSerializer}
+COMPRESSORS = {'zlib': ZlibCompressor}
+if brotli is not None:
+    COMPRESSORS['brotli'] = BrotliCompressor
+
+_SERIALIZERS_BY_ID = {serializer.id: serializer for serializer in SERIALIZERS.values()}
+_COMPRESSORS_BY_ID = {compressor.id: compressor for compressor in (ZlibCompressor, BrotliCompressor)}
+
+
+def encode_value(value, serializer=None, compression=None, min_bytes=None):
+    """
+    캐시에 저장할 바이트로 변환합니다.
+    압축은 본문이 min_bytes 이상이고 실제로 크기가 줄어들 때만 적용합니다.
+    """
+    serializer = SERIALIZERS[serializer or CACHE_SERIALIZER]
+    compressor = COMPRESSORS.get(compression or CACHE_COMPRESSION)
+    min_bytes = CACHE_COMPRESS_MIN_BYTES if min_bytes is None else min_bytes
+
+    body = serializer.dumps(value)
+    codec_id = 0
+    if compressor is not None and len(body) >= min_bytes:
+        compressed = compressor.compress(body)
+        if len(compressed) < len(body):
+            body, codec_id = compressed, compressor.id
+    return bytes([serializer.id << 4 | codec_id]) + body
+
+
+def decode_value(data):
+    """encode_value로 저장한 바이트(또는 이전 버전의 JSON 문자열)를 값으로 되돌립니다."""
+    if isinstance(data, str):
+        data = data.encode()
+    header = data[0]
+    if header in (0x7b, 0x5b):  # '{' / '[' : 헤더 없는 이전 JSON 값
+        return json.loads(data)
+    serializer = _SERIALIZERS_BY_ID[header >> 4]
+    body = data[1:]
+    codec_id = header & 0x0F
+    if codec_id:
+        body = _COMPRESSORS_BY_ID[codec_id].decompress(body)
+    return serializer.loads(body)
+
+
+# 연결 풀 / 소켓 타임아웃 (초) - Redis가 느리거나 죽었을 때 요청이 오래 묶이지 않도록 짧게 설정
+REDIS_MAX_CONNECTIONS = int(os.getenv("REDIS_MAX_CONNECTIONS", "50"))
+REDIS_SOCKET_TIMEOUT = float(os.getenv("REDIS_SOCKET_TIMEOUT", "0.25"))
+REDIS_CONNECT_TIMEOUT = float(os.getenv("REDIS_CONNECT_TIMEOUT", "0.25"))
+
+# 차단기: BREAKER_WINDOW초 안에 연결 오류가 BREAKER_FAILURE_THRESHOLD번 나면 Redis 사용을 멈추고,
+# BREAKER_BASE_DELAY초 뒤 한 요청만 재연결을 시도합니다. (실패할 때마다 대기 시간 2배, 최대 BREAKER_MAX_DELAY초)
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("REDIS_BREAKER_THRESHOLD", "3"))
+BREAKER_WINDOW = 10.0
+BREAKER_BASE_DELAY = 1.0
+BREAKER_MAX_DELAY = float(os.getenv("REDIS_BREAKER_MAX_DELAY", "60"))
+
+try:
+    from redis.exceptions import ConnectionError as RedisConnectionError, TimeoutError as RedisTimeoutError
+    _CONNECTION_ERRORS = (RedisConnectionError, RedisTimeoutError, ConnectionError, TimeoutError)
+except ImportError:
+    _CONNECTION_ERRORS = (ConnectionError, TimeoutError)
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitBreaker:
+    """
+    Redis 연결 차단기 (closed → open → half_open → closed/open)
+    - closed: 정상 사용. 최근 window초 동안 연결 오류가 threshold번 쌓이면 open
+    - open: Redis를 사용하지 않음. retry_at이 지나면 한 호출자만 half_open으로 재연결 확인
+    - half_open: 재연결 확인 중. 성공하면 closed, 실패하면 대기 시간을 2배로 늘려 다시 open
+    """
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold, window, base_delay, max_delay):
+        self.failure_threshold = failure_threshold
+        self.window = window
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.state = self.CLOSED
+        self.open_count = 0
+        self.last_error = None
+        self._failures = deque()
+        self._retry_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self, probe):
+        """Redis를 사용해도 되면 True. 재시도 시각이 지났으면 이 호출자가 probe()로 재연결을 확인합니다."""
+        if self.state == self.CLOSED:
+            return True
+        with self._lock:
+            if self.state != self.OPEN or time.monotonic() < self._retry_at:
+                return False
+            self.state = self.HALF_OPEN
+        try:
+            probe()
+        except Exception as e:
+            self.record_failure(e)
+            return False
+        self.record_success()
+        return True
+
+    def record_failure(self, error):
+        """연결 오류를 기록합니다. (연결과 무관한 오류는 무시)"""
+        if not isinstance(error, _CONNECTION_ERRORS) and self.state != self.HALF_OPEN:
+            return
+        now = time.monotonic()
+        with self._lock:
+            self.last_error = str(error)
+            if self.state == self.OPEN:
+                return
+            if self.state == self.HALF_OPEN:
+                self._open(now)
+                return
+            self._failures.append(now)
+            while self._failures and self._failures[0] < now - self.window:
+                self._failures.popleft()
+            if len(self._failures) >= self.failure_threshold:
+                self._open(now)
+
+    def trip(self, error):
+        """즉시 차단기를 엽니다. (초기 연결 실패 등)"""
+        with self._lock:
+            self.last_error = str(error)
+            if self.state != self.OPEN:
+                self._open(time.monotonic())
+
+    def record_success(self):
+        if self.state == self.CLOSED and not self._failures:
+            return
+        with self._lock:
+            if self.state != self.CLOSED:
+                logger.info("✅ [Redis 차단기] 재연결 성공 - 캐시 사용 재개")
+            self.state = self.CLOSED
+            self.open_count = 0
+            self._failures.clear()
+
+    def _open(self, now):
+        self.open_count += 1
+        delay = min(self.max_delay, self.base_delay * 2 ** (self.open_count - 1))
+        # 워커들이 같은 순간에 재연결을 시도하지 않도록 최대 20% 지터
+        self._retry_at = now + delay * random.uniform(1.0, 1.2)
+        self.state = self.OPEN
+        self._failures.clear()
+        logger.warning(f"⚠️ [Redis 차단기] 열림 - {delay:.0f}초 동안 캐시 없이 동작 (사유: {self.last_error})")
+
+    def snapshot(self):
+        with self._lock:
+            retry_in = max(0.0, self._retry_at - time.monotonic()) if self.state == self.OPEN else 0.0
+            return {
+                "state": self.state,
+                "recent_failures": len(self._failures),
+                "open_count": self.open_count,
+                "retry_in": round(retry_in, 2),
+                "last_error": self.last_error
+            }
+
+
+_breaker = CircuitBreaker(BREAKER_FAILURE_THRESHOLD, BREAKER_WINDOW, BREAKER_BASE_DELAY, BREAKER_MAX_DELAY)
+
+
+class LocalCache:
+    """TTL이 있는 크기 제한 LRU 캐시 (스레드 안전)"""
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """값을 반환합니다. 없거나 만료되었으면 _MISSING."""
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return _MISSING
+            expires_at, value = item
+            if expires_at <= time.monotonic():
+                del self._items[key]
+                return _MISSING
+            self._items.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        if self.max_size <= 0:
+            return
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        with self._lock:
+            self._items[key] = (time.monotonic() + ttl, value)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._items.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+    def __len__(self):
+        return len(self._items)
+
+
+_local_cache = LocalCache(LOCAL_CACHE_MAX, LOCAL_CACHE_TTL)
+
+# 같은 워커 안에서 같은 키를 동시에 계산하지 않도록 하는 락 (키 해시로 나눈 고정 개수)
+_fill_locks = [threading.Lock() for _ in range(64)]
+
+
+def clear_local_cache():
+    """워커 메모리 캐시를 비웁니다."""
+    _local_cache.clear()
+
+
+def jittered_ttl(ttl: int):
+    """TTL에 0 ~ CACHE_TTL_JITTER 비율의 무작위 시간을 더합니다."""
+    return ttl + random.randint(0, int(ttl * CACHE_TTL_JITTER))
+
+
+def _create_client(redis_url):
+    """짧은 소켓 타임아웃과 크기 제한이 있는 연결 풀로 클라이언트를 만듭니다. (자동 재시도 없음)"""
+    import redis
+    from redis.backoff import NoBackoff
+    from redis.retry import Retry
+
+    pool = redis.ConnectionPool.from_url(
+        redis_url,
+        max_connections=REDIS_MAX_CONNECTIONS,
+        socket_timeout=REDIS_SOCKET_TIMEOUT,
+        socket_connect_timeout=REDIS_CONNECT_TIMEOUT,
+        health_check_interval=30,
+        retry=Retry(NoBackoff(), 0),
+        # 캐시 값은 바이트(헤더 + msgpack/압축)로 저장하므로 응답을 문자열로 디코딩하지 않습니다.
+        decode_responses=False
+    )
+    return redis.Redis(connection_pool=pool)
 
 
 def init_redis():
-    """환경변수 REDIS_URL이 있으면 Redis 클라이언트를 초기화합니다."""
+    """환경변수 REDIS_URL이 있으면 Redis 클라이언트를 초기화합니다. (연결 실패 시 차단기를 엽니다)"""
     global _redis_client
     redis_url = os.getenv("REDIS_URL")
     if not redis_url:
         _redis_client = None
         return None
     try:
-        import redis
-        _redis_client = redis.from_url(redis_url, decode_responses=True)
-        _redis_client.ping()
-        return _redis_client
-    except Exception:
+        client = _create_client(redis_url)
+        client.ping()
+    except Exception as e:
         _redis_client = None
+        _breaker.trip(e)
         return None
+    _redis_client = client
+    _breaker.record_success()
+    return _redis_client
 
 
-def get_redis():
-    """Redis 클라이언트를 반환합니다. 미설정 시 None."""
+def _probe_redis():
+    """차단기 재시도 시각에 한 번 연결을 확인합니다. (실패하면 예외)"""
     global _redis_client
-    if _redis_client is None and os.getenv("REDIS_URL"):
-        init_redis()
+    client = _redis_client or _create_client(os.getenv("REDIS_URL"))
+    client.ping()
+    _redis_client = client
+
+
+def get_redis():
+    """
+    Redis 클라이언트를 반환합니다. 미설정이거나 차단기가 열려 있으면 None.
+    (Redis 장애 중에는 연결 시도 없이 바로 None을 반환하므로 DB 조회 지연만 발생합니다)
+    """
+    if _redis_client is None and not os.getenv("REDIS_URL"):
+        return None
+    if not _breaker.allow(_probe_redis):
+        return None
+    if _redis_client is None:
+        return init_redis()
     return _redis_client
 
 
+def report_redis_error(error):
+    """get_redis()로 받은 클라이언트를 직접 사용하는 모듈에서 발생한 오류를 차단기에 알립니다."""
+    _breaker.record_failure(error)
+
+
+def get_redis_status():
+    """Redis 설정 여부, 연결 풀 설정, 차단기 상태를 반환합니다."""
+    configured = bool(os.getenv("REDIS_URL")) or _redis_client is not None
+    return {
+        "configured": configured,
+        "connected": configured and _redis_client is not None and _breaker.state == CircuitBreaker.CLOSED,
+        "pool": {
+            "max_connections": REDIS_MAX_CONNECTIONS,
+            "socket_timeout": REDIS_SOCKET_TIMEOUT,
+            "connect_timeout": REDIS_CONNECT_TIMEOUT
+        },
+        "breaker": _breaker.snapshot()
+    }
+
+
 def cache_get(key: str):
-    """캐시에서 JSON 데이터를 조회합니다. 없으면 None."""
+    """
+    캐시에서 데이터를 조회합니다. 없으면 None.
+    워커 메모리 캐시를 먼저 보고, 없으면 Redis에서 읽어 메모리 캐시에 채웁니다.
+    (반환값은 다른 요청과 공유되므로 수정하지 마세요.)
+    """
     r = get_redis()
     if not r:
         return None
+    value = _local_cache.get(key)
+    if value is not _MISSING:
+        return value
     try:
         data = r.get(key)
-        return json.loads(data) if data else None
-    except Exception:
+        if not data:
+            return None
+        value = decode_value(data)
+    except Exception as e:
+        _breaker.record_failure(e)
         return None
+    _local_cache.set(key, value)
+    return value
 
 
 def cache_set(key: str, value, ttl: int = USER_CACHE_TTL):
-    """캐시에 JSON 데이터를 저장합니다."""
+    """캐시에 데이터를 저장합니다. (TTL에 무작위 시간을 더해 만료 시각을 분산)"""
     r = get_redis()
     if not r:
         return False
     try:
-        r.setex(key, ttl, json.dumps(value, default=str))
+        r.setex(key, jittered_ttl(ttl), encode_value(value))
+        _local_cache.delete(key)
         return True
-    except Exception:
+    except Exception as e:
+        _breaker.record_failure(e)
         return False
 
 
-def invalidate_user_cache():
-    """유저 관련 캐시(랭킹, 전체유저, 프로필)를 전부 삭제합니다."""
+# 락 소유자(token)일 때만 락을 해제하는 Lua 스크립트
+_RELEASE_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+def _release_fill_lock(lock_key: str, token: str):
+    r = get_redis()
+    if not r:
+        return
+    try:
+        r.eval(_RELEASE_LOCK_SCRIPT, 1, lock_key, token)
+    except Exception as e:
+        _breaker.record_failure(e)
+
+
+def _wait_for_fill(key: str):
+    """다른 워커가 채우는 값을 FILL_WAIT_TIMEOUT초까지 기다립니다. 끝내 없으면 None."""
+    deadline = time.monotonic() + FILL_WAIT_TIMEOUT
+    while time.monotonic() < deadline:
+        time.sleep(FILL_POLL_INTERVAL)
+        value = cache_get(key)
+        if value is not None:
+            return value
+    return None
+
+
+def cache_get_or_set(key: str, loader, ttl: int = USER_CACHE_TTL):
+    """
+    캐시에 값이 없으면 loader()로 계산해서 저장합니다. (single-flight)
+    - 같은 워커 안에서는 키별 락으로, 워커 사이에서는 Redis SET NX 락으로 한 곳에서만 계산합니다.
+    - 락을 얻지 못한 요청은 계산 결과가 캐시에 들어올 때까지 기다렸다가 그 값을 사용합니다.
+    - loader가 None을 반환하면 저장하지 않습니다.
+
+    Returns:
+        tuple: (값, 캐시 히트 여부)
+    """
+    value = cache_get(key)
+    if value is not None:
+        return value, True
+    if not get_redis():
+        return loader(), False
+
+    with _fill_locks[hash(key) % len(_fill_locks)]:
+        value = cache_get(key)
+        if value is not None:
+            return value, True
+
+        lock_key = f"lock:{key}"
+        token = uuid.uuid4().hex
+        acquired = cache_add(lock_key, token, FILL_LOCK_TTL)
+        if acquired is False:
+            value = _wait_for_fill(key)
+            if value is not None:
+                return value, True
+
+        try:
+            value = loader()
+            if value is not None:
+                cache_set(key, value, ttl)
+        finally:
+            if acquired:
+                _release_fill_lock(lock_key, token)
+        return value, False
+
+
+def cache_add(key: str, value: str, ttl: int):
+    """
+    키가 없을 때만 문자열 값을 저장합니다. (SET NX EX)
+
+    Returns:
+        True: 저장됨 / False: 이미 키가 있음 / None: Redis 미설정 또는 오류
+    """
+    r = get_redis()
+    if not r:
+        return None
+    try:
+        return bool(r.set(key, value, nx=True, ex=ttl))
+    except Exception as e:
+        _breaker.record_failure(e)
+        return None
+
+
+def raw_get(key: str):
+    """문자열 값을 그대로 조회합니다. (없으면 None, Redis 미설정/오류 시 False)"""
+    r = get_redis()
+    if not r:
+        return False
+    try:
+        value = r.get(key)
+        return value.decode() if isinstance(value, bytes) else value
+    except Exception as e:
+        _breaker.record_failure(e)
+        return False
+
+
+def raw_set(key: str, value: str, ttl: int):
+    """문자열 값을 TTL과 함께 저장합니다."""
+    r = get_redis()
+    if not r:
+        return False
+    try:
+        r.setex(key, ttl, value)
+        return True
+    except Exception as e:
+        _breaker.record_failure(e)
+        return False
+
+
+def cache_delete(key: str):
+    """키 하나를 삭제합니다."""
+    r = get_redis()
+    if not r:
+        return False
+    _local_cache.delete(key)
+    try:
+        r.delete(key)
+        return True
+    except Exception as e:
+        _breaker.record_failure(e)
+        return False
+
+
+# 유저 캐시 중 "전체 목록" 성격의 네임스페이스 (키 이름에 버전을 넣고, 무효화는 버전 증가로 처리)
+#   user:users:v{버전}:all
+# (랭킹은 app.leaderboard의 정렬 집합에서 바로 조회하므로 캐시하지 않음)
+USER_LIST_NAMESPACES = ('users',)
+
+
+def _namespace_version_key(namespace: str):
+    return f"user:ns:{namespace}"
+
+
+def namespaced_key(namespace: str, suffix):
+    """
+    네임스페이스의 현재 버전이 들어간 캐시 키를 반환합니다.
+    버전이 올라가면 이전 키는 더 이상 조회되지 않고 TTL로 자연 만료됩니다.
+    (버전 값도 워커 메모리 캐시를 거칩니다.)
+    """
+    r = get_redis()
+    version = 0
+    if r:
+        version_key = _namespace_version_key(namespace)
+        version = _local_cache.get(version_key)
+        if version is _MISSING:
+            try:
+                version = int(r.get(version_key) or 0)
+                _local_cache.set(version_key, version)
+            except Exception as e:
+                _breaker.record_failure(e)
+                version = 0
+    return f"user:{namespace}:v{version}:{suffix}"
+
+
+def invalidate_user_cache(*user_ids, namespaces=USER_LIST_NAMESPACES):
+    """
+    유저 관련 캐시를 무효화합니다. (키 스캔 없이 파이프라인 1번 왕복)
+    - 전달된 유저의 프로필 캐시(user:profile:{id})만 삭제
+    - 전체유저 같은 목록 캐시는 네임스페이스 버전 증가로 무효화
+    """
     r = get_redis()
     if not r:
         return
+    profile_keys = [f"user:profile:{user_id}" for user_id in set(user_ids) if user_id is not None]
+    _local_cache.delete(*profile_keys, *(_namespace_version_key(namespace) for namespace in namespaces))
+    try:
+        pipe = r.pipeline(transaction=False)
+        if profile_keys:
+            pipe.delete(*profile_keys)
+        for namespace in namespaces:
+            pipe.incr(_namespace_version_key(namespace))
+        pipe.execute()
+    except Exception as e:
+        _breaker.record_failure(e)
+
+
+# 저장된 값보다 클 때만 갱신하는 Lua 스크립트
+# (여러 워커가 순서 없이 써도 카운터 값이 뒤로 가지 않도록 보장)
+_SET_MAX_SCRIPT = """
+local current = tonumber(redis.call('GET', KEYS[1]) or '-1')
+if tonumber(ARGV[1]) > current then
+    redis.call('SET', KEYS[1], ARGV[1])
+    return 1
+end
+return 0
+"""
+
+_REPLACE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    redis.call('SET', KEYS[1], ARGV[2])
+    return 1
+end
+return 0
+"""
+
+
+def counter_get(key: str):
+    """정수 카운터 값을 조회합니다. Redis 미설정/키 없음/오류 시 None."""
+    r = get_redis()
+    if not r:
+        return None
+    try:
+        value = r.get(key)
+        return int(value) if value is not None else None
+    except Exception as e:
+        _breaker.record_failure(e)
+        return None
+
+
+def counter_set_max(key: str, value: int):
+    """카운터를 value로 갱신하되, 기존 값이 더 크면 유지합니다."""
+    r = get_redis()
+    if not r:
+        return False
+    try:
+        r.eval(_SET_MAX_SCRIPT, 1, key, int(value))
+        return True
+    except Exception as e:
+        _breaker.record_failure(e)
+        return False
+
+
+def counter_replace(key: str, expected: int, value: int):
+    """카운터가 아직 expected일 때만 value로 바꿉니다. (그 사이 다른 곳에서 바뀌었으면 유지)"""
+    r = get_redis()
+    if not r:
+        return False
     try:
-        for key in r.scan_iter("user:*"):
-            r.delete(key)
-    except Exception:
-        pass
+        return bool(r.eval(_REPLACE_SCRIPT, 1, key, int(expected), int(value)))
+    except Exception as e:
+        _breaker.record_failure(e)
+        return False
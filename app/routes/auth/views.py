@@ -65,7 +65,7 @@ def google_login():
 
             user.ranking_score = 0
             db.session.commit()
-            invalidate_user_cache()
+            invalidate_user_cache()  # 새 유저: 프로필 캐시는 없으므로 전체유저 목록만 갱신
             message = "회원가입 및 로그인 성공"
         else:
             user.profile_pic = profile_pic
@@ -119,9 +119,10 @@ def user_out():
         if not user:
             return api_response(success=False, message="유저를 찾을 수 없습니다.", status_code=404)
 
+        user_id = user.id
         db.session.delete(user)
         db.session.commit()
-        invalidate_user_cache()  # 랭킹·전체유저 캐시 갱신
+        invalidate_user_cache(user_id)  # 탈퇴 유저 프로필 + 전체유저 캐시 갱신
 
         return api_response(success=True, message="회원 탈퇴 및 모든 데이터 삭제가 완료되었습니다.")
 
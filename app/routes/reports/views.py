@@ -3,8 +3,23 @@ from flask import Blueprint, jsonify, request, current_app
 from app.models import TestReport, TestCaseResult, ApiPerformance
 from app.utils import api_response
 from app.database import db
+from app.redis_client import get_redis_status
+from app.scoring import RANKING_FORMULAS, get_active_formula, shadow_ranking_formula, apply_ranking_formula
 
 report_blueprint = Blueprint('report', __name__)
+INTERNAL_SYNC_KEY = os.getenv("INTERNAL_SYNC_KEY")
+
+
+def _check_internal_key():
+    """내부 관리용 API 보안 키 검증 (X-INTERNAL-KEY), 통과하면 None"""
+    internal_key = request.headers.get('X-INTERNAL-KEY')
+    if not internal_key:
+        return api_response(success=False, error_code=401, message="인증 키가 없습니다.", status_code=401)
+    # 키가 설정되지 않은 서버에서는 관리용 API를 열지 않음
+    if not INTERNAL_SYNC_KEY or internal_key != INTERNAL_SYNC_KEY:
+        return api_response(success=False, error_code=403, message="접근 권한이 없습니다.", status_code=403)
+    return None
+
 
 @report_blueprint.route('/report', methods=['POST'])
 def receive_test_report():
@@ -152,4 +167,80 @@ def get_report_detail(report_id):
 
     except Exception as e:
         current_app.logger.error(f"리포트 상세 조회 에러: {str(e)}")
-        return api_response(success=False, message="상세 조회 실패", status_code=500)
\ No newline at end of file
+        return api_response(success=False, message="상세 조회 실패", status_code=500)
+
+# 캐시(Redis) 연결 상태 조회 (차단기 상태 포함)
+@report_blueprint.route('/cache/status', methods=['GET'])
+def get_cache_status():
+    status = get_redis_status()
+    breaker = status["breaker"]
+    if not status["configured"]:
+        message = "Redis 미설정 - 캐시 없이 동작 중입니다."
+    elif breaker["state"] == "closed":
+        message = "Redis 캐시 정상 동작 중입니다."
+    else:
+        message = f"Redis 차단기 {breaker['state']} - {breaker['retry_in']}초 후 재연결을 시도합니다."
+    return api_response(success=True, data=status, message=message)
+
+# 랭킹 점수 공식 조회 (현재 버전 + 등록된 공식)
+@report_blueprint.route('/ranking/formula', methods=['GET'])
+def get_ranking_formula():
+    active = get_active_formula()
+    data = {
+        "active_version": active.version,
+        "formulas": [RANKING_FORMULAS[version].describe() for version in sorted(RANKING_FORMULAS)]
+    }
+    return api_response(success=True, data=data, message=f"현재 랭킹 공식은 v{active.version}입니다.")
+
+# 후보 공식 섀도 비교 (점수를 쓰지 않고 순위 변동만 계산)
+@report_blueprint.route('/ranking/formula/shadow', methods=['POST'])
+def shadow_ranking_formula_view():
+    denied = _check_internal_key()
+    if denied:
+        return denied
+    try:
+        data = request.get_json(silent=True) or {}
+        version = data.get('version')
+        if version not in RANKING_FORMULAS:
+            return api_response(success=False, error_code=400, message="등록되지 않은 공식 버전입니다.", status_code=400)
+        try:
+            top_n = int(data.get('top_n', 100))
+        except (TypeError, ValueError):
+            top_n = 0
+        if top_n < 1:
+            return api_response(success=False, error_code=400, message="top_n은 1 이상의 정수여야 합니다.", status_code=400)
+
+        report = shadow_ranking_formula(version, top_n=top_n)
+        current_app.logger.info(
+            f"🧪 [랭킹공식 섀도] v{report['live_version']} vs v{version}: "
+            f"유저 {report['users']}명, 평균 순위 변동 {report.get('mean_abs_rank_shift', 0)}"
+        )
+        return api_response(success=True, data=report, message="후보 공식 비교가 완료되었습니다.")
+
+    except Exception as e:
+        current_app.logger.error(f"❌ 랭킹 공식 섀도 비교 에러: {str(e)}")
+        return api_response(success=False, error_code=500, message="공식 비교 중 오류가 발생했습니다.", status_code=500)
+
+# 공식 적용 (버전 변경 + 전체 점수 일괄 재계산)
+@report_blueprint.route('/ranking/formula/apply', methods=['POST'])
+def apply_ranking_formula_view():
+    denied = _check_internal_key()
+    if denied:
+        return denied
+    try:
+        data = request.get_json(silent=True) or {}
+        version = data.get('version')
+        if version not in RANKING_FORMULAS:
+            return api_response(success=False, error_code=400, message="등록되지 않은 공식 버전입니다.", status_code=400)
+
+        summary = apply_ranking_formula(version)
+        current_app.logger.info(
+            f"🧮 [랭킹공식 적용] v{summary['previous_version']} -> v{summary['version']}: "
+            f"유저 {summary['updated_users']}명 갱신 ({summary['elapsed_ms']}ms)"
+        )
+        return api_response(success=True, data=summary, message=f"랭킹 공식 v{version}을 적용했습니다.")
+
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"❌ 랭킹 공식 적용 에러: {str(e)}")
+        return api_response(success=False, error_code=500, message="공식 적용 중 오류가 발생했습니다.", status_code=500)
@@ -0,0 +1,277 @@
+"""
+텍스트 카탈로그 인메모리 캐시
+
+글(TypingText)은 add_text / delete_text를 통해서만 바뀌므로,
+워커 프로세스마다 전체 카탈로그를 메모리에 올려두고 "카탈로그 버전"으로 유효성을 판단합니다.
+
+- 버전의 원본은 DB(app_state 테이블)에 있고, 쓰기 트랜잭션 안에서 1씩 증가합니다.
+- Redis가 설정되어 있으면 커밋 후 버전을 Redis에 미러링하여, 읽기 시 DB 대신 Redis로 버전을 확인합니다.
+  Redis 값은 항상 최댓값으로만 갱신하며, 미러링에 실패한 워커는 Redis가 따라잡을 때까지 DB 버전을 사용합니다.
+  다른 워커도 CATALOG_VERSION_RECHECK초마다 DB 버전을 확인해 Redis가 뒤처져 있으면 올려 둡니다.
+- 읽기 요청은 현재 버전과 메모리 스냅샷의 버전이 다를 때만 DB에서 다시 적재합니다.
+"""
+import hashlib
+import json
+import random
+import threading
+import time
+from array import array
+from bisect import bisect_right
+
+from sqlalchemy import update
+
+from app.database import db
+from app.models import AppState, TextChange, TypingText
+from app.redis_client import get_redis, counter_get, counter_set_max, counter_replace
+
+CATALOG_VERSION_KEY = 'text_catalog_version'
+REDIS_CATALOG_VERSION_KEY = 'text:catalog:version'
+# Redis 버전을 그대로 믿는 최대 시간 (초). 지나면 DB 버전과 한 번 맞춰 봅니다.
+CATALOG_VERSION_RECHECK = 5.0
+
+# 이 워커가 커밋했지만 Redis에 미러링하지 못한 버전 (None이면 없음)
+_unpublished_version = None
+_next_recheck = 0.0
+
+_lock = threading.Lock()
+_snapshot = None
+
+_sampler_lock = threading.Lock()
+_sampler = None
+
+
+class CatalogSnapshot:
+    """특정 카탈로그 버전 시점의 전체 글 목록 (id 오름차순)"""
+
+    def __init__(self, version, texts):
+        self.version = version
+        self.texts = texts
+        self.ids = [t["id"] for t in texts]
+        self.by_id = {t["id"]: t for t in texts}
+        self.by_genre = {}
+        for t in texts:
+            self.by_genre.setdefault(t["genre"], []).append(t)
+        self.genre_ids = {genre: [t["id"] for t in items] for genre, items in self.by_genre.items()}
+        self.etags = {t["id"]: text_etag(t) for t in texts}
+
+    def list_texts(self, genre=None, after_id=None, limit=None):
+        """id 기준 키셋 방식으로 after_id 다음부터 limit개를 반환합니다."""
+        if genre:
+            texts = self.by_genre.get(genre, [])
+            ids = self.genre_ids.get(genre, [])
+        else:
+            texts, ids = self.texts, self.ids
+
+        start = bisect_right(ids, after_id) if after_id is not None else 0
+        end = start + limit if limit is not None else len(texts)
+        return texts[start:end]
+
+    def get_text(self, text_id):
+        return self.by_id.get(text_id)
+
+    def get_etag(self, text_id):
+        return self.etags.get(text_id)
+
+
+def serialize_text(t):
+    """TypingText 객체를 카탈로그 캐시에 저장하는 dict 형태로 변환합니다."""
+    return {
+        "id": t.id,
+        "genre": t.genre,
+        "title": t.title,
+        "author": t.author,
+        "content": t.content,
+        "image_url": t.image_url
+    }
+
+
+def text_etag(t):
+    """글 내용(serialize_text 결과)으로 만든 강한 ETag 값"""
+    raw = json.dumps(t, sort_keys=True, ensure_ascii=False).encode()
+    return f"text-{t['id']}-{hashlib.blake2b(raw, digest_size=12).hexdigest()}"
+
+
+def listing_etag(version, args):
+    """카탈로그 버전 + 쿼리 파라미터로 만든 목록 ETag 값"""
+    raw = json.dumps(sorted(args), ensure_ascii=False).encode()
+    return f"catalog-{version}-{hashlib.blake2b(raw, digest_size=8).hexdigest()}"
+
+
+def _read_db_version():
+    value = db.session.query(AppState.value).filter(AppState.key == CATALOG_VERSION_KEY).scalar()
+    return value or 0
+
+
+def get_catalog_version():
+    """
+    현재 카탈로그 버전을 반환합니다.
+    Redis에 미러링된 값이 있으면 Redis를, 없으면 DB를 조회합니다.
+    이 워커의 미러링이 실패했거나 확인 주기가 지났으면 DB도 읽어 더 큰 값을 사용하고 Redis를 따라잡게 합니다.
+    """
+    global _unpublished_version, _next_recheck
+    version = counter_get(REDIS_CATALOG_VERSION_KEY)
+    now = time.monotonic()
+    if version is not None and _unpublished_version is None and now < _next_recheck:
+        return version
+
+    db_version = _read_db_version()
+    if version is None or db_version > version:
+        if counter_set_max(REDIS_CATALOG_VERSION_KEY, db_version):
+            _unpublished_version = None
+    elif _unpublished_version is not None and version >= _unpublished_version:
+        _unpublished_version = None
+    _next_recheck = now + CATALOG_VERSION_RECHECK
+    return max(db_version, version or 0)
+
+
+def bump_catalog_version():
+    """
+    카탈로그 버전을 1 증가시키고 새 버전을 반환합니다.
+    글 추가/삭제와 같은 트랜잭션 안에서 commit 전에 호출해야 합니다.
+    """
+    updated = db.session.execute(
+        update(AppState)
+        .where(AppState.key == CATALOG_VERSION_KEY)
+        .values(value=AppState.value + 1)
+    ).rowcount
+
+    if not updated:
+        db.session.add(AppState(key=CATALOG_VERSION_KEY, value=1))
+        db.session.flush()
+
+    return _read_db_version()
+
+
+def record_text_change(text_id, op):
+    """
+    카탈로그 버전을 올리고 변경 로그(add / delete 툼스톤)를 남긴 뒤 새 버전을 반환합니다.
+    글 추가/삭제와 같은 트랜잭션 안에서 commit 전에 호출해야 합니다.
+    """
+    version = bump_catalog_version()
+    db.session.add(TextChange(version=version, text_id=text_id, op=op))
+    return version
+
+
+def get_changes_since(since, limit):
+    """
+    since 버전 이후의 변경을 글 단위로 합쳐서 반환합니다. (같은 글은 마지막 변경만 유효)
+
+    Returns:
+        tuple: (latest_ops, last_version, has_more)
+            - latest_ops: {text_id: 'add' | 'delete'}
+            - last_version: 이번 응답이 반영한 마지막 버전 (다음 요청의 since)
+            - has_more: limit을 넘어 남은 변경이 있는지 여부
+    """
+    changes = TextChange.query.filter(TextChange.version > since)\
+        .order_by(TextChange.version.asc(), TextChange.id.asc())\
+        .limit(limit + 1).all()
+
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+    if has_more:
+        # 같은 버전의 변경이 페이지 경계에서 잘리지 않도록 마지막 버전은 다음 페이지로 넘깁니다.
+        boundary = changes[-1].version
+        if changes[0].version != boundary:
+            changes = [c for c in changes if c.version != boundary]
+        else:
+            # 한 버전의 변경이 limit보다 많으면 해당 버전 전체를 한 번에 반환합니다.
+            changes = TextChange.query.filter(TextChange.version == boundary)\
+                .order_by(TextChange.id.asc()).all()
+
+    latest_ops = {}
+    for c in changes:
+        latest_ops[c.text_id] = c.op
+    last_version = changes[-1].version if changes else since
+    return latest_ops, last_version, has_more
+
+
+def publish_catalog_version(version):
+    """
+    커밋된 새 버전을 다른 워커에 알리고, 현재 워커의 스냅샷을 비웁니다.
+    글 추가/삭제 commit 직후에 호출합니다.
+    """
+    global _snapshot, _sampler, _unpublished_version
+    if not counter_set_max(REDIS_CATALOG_VERSION_KEY, version):
+        # Redis가 뒤처진 동안에는 이 워커부터 DB 버전을 읽고, 다음 조회 때 다시 올려 봅니다.
+        _unpublished_version = max(_unpublished_version or 0, version)
+    with _lock:
+        _snapshot = None
+    with _sampler_lock:
+        _sampler = None
+
+
+def get_catalog():
+    """현재 버전과 일치하는 카탈로그 스냅샷을 반환합니다. (버전이 바뀐 경우에만 DB 재적재)"""
+    global _snapshot
+    version = get_catalog_version()
+
+    snapshot = _snapshot
+    if snapshot is not None and snapshot.version == version:
+        return snapshot
+
+    with _lock:
+        snapshot = _snapshot
+        if snapshot is None or snapshot.version != version:
+            # 버전을 먼저 읽고 행을 적재하므로, 스냅샷이 실제보다 새 버전으로 표시되는 일은 없습니다.
+            texts = TypingText.query.order_by(TypingText.id.asc()).all()
+            snapshot = CatalogSnapshot(version, [serialize_text(t) for t in texts])
+            _snapshot = snapshot
+    return snapshot
+
+
+def sync_catalog_version():
+    """
+    앱(워커) 시작 시 Redis의 버전을 DB 값으로 맞춥니다.
+    - Redis가 DB보다 뒤처져 있으면 최댓값 갱신으로 올립니다. (동시에 도는 publish보다 뒤로 가지 않음)
+    - Redis가 DB보다 앞서 있으면 DB가 초기화된 경우이므로 DB 값으로 내립니다.
+      Redis를 먼저 읽고 DB를 읽으므로, 커밋 후에 미러링되는 값이 DB보다 클 수는 없습니다.
+      그 사이 다른 워커가 값을 바꿨다면 비교 후 교체가 실패하여 그대로 둡니다.
+    """
+    if not get_redis():
+        return
+    redis_version = counter_get(REDIS_CATALOG_VERSION_KEY)
+    db_version = _read_db_version()
+    if redis_version is None or db_version > redis_version:
+        counter_set_max(REDIS_CATALOG_VERSION_KEY, db_version)
+    elif db_version < redis_version:
+        counter_replace(REDIS_CATALOG_VERSION_KEY, redis_version, db_version)
+
+
+class TextSampler:
+    """
+    랜덤 추출용 글 ID 배열 (카탈로그 버전 단위로 갱신)
+
+    ORDER BY RAND() 전체 정렬 대신, 살아있는 id만 담은 compact 배열에서
+    limit개를 O(limit)으로 뽑은 뒤 해당 id만 PK로 조회합니다.
+    """
+
+    def __init__(self, version, rows):
+        self.version = version
+        self.ids = array('q')
+        self.genre_ids = {}
+        for text_id, genre in rows:
+            self.ids.append(text_id)
+            self.genre_ids.setdefault(genre, array('q')).append(text_id)
+
+    def sample(self, limit, genre=None):
+        """서로 다른 id를 최대 limit개 무작위로 반환합니다."""
+        ids = self.genre_ids.get(genre, array('q')) if genre else self.ids
+        return random.sample(ids, max(0, min(limit, len(ids))))
+
+
+def get_sampler():
+    """현재 카탈로그 버전과 일치하는 TextSampler를 반환합니다. (id, genre 컬럼만 조회)"""
+    global _sampler
+    version = get_catalog_version()
+
+    sampler = _sampler
+    if sampler is not None and sampler.version == version:
+        return sampler
+
+    with _sampler_lock:
+        sampler = _sampler
+        if sampler is None or sampler.version != version:
+            rows = db.session.query(TypingText.id, TypingText.genre).order_by(TypingText.id.asc()).all()
+            sampler = TextSampler(version, rows)
+            _sampler = sampler
+    return sampler
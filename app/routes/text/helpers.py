@@ -1,9 +1,22 @@
 """
 타이핑 결과 저장 관련 헬퍼 함수들
 """
-from app.models import User, TypingResult
+from datetime import datetime
+
+from app.models import User, TypingText, TypingResult, PersonalBest, HallOfFame, GenreBest, ALL_GENRES, KST, FORM_ALPHA, \
+    FORM_DECAY_PER_SECOND, FORM_EPOCH
 from app.database import db
-from sqlalchemy import func
+from app.periods import apply_results_to_periods
+from app.scoring import active_score_sql, active_version_sql
+from app.leaderboard import record_score_changes
+from sqlalchemy import func, update, delete, insert, select, case, literal, Float
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import FunctionElement
+from sqlalchemy.orm import object_session
+from sqlalchemy.exc import IntegrityError
+
+# 글별 명예의 전당에 유지하는 최대 인원 (/text/results/best?n= 의 상한)
+HALL_OF_FAME_SIZE = 10
 
 
 def validate_result_data(data):
@@ -42,9 +55,137 @@ def validate_result_data(data):
         return False, f"수치 데이터 형식이 올바르지 않습니다: {str(e)}", None
 
 
+def greatest(column, new_value):
+    """두 값 중 큰 값 (MySQL GREATEST / SQLite MAX 대신 두 DB 모두에서 동작하는 CASE 사용)"""
+    return case((column < new_value, new_value), else_=column)
+
+
+class form_seconds(FunctionElement):
+    """DB에 저장된 (KST) 시각 컬럼의 FORM_EPOCH 기준 경과 초 (models._form_seconds의 SQL 버전)"""
+    type = Float()
+    name = 'form_seconds'
+    inherit_cache = True
+
+
+_FORM_EPOCH_TEXT = FORM_EPOCH.strftime('%Y-%m-%d %H:%M:%S')
+
+
+@compiles(form_seconds)
+def _compile_form_seconds(element, compiler, **kw):
+    return f"(TIMESTAMPDIFF(MICROSECOND, '{_FORM_EPOCH_TEXT}', {compiler.process(element.clauses, **kw)}) / 1000000.0)"
+
+
+@compiles(form_seconds, 'sqlite')
+def _compile_form_seconds_sqlite(element, compiler, **kw):
+    return f"((julianday({compiler.process(element.clauses, **kw)}) - julianday('{_FORM_EPOCH_TEXT}')) * 86400.0)"
+
+
+def form_rating_log(form_cpm, form_accuracy):
+    """calculate_form_key의 ln(max(폼 점수, 1))을 SQL 식으로 만듭니다."""
+    rating = form_cpm * form_accuracy / 100.0
+    return func.ln(case((rating > 1.0, rating), else_=1.0))
+
+
+def form_ewma(values, alpha=FORM_ALPHA):
+    """
+    값들을 순서대로 지수이동평균에 넣은 결과를 닫힌 식으로 표현합니다.
+    기존 평균 f에 대해 결과는 f * decay + contribution 이고,
+    첫 기록이면 (기존 평균 없이) 첫 값에서 시작한 seeded 입니다.
+
+    Returns:
+        tuple: (decay, contribution, seeded)
+    """
+    decay, contribution = 1.0, 0.0
+    for value in values:
+        decay *= 1 - alpha
+        contribution = contribution * (1 - alpha) + alpha * value
+    seeded = values[0]
+    for value in values[1:]:
+        seeded = seeded * (1 - alpha) + alpha * value
+    return decay, contribution, seeded
+
+
+def apply_user_stats_delta(session, user_id, count, sum_cpm, sum_wpm, sum_accuracy, best_cpm, best_wpm, max_combo,
+                           cpms=(), accuracies=()):
+    """
+    결과 count개의 합계/최고값을 유저 통계에 한 번의 UPDATE 문으로 더합니다.
+    랭킹 점수 / 현재 폼 / 폼 정렬 키도 같은 UPDATE 안에서 바뀐 값으로 계산합니다. (결과 1개 저장과 묶음 저장 모두 이 함수를 사용)
+
+    Args:
+        session: 사용할 DB 세션
+        user_id: 유저 ID
+        count: 더할 결과 개수
+        sum_cpm / sum_wpm / sum_accuracy: 결과들의 합계
+        best_cpm / best_wpm / max_combo: 결과들 중 최고값
+        cpms / accuracies: 저장 순서대로의 CPM / 정확도 (현재 폼 지수이동평균용, 비어 있으면 폼은 그대로)
+    """
+    # 평균값 계산 (누적 합계 + 새 합계) / (기존 횟수 + 새 개수)
+    def calculate_average(total_column, new_sum):
+        return func.round((total_column + new_sum) / (User.play_count + float(count)), 2)
+
+    # 현재 폼: 기존 평균에 감쇠를 곱하고 새 값을 더하는 O(1) 갱신 (첫 기록이면 첫 값에서 시작)
+    def moving_average(form_column, values):
+        decay, contribution, seeded = form_ewma(values)
+        return case((User.play_count == 0, seeded), else_=form_column * decay + contribution)
+
+    form_values = []
+    if cpms:
+        # 쉰 기간만큼 기존 폼을 먼저 감쇠시킨 뒤 새 판을 섞습니다. (폼 점수 = form_cpm * 정확도 이므로 form_cpm에만 곱함)
+        # 감쇠 계수 exp(-감쇠율 * 쉰 시간)과 폼 정렬 키도 같은 UPDATE 안에서 계산합니다.
+        now = datetime.now(KST)
+        now_seconds = (now - FORM_EPOCH).total_seconds()
+        idle = now_seconds - form_seconds(User.form_played_at)
+        idle_decay = func.coalesce(func.exp(case((idle > 0, -FORM_DECAY_PER_SECOND * idle), else_=0.0)), 1.0)
+        new_form_cpm = moving_average(User.form_cpm * idle_decay, cpms)
+        new_form_accuracy = moving_average(User.form_accuracy, accuracies)
+        form_values = [
+            (User.form_key, form_rating_log(new_form_cpm, new_form_accuracy) + FORM_DECAY_PER_SECOND * now_seconds),
+            (User.form_cpm, new_form_cpm),
+            (User.form_accuracy, new_form_accuracy),
+            (User.form_played_at, now),
+        ]
+
+    # 랭킹 점수: 아래에서 바뀔 평균/최고 기록/판수를 기존 컬럼 + 증분 식으로 넣어, app_state의 현재 공식 버전으로 계산
+    ranking_score = active_score_sql(
+        greatest(User.best_cpm, best_cpm),
+        calculate_average(User.total_accuracy, sum_accuracy),
+        calculate_average(User.total_cpm, sum_cpm),
+        greatest(User.max_combo, max_combo),
+        User.play_count + count
+    )
+
+    # MySQL은 SET 절을 왼쪽부터 평가하므로, 점수 -> 폼 정렬 키 -> 폼/평균 -> 합계 -> play_count 순서로 둡니다.
+    # (각 식은 자기보다 뒤에서 바뀌는 컬럼만 참조하므로 SQLite와 결과가 같음)
+    session.execute(
+        update(User)
+        .where(User.id == user_id)
+        .ordered_values(
+            (User.ranking_score, ranking_score),
+            (User.formula_version, active_version_sql()),
+            *form_values,
+            (User.avg_accuracy, calculate_average(User.total_accuracy, sum_accuracy)),
+            (User.avg_cpm, calculate_average(User.total_cpm, sum_cpm)),
+            (User.avg_wpm, calculate_average(User.total_wpm, sum_wpm)),
+            (User.total_accuracy, User.total_accuracy + sum_accuracy),
+            (User.total_cpm, User.total_cpm + sum_cpm),
+            (User.total_wpm, User.total_wpm + sum_wpm),
+            (User.max_combo, greatest(User.max_combo, max_combo)),
+            (User.best_cpm, greatest(User.best_cpm, best_cpm)),
+            (User.best_wpm, greatest(User.best_wpm, best_wpm)),
+            (User.play_count, User.play_count + count),
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+
 def update_user_statistics(user, cpm, wpm, accuracy, combo):
     """
     사용자 통계 업데이트 (평균값 계산 및 최고 기록 갱신)
+
+    평균은 누적 합계(total_*) / play_count 로 계산하여 반올림 오차가 쌓이지 않습니다.
+    평균/합계/최고 기록/플레이 횟수/랭킹 점수는 DB에서 한 번의 UPDATE 문으로 계산하므로,
+    같은 유저의 결과가 동시에 저장되어도 증가분이 유실되지 않습니다.
+    (UPDATE 이후에는 응답/리더보드용으로 바뀐 값을 한 번 읽기만 합니다.)
     
     Args:
         user: User 모델 인스턴스
@@ -58,40 +199,24 @@ def update_user_statistics(user, cpm, wpm, accuracy, combo):
             - is_new_combo_record: 콤보 신기록 여부 (bool)
             - updated_fields: 업데이트된 필드 목록 (list)
     """
-    # 플레이 횟수 증가
-    old_count = user.play_count
-    user.play_count += 1
-    new_count = user.play_count
-    
-    # 평균값 계산 헬퍼 함수
-    def calculate_average(old_avg, old_count, new_value, new_count):
-        """평균값 계산"""
-        return round(((old_avg * old_count) + new_value) / new_count, 2)
-    
-    # 평균값 갱신
-    user.avg_accuracy = calculate_average(user.avg_accuracy, old_count, accuracy, new_count)
-    user.avg_cpm = calculate_average(user.avg_cpm, old_count, cpm, new_count)
-    user.avg_wpm = calculate_average(user.avg_wpm, old_count, wpm, new_count)
-    
-    # 최고 기록 갱신
-    is_new_combo_record = False
+    session = object_session(user) or db.session
+
+    # 최고 기록 갱신 여부 (응답 표시용, 조회 시점 값 기준)
+    is_new_combo_record = combo > user.max_combo
     updated_fields = []
-    
-    if combo > user.max_combo:
-        user.max_combo = combo
-        is_new_combo_record = True
+    if is_new_combo_record:
         updated_fields.append('max_combo')
-    
     if cpm > user.best_cpm:
-        user.best_cpm = cpm
         updated_fields.append('best_cpm')
-    
     if wpm > user.best_wpm:
-        user.best_wpm = wpm
         updated_fields.append('best_wpm')
-    
-    # 랭킹 점수 갱신
-    user.update_ranking_score()
+
+    apply_user_stats_delta(session, user.id, 1, cpm, wpm, accuracy, cpm, wpm, combo,
+                           cpms=[cpm], accuracies=[accuracy])
+
+    # 바뀐 값 읽기 (랭킹 점수는 커밋 시 리더보드에 반영)
+    session.refresh(user)
+    record_score_changes(session, {user.id: user.ranking_score})
     
     return {
         'is_new_combo_record': is_new_combo_record,
@@ -99,57 +224,73 @@ def update_user_statistics(user, cpm, wpm, accuracy, combo):
     }
 
 
-def recalculate_user_statistics(user_id):
+def recalculate_user_statistics(user_id, removed_result):
     """
-    Result 삭제 후 유저 통계를 효율적으로 재계산합니다.
-    SQL 집계 함수(COUNT, AVG, MAX)를 활용하여 DB 레벨에서 계산하여
-    모든 데이터를 메모리로 가져오지 않고도 정확한 통계를 산출합니다.
+    Result 삭제 후 유저 통계를 갱신합니다.
+    누적 합계에서 삭제된 결과 값을 빼서 평균을 O(1)로 다시 계산하고,
+    최고 기록은 삭제된 값이 최고였던 경우에만 (user_id, 컬럼) 인덱스를 타는 MAX 조회로 복구합니다.
+    결과 삭제를 flush한 뒤 호출해야 합니다.
     
     Args:
         user_id: 재계산할 유저 ID
+        removed_result: 삭제된 TypingResult 인스턴스
         
     Returns:
-        dict: 재계산된 통계 정보
-    """
-    # SQL 집계 함수를 활용한 효율적인 통계 계산
-    # 단일 쿼리로 모든 통계를 한 번에 계산 (O(1) 메모리 사용)
-    stats = db.session.query(
-        func.count(TypingResult.id).label('play_count'),
-        func.avg(TypingResult.accuracy).label('avg_accuracy'),
-        func.avg(TypingResult.cpm).label('avg_cpm'),
-        func.avg(TypingResult.wpm).label('avg_wpm'),
-        func.max(TypingResult.cpm).label('best_cpm'),
-        func.max(TypingResult.wpm).label('best_wpm'),
-        func.max(TypingResult.combo).label('max_combo')
-    ).filter(
-        TypingResult.user_id == user_id
-    ).first()
-    
+        dict: 재계산된 통계 정보 (유저가 없으면 None)
+    """
     user = User.query.get(user_id)
     if not user:
         return None
+
+    # 남은 기록이 없으면 0으로 초기화 (실수 합계의 잔여 오차 방지)
+    def subtract(total_column, value):
+        return case((User.play_count > 1, total_column - value), else_=0)
+
+    def calculate_average(total_column, value):
+        return case(
+            (User.play_count > 1, func.round((total_column - value) / (User.play_count - 1.0), 2)),
+            else_=0
+        )
+
+    # SET 절 순서는 update_user_statistics와 같은 이유로 평균 -> 합계 -> play_count
+    db.session.execute(
+        update(User)
+        .where(User.id == user_id)
+        .ordered_values(
+            (User.avg_accuracy, calculate_average(User.total_accuracy, removed_result.accuracy)),
+            (User.avg_cpm, calculate_average(User.total_cpm, removed_result.cpm)),
+            (User.avg_wpm, calculate_average(User.total_wpm, removed_result.wpm)),
+            (User.total_accuracy, subtract(User.total_accuracy, removed_result.accuracy)),
+            (User.total_cpm, subtract(User.total_cpm, removed_result.cpm)),
+            (User.total_wpm, subtract(User.total_wpm, removed_result.wpm)),
+            (User.play_count, case((User.play_count > 0, User.play_count - 1), else_=0)),
+        )
+        .execution_options(synchronize_session=False)
+    )
+    db.session.refresh(user)
+
+    # 삭제된 값이 최고 기록이었던 필드만 남은 기록의 MAX로 복구
+    for best_field, column in (('best_cpm', TypingResult.cpm),
+                               ('best_wpm', TypingResult.wpm),
+                               ('max_combo', TypingResult.combo)):
+        if getattr(removed_result, column.key) >= getattr(user, best_field):
+            best = db.session.query(func.max(column)).filter(TypingResult.user_id == user_id).scalar()
+            setattr(user, best_field, int(best or 0))
     
-    # 결과가 없으면 (모든 Result 삭제된 경우) 기본값으로 초기화
-    if stats.play_count == 0:
-        user.play_count = 0
-        user.avg_accuracy = 0.0
-        user.avg_cpm = 0.0
-        user.avg_wpm = 0.0
-        user.best_cpm = 0
-        user.best_wpm = 0
-        user.max_combo = 0
-    else:
-        # SQL 집계 결과를 유저 객체에 반영
-        user.play_count = stats.play_count
-        user.avg_accuracy = round(float(stats.avg_accuracy or 0), 2)
-        user.avg_cpm = round(float(stats.avg_cpm or 0), 2)
-        user.avg_wpm = round(float(stats.avg_wpm or 0), 2)
-        user.best_cpm = int(stats.best_cpm or 0)
-        user.best_wpm = int(stats.best_wpm or 0)
-        user.max_combo = int(stats.max_combo or 0)
-    
-    # 랭킹 점수 재계산
-    user.update_ranking_score()
+    # 랭킹 점수 재계산 (저장과 같이 app_state의 현재 공식 버전으로 DB에서 계산, 커밋 시 리더보드 반영)
+    db.session.flush()
+    db.session.execute(
+        update(User)
+        .where(User.id == user_id)
+        .values(
+            ranking_score=active_score_sql(User.best_cpm, User.avg_accuracy, User.avg_cpm,
+                                           User.max_combo, User.play_count),
+            formula_version=active_version_sql()
+        )
+        .execution_options(synchronize_session=False)
+    )
+    db.session.refresh(user)
+    record_score_changes(db.session, {user.id: user.ranking_score})
     
     return {
         'play_count': user.play_count,
@@ -162,3 +303,371 @@ def recalculate_user_statistics(user_id):
         'ranking_score': user.ranking_score
     }
 
+
+def _personal_best_values(result):
+    """TypingResult에서 personal_bests 행에 저장할 값을 추출합니다."""
+    return {
+        'result_id': result.id,
+        'cpm': result.cpm,
+        'wpm': result.wpm,
+        'accuracy': result.accuracy,
+        'combo': result.combo,
+        'created_at': result.created_at
+    }
+
+
+def upsert_personal_best(result):
+    """
+    새 결과가 해당 유저-글의 최고 기록보다 높으면 personal_bests를 갱신합니다.
+    결과가 flush되어 id가 생긴 뒤, 같은 트랜잭션 안에서 호출해야 합니다.
+
+    Args:
+        result: 방금 저장한 TypingResult 인스턴스
+
+    Returns:
+        bool: 개인 최고 기록 갱신 여부
+    """
+    values = _personal_best_values(result)
+
+    # 기존 기록보다 높을 때만 덮어쓰는 조건부 UPDATE (동시 저장 시에도 낮은 기록으로 되돌아가지 않음)
+    conditional_update = update(PersonalBest).where(
+        PersonalBest.user_id == result.user_id,
+        PersonalBest.text_id == result.text_id,
+        PersonalBest.cpm < result.cpm
+    ).values(**values).execution_options(synchronize_session=False)
+
+    if db.session.execute(conditional_update).rowcount:
+        return True
+
+    exists = db.session.query(PersonalBest.result_id).filter_by(
+        user_id=result.user_id, text_id=result.text_id
+    ).first()
+    if exists:
+        return False
+
+    # 첫 기록: 다른 요청이 먼저 만들었다면 조건부 UPDATE로 다시 비교합니다.
+    try:
+        with db.session.begin_nested():
+            db.session.execute(insert(PersonalBest).values(
+                user_id=result.user_id, text_id=result.text_id, **values
+            ))
+        return True
+    except IntegrityError:
+        return bool(db.session.execute(conditional_update).rowcount)
+
+
+def repair_personal_best(result):
+    """
+    삭제할 결과가 최고 기록이라면 남은 기록 중 최고 기록으로 personal_bests를 다시 채웁니다.
+    결과를 삭제하기 전에, 같은 트랜잭션 안에서 호출해야 합니다. (인덱스 ix_typing_results_user_text_cpm 사용)
+
+    Args:
+        result: 삭제할 TypingResult 인스턴스
+
+    Returns:
+        bool: 최고 기록이 교체(또는 삭제)되었는지 여부
+    """
+    best_result_id = db.session.query(PersonalBest.result_id).filter_by(
+        user_id=result.user_id, text_id=result.text_id
+    ).scalar()
+    if best_result_id != result.id:
+        return False
+
+    db.session.execute(
+        delete(PersonalBest)
+        .where(PersonalBest.user_id == result.user_id, PersonalBest.text_id == result.text_id)
+        .execution_options(synchronize_session=False)
+    )
+
+    next_best = TypingResult.query.filter(
+        TypingResult.user_id == result.user_id,
+        TypingResult.text_id == result.text_id,
+        TypingResult.id != result.id
+    ).order_by(TypingResult.cpm.desc(), TypingResult.id.asc()).first()
+
+    if next_best:
+        db.session.execute(insert(PersonalBest).values(
+            user_id=result.user_id, text_id=result.text_id, **_personal_best_values(next_best)
+        ))
+    return True
+
+
+def _hall_of_fame_order():
+    """명예의 전당 정렬 기준 (cpm 내림차순, 동점이면 먼저 세운 기록)"""
+    return HallOfFame.cpm.desc(), HallOfFame.result_id.asc()
+
+
+def update_hall_of_fame(result):
+    """
+    개인 최고 기록이 갱신된 결과가 글의 상위 HALL_OF_FAME_SIZE명 안에 들면 명예의 전당에 반영합니다.
+    upsert_personal_best가 True를 반환한 경우에만 호출합니다.
+
+    Args:
+        result: 방금 저장한 TypingResult 인스턴스
+    """
+    values = _personal_best_values(result)
+
+    # 이미 명예의 전당에 있는 유저는 자기 기록만 올립니다.
+    if db.session.execute(
+        update(HallOfFame).where(
+            HallOfFame.text_id == result.text_id,
+            HallOfFame.user_id == result.user_id,
+            HallOfFame.cpm < result.cpm
+        ).values(**values).execution_options(synchronize_session=False)
+    ).rowcount:
+        return
+
+    entry_count, min_cpm = db.session.query(
+        func.count(HallOfFame.user_id), func.min(HallOfFame.cpm)
+    ).filter(HallOfFame.text_id == result.text_id).one()
+
+    # 자리가 꽉 찼다면 꼴찌보다 높아야 들어갑니다. (동점은 먼저 세운 기록 우선)
+    if entry_count >= HALL_OF_FAME_SIZE and result.cpm <= min_cpm:
+        return
+
+    try:
+        with db.session.begin_nested():
+            db.session.execute(insert(HallOfFame).values(
+                text_id=result.text_id, user_id=result.user_id, **values
+            ))
+    except IntegrityError:
+        # 같은 유저가 이미 등록되어 있음 (동시 저장) -> 위 조건부 UPDATE가 처리할 몫
+        return
+
+    # 정원을 넘긴 꼴찌들을 내보냅니다.
+    overflow = db.session.query(HallOfFame.user_id)\
+        .filter(HallOfFame.text_id == result.text_id)\
+        .order_by(*_hall_of_fame_order())\
+        .offset(HALL_OF_FAME_SIZE).all()
+    if overflow:
+        db.session.execute(
+            delete(HallOfFame).where(
+                HallOfFame.text_id == result.text_id,
+                HallOfFame.user_id.in_([row.user_id for row in overflow])
+            ).execution_options(synchronize_session=False)
+        )
+
+
+def rebuild_hall_of_fame(text_id):
+    """
+    글의 명예의 전당을 personal_bests 상위 HALL_OF_FAME_SIZE명으로 다시 채웁니다.
+    (인덱스 ix_personal_bests_text_cpm 사용, 최대 HALL_OF_FAME_SIZE행)
+    """
+    db.session.execute(
+        delete(HallOfFame).where(HallOfFame.text_id == text_id)
+        .execution_options(synchronize_session=False)
+    )
+    top = select(
+        PersonalBest.text_id, PersonalBest.user_id, PersonalBest.result_id, PersonalBest.cpm,
+        PersonalBest.wpm, PersonalBest.accuracy, PersonalBest.combo, PersonalBest.created_at
+    ).where(PersonalBest.text_id == text_id)\
+        .order_by(PersonalBest.cpm.desc(), PersonalBest.result_id.asc())\
+        .limit(HALL_OF_FAME_SIZE)
+    db.session.execute(insert(HallOfFame).from_select(
+        ['text_id', 'user_id', 'result_id', 'cpm', 'wpm', 'accuracy', 'combo', 'created_at'], top
+    ))
+
+
+def repair_hall_of_fame(result):
+    """
+    삭제할 결과가 명예의 전당에 올라 있다면 명예의 전당을 다시 채웁니다.
+    repair_personal_best 다음, 결과를 삭제하기 전에 호출합니다.
+
+    Args:
+        result: 삭제할 TypingResult 인스턴스
+    """
+    listed = db.session.query(HallOfFame.user_id).filter_by(
+        text_id=result.text_id, user_id=result.user_id, result_id=result.id
+    ).first()
+    if listed:
+        rebuild_hall_of_fame(result.text_id)
+
+
+def upsert_genre_bests(user_id, genre, best_cpm, best_wpm, best_accuracy, max_combo):
+    """
+    유저의 장르별 / 전체 장르(ALL_GENRES) 최고 기록을 새 값과 비교해 올립니다. (장르당 UPDATE 1번, 첫 기록이면 INSERT)
+    결과를 저장하는 트랜잭션 안에서 호출합니다.
+    """
+    for target in (genre, ALL_GENRES):
+        conditional_update = update(GenreBest).where(
+            GenreBest.genre == target,
+            GenreBest.user_id == user_id
+        ).values(
+            best_cpm=greatest(GenreBest.best_cpm, best_cpm),
+            best_wpm=greatest(GenreBest.best_wpm, best_wpm),
+            best_accuracy=greatest(GenreBest.best_accuracy, best_accuracy),
+            max_combo=greatest(GenreBest.max_combo, max_combo),
+            updated_at=datetime.now(KST)
+        ).execution_options(synchronize_session=False)
+
+        if db.session.execute(conditional_update).rowcount:
+            continue
+
+        # 이 장르의 첫 기록: 다른 요청이 먼저 만들었다면 조건부 UPDATE로 다시 비교합니다.
+        try:
+            with db.session.begin_nested():
+                db.session.execute(insert(GenreBest).values(
+                    genre=target, user_id=user_id, best_cpm=best_cpm, best_wpm=best_wpm,
+                    best_accuracy=best_accuracy, max_combo=max_combo, updated_at=datetime.now(KST)
+                ))
+        except IntegrityError:
+            db.session.execute(conditional_update)
+
+
+def update_genre_bests(result):
+    """방금 저장한 결과 1개를 그 글의 장르별 최고 기록에 반영합니다."""
+    genre = db.session.query(TypingText.genre).filter_by(id=result.text_id).scalar()
+    if genre is not None:
+        upsert_genre_bests(result.user_id, genre, result.cpm, result.wpm, result.accuracy, result.combo)
+
+
+def _genre_best_aggregates(genre):
+    """장르(ALL_GENRES면 전체)의 유저별 남은 기록 집계 select (user_id, 최고값들, 결과 수)"""
+    query = select(
+        TypingResult.user_id,
+        func.max(TypingResult.cpm).label('best_cpm'),
+        func.max(TypingResult.wpm).label('best_wpm'),
+        func.max(TypingResult.accuracy).label('best_accuracy'),
+        func.max(TypingResult.combo).label('max_combo'),
+        func.count(TypingResult.id).label('result_count')
+    )
+    if genre != ALL_GENRES:
+        query = query.join(TypingText, TypingText.id == TypingResult.text_id).where(TypingText.genre == genre)
+    return query.group_by(TypingResult.user_id)
+
+
+def repair_genre_bests(removed_result, genre):
+    """
+    삭제된 결과가 장르별 / 전체 장르 최고 기록 중 하나였다면 남은 기록으로 다시 채웁니다.
+    남은 기록이 없으면 행을 지웁니다. 결과 삭제를 flush한 뒤 호출해야 합니다.
+
+    Args:
+        removed_result: 삭제된 TypingResult 인스턴스
+        genre: 삭제된 결과가 속한 글의 장르
+    """
+    for target in (genre, ALL_GENRES):
+        row = db.session.query(GenreBest).filter_by(genre=target, user_id=removed_result.user_id)\
+            .populate_existing().first()
+        if row is None:
+            continue
+        if (removed_result.cpm < row.best_cpm and removed_result.wpm < row.best_wpm
+                and removed_result.accuracy < row.best_accuracy and removed_result.combo < row.max_combo):
+            continue
+
+        remaining = db.session.execute(
+            _genre_best_aggregates(target).where(TypingResult.user_id == removed_result.user_id)
+        ).first()
+        if remaining is None:
+            db.session.delete(row)
+            continue
+        row.best_cpm = remaining.best_cpm
+        row.best_wpm = remaining.best_wpm
+        row.best_accuracy = remaining.best_accuracy
+        row.max_combo = remaining.max_combo
+
+
+def rebuild_genre_bests(genre, user_ids):
+    """
+    유저들의 장르별 / 전체 장르 최고 기록을 남은 결과로 다시 만듭니다. (글 삭제 후 호출)
+
+    Args:
+        genre: 삭제된 글의 장르
+        user_ids: 삭제된 글에 결과가 있던 유저 id 목록
+    """
+    if not user_ids:
+        return
+    for target in (genre, ALL_GENRES):
+        db.session.execute(
+            delete(GenreBest).where(GenreBest.genre == target, GenreBest.user_id.in_(user_ids))
+            .execution_options(synchronize_session=False)
+        )
+        aggregates = _genre_best_aggregates(target).where(TypingResult.user_id.in_(user_ids)).subquery()
+        db.session.execute(insert(GenreBest).from_select(
+            ['genre', 'user_id', 'best_cpm', 'best_wpm', 'best_accuracy', 'max_combo', 'updated_at'],
+            select(
+                literal(target), aggregates.c.user_id, aggregates.c.best_cpm, aggregates.c.best_wpm,
+                aggregates.c.best_accuracy, aggregates.c.max_combo, literal(datetime.now(KST))
+            )
+        ))
+
+
+def apply_result_batch(items):
+    """
+    검증된 결과 여러 개를 현재 트랜잭션에 한꺼번에 반영합니다. (commit은 호출하는 쪽에서)
+    - 결과 INSERT는 한 번의 flush로 묶고
+    - 유저 통계는 유저별 증분을 합쳐 유저당 UPDATE 1번
+    - 개인 최고 기록 / 명예의 전당은 유저-글별로 묶음 안의 최고 기록만 반영
+    - 장르별 최고 기록은 유저-장르별로 묶음 안의 최고값만 반영
+
+    Args:
+        items: validate_result_data로 검증된 parsed_data 목록 (user_id / text_id 존재 확인 완료)
+
+    Returns:
+        list: 저장된 TypingResult 목록 (items와 같은 순서)
+    """
+    results = [
+        TypingResult(
+            user_id=item['user_id'],
+            text_id=item['text_id'],
+            cpm=item['cpm'],
+            wpm=item['wpm'],
+            accuracy=item['accuracy'],
+            combo=item['combo'],
+            receipt_id=item.get('receipt_id')
+        )
+        for item in items
+    ]
+    db.session.add_all(results)
+    db.session.flush()
+
+    # 유저별 증분 합산
+    deltas = {}
+    for r in results:
+        d = deltas.setdefault(r.user_id, {
+            'count': 0, 'sum_cpm': 0, 'sum_wpm': 0, 'sum_accuracy': 0.0,
+            'best_cpm': 0, 'best_wpm': 0, 'max_combo': 0, 'cpms': [], 'accuracies': []
+        })
+        d['count'] += 1
+        d['sum_cpm'] += r.cpm
+        d['sum_wpm'] += r.wpm
+        d['sum_accuracy'] += r.accuracy
+        d['best_cpm'] = max(d['best_cpm'], r.cpm)
+        d['best_wpm'] = max(d['best_wpm'], r.wpm)
+        d['max_combo'] = max(d['max_combo'], r.combo)
+        d['cpms'].append(r.cpm)
+        d['accuracies'].append(r.accuracy)
+
+    # 유저 id 순서로 갱신하여 동시에 도는 묶음끼리 행 잠금 순서가 엇갈리지 않도록 함
+    for user_id in sorted(deltas):
+        apply_user_stats_delta(db.session, user_id, **deltas[user_id])
+
+    # 일간/주간/시즌 랭킹 누적값 (유저-일자별로 합쳐 기간당 UPDATE 1번)
+    apply_results_to_periods(results)
+
+    # 유저-글별 묶음 안의 최고 기록 (동점이면 먼저 저장된 기록)
+    bests = {}
+    for r in results:
+        key = (r.user_id, r.text_id)
+        if key not in bests or r.cpm > bests[key].cpm:
+            bests[key] = r
+    for key in sorted(bests):
+        if upsert_personal_best(bests[key]):
+            update_hall_of_fame(bests[key])
+
+    # 유저-장르별 묶음 안의 최고 기록 (글 장르는 한 번에 조회)
+    text_ids = {r.text_id for r in results}
+    genres = dict(db.session.query(TypingText.id, TypingText.genre).filter(TypingText.id.in_(text_ids)).all())
+    genre_bests = {}
+    for r in results:
+        if r.text_id not in genres:
+            continue
+        b = genre_bests.setdefault((r.user_id, genres[r.text_id]), [0, 0, 0.0, 0])
+        b[0], b[1], b[2], b[3] = max(b[0], r.cpm), max(b[1], r.wpm), max(b[2], r.accuracy), max(b[3], r.combo)
+    for (user_id, genre), values in sorted(genre_bests.items()):
+        upsert_genre_bests(user_id, genre, *values)
+
+    # 바뀐 랭킹 점수는 커밋 시 리더보드에 반영
+    scores = db.session.query(User.id, User.ranking_score).filter(User.id.in_(list(deltas))).all()
+    record_score_changes(db.session, dict(scores))
+
+    return results
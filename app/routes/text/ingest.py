@@ -0,0 +1,184 @@
+"""
+타이핑 결과 write-behind 저장 (RESULT_WRITE_BEHIND=true 일 때만 사용)
+
+POST /text/results 요청은 검증만 동기로 처리하고 워커 메모리의 제한된 큐에 넣은 뒤 바로 202를 반환합니다.
+백그라운드 flusher 스레드가 RESULT_FLUSH_INTERVAL_MS마다(또는 큐에 RESULT_FLUSH_BATCH개가 쌓이면 즉시)
+큐를 비워 apply_result_batch로 한 트랜잭션에 반영합니다. (결과 INSERT 묶음 + 유저별 통계 UPDATE 1번 + commit 1번)
+
+- 큐가 가득 차면 submit이 None을 반환하므로, 호출하는 쪽은 기존 동기 저장으로 처리합니다.
+- 프로세스 종료 시(atexit) 남은 결과를 모두 저장합니다.
+- 큐는 워커 메모리에 있으므로, 프로세스가 비정상 종료되면 아직 저장되지 않은 결과는 유실될 수 있습니다.
+- 202 응답의 provisional_id는 결과 행의 receipt_id로 저장되고, 저장에 실패하면 failed_results에 남습니다.
+  (GET /text/results/receipt/<provisional_id>로 저장됨 / 실패 / 대기 중을 조회)
+"""
+import atexit
+import queue
+import threading
+import uuid
+
+from app.database import db
+from app.models import User, TypingText, FailedResult
+from app.redis_client import invalidate_user_cache
+from .helpers import apply_result_batch
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+class ResultWriteBehind:
+    """결과 저장 요청을 모아서 주기적으로 한 번에 커밋하는 큐 + flusher 스레드"""
+
+    def __init__(self, app, max_size, interval_ms, batch_size):
+        self.app = app
+        self.batch_size = batch_size
+        self.interval = interval_ms / 1000.0
+        self._queue = queue.Queue(maxsize=max_size)
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='result-write-behind', daemon=True)
+        self._thread.start()
+
+    def submit(self, item):
+        """
+        검증된 결과를 큐에 넣고 임시 ID를 반환합니다.
+        큐가 가득 찼거나 종료 중이면 None을 반환합니다.
+        """
+        if self._stopped.is_set():
+            return None
+        provisional_id = uuid.uuid4().hex
+        item = dict(item, receipt_id=provisional_id)
+        try:
+            self._queue.put_nowait((provisional_id, item))
+        except queue.Full:
+            return None
+        if self._queue.qsize() >= self.batch_size:
+            self._wake.set()
+        return provisional_id
+
+    def pending(self):
+        """아직 저장되지 않은 결과 개수"""
+        return self._queue.qsize()
+
+    def flush(self):
+        """큐에 쌓인 결과를 모두 저장하고 저장한 개수를 반환합니다."""
+        with self._flush_lock:
+            flushed = 0
+            while True:
+                batch = []
+                while len(batch) < self.batch_size:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                if not batch:
+                    return flushed
+                flushed += self._write(batch)
+
+    def stop(self):
+        """flusher 스레드를 멈추고 남은 결과를 저장합니다."""
+        self._stopped.set()
+        self._wake.set()
+        if self._thread.is_alive() and self._thread is not threading.current_thread():
+            self._thread.join()
+        return self.flush()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            if self._stopped.is_set():
+                break
+            try:
+                self.flush()
+            except Exception as e:
+                self.app.logger.error(f"❌ [결과 write-behind] flush 중 에러: {str(e)}")
+
+    def _write(self, batch):
+        """묶음을 한 트랜잭션으로 저장합니다. 실패하면 한 건씩 다시 시도하여 문제 있는 결과만 버립니다."""
+        with self.app.app_context():
+            items = [item for _, item in batch]
+            try:
+                apply_result_batch(items)
+                db.session.commit()
+                written = len(items)
+            except Exception as e:
+                db.session.rollback()
+                self.app.logger.warning(f"⚠️ [결과 write-behind] 묶음 저장 실패, 한 건씩 재시도: {str(e)}")
+                written = 0
+                for provisional_id, item in batch:
+                    try:
+                        apply_result_batch([item])
+                        db.session.commit()
+                        written += 1
+                    except Exception as item_error:
+                        db.session.rollback()
+                        self.app.logger.error(
+                            f"❌ [결과 write-behind] 임시 ID {provisional_id} 저장 실패 (유저 {item.get('user_id')}, "
+                            f"글 {item.get('text_id')}): {str(item_error)}"
+                        )
+                        self._record_failure(provisional_id, item, item_error)
+            finally:
+                db.session.remove()
+
+            if written:
+                invalidate_user_cache(*{item['user_id'] for _, item in batch})
+                self.app.logger.info(f"📦 [결과 write-behind] {written}건 묶음 저장 완료")
+            return written
+
+
+    def _record_failure(self, provisional_id, item, error):
+        """저장에 실패한 접수 ID를 남겨 클라이언트가 조회할 수 있게 합니다."""
+        try:
+            db.session.add(FailedResult(receipt_id=provisional_id, user_id=item.get('user_id'),
+                                        text_id=item.get('text_id'), error=str(error)[:255]))
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            self.app.logger.error(f"❌ [결과 write-behind] 임시 ID {provisional_id} 실패 기록 에러: {str(e)}")
+
+
+def get_result_writer(app):
+    """워커당 하나의 ResultWriteBehind를 반환합니다. (최초 호출 시 flusher 스레드 시작)"""
+    global _writer
+    if _writer is not None:
+        return _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = ResultWriteBehind(
+                app,
+                max_size=app.config.get('RESULT_QUEUE_MAX', 10000),
+                interval_ms=app.config.get('RESULT_FLUSH_INTERVAL_MS', 20),
+                batch_size=app.config.get('RESULT_FLUSH_BATCH', 500)
+            )
+    return _writer
+
+
+def validate_result_targets(parsed_data):
+    """
+    큐에 넣기 전에 유저/글이 존재하는지 확인합니다. (나중에 flush에서 실패하지 않도록)
+    확인된 유저 id로 parsed_data['user_id']를 정규화합니다.
+
+    Returns:
+        str or None: 오류 메시지 (문제 없으면 None)
+    """
+    user = User.query.get(parsed_data['user_id'])
+    if not user:
+        return "유저를 찾을 수 없습니다."
+    if not db.session.query(TypingText.id).filter(TypingText.id == parsed_data['text_id']).first():
+        return "글을 찾을 수 없습니다."
+    parsed_data['user_id'] = user.id
+    return None
+
+
+def shutdown_result_writer():
+    """flusher 스레드를 멈추고 남은 결과를 저장합니다. (프로세스 종료 시 자동 호출)"""
+    global _writer
+    with _writer_lock:
+        writer, _writer = _writer, None
+    if writer is None:
+        return 0
+    return writer.stop()
+
+
+atexit.register(shutdown_result_writer)
@@ -3,13 +3,22 @@ import boto3
 import uuid
 from flask import Blueprint, jsonify, request, render_template, redirect, url_for, current_app
 from app.database import db
-from app.models import TypingText, TypingResult, User
+from app.models import TypingText, TypingResult, User, PersonalBest, HallOfFame, FailedResult, favorites
 from datetime import datetime
-from app.utils import api_response
-from sqlalchemy import func
+from app.utils import api_response, get_bool_arg, get_page_size, decode_cursor, page_meta, \
+    is_not_modified, not_modified_response, with_cache_headers
 from flasgger import swag_from
-from .helpers import validate_result_data, update_user_statistics, recalculate_user_statistics
+from sqlalchemy import and_
+from .helpers import validate_result_data, update_user_statistics, recalculate_user_statistics, \
+    upsert_personal_best, repair_personal_best, update_hall_of_fame, repair_hall_of_fame, apply_result_batch, \
+    update_genre_bests, repair_genre_bests, rebuild_genre_bests, HALL_OF_FAME_SIZE
 from app.redis_client import invalidate_user_cache
+from app.idempotency import idempotent, record_response
+from app.periods import apply_result_to_periods, remove_result_from_periods
+from app.histograms import get_cpm_percentile
+from .ingest import get_result_writer, validate_result_targets
+from .catalog import get_catalog, get_sampler, get_catalog_version, record_text_change, publish_catalog_version, \
+    get_changes_since, serialize_text, text_etag, listing_etag
 
 # S3 클라이언트 설정 (환경변수 로드)
 s3 = boto3.client('s3',
@@ -31,11 +40,21 @@ GET_ALL_TEXTS_YAML_PATH = os.path.join(BASE_DIR, 'swagger', 'get_all_texts.yaml'
 GET_TEXT_DETAIL_YAML_PATH = os.path.join(BASE_DIR, 'swagger', 'get_text_detail.yaml')
 DELETE_TEXT_YAML_PATH = os.path.join(BASE_DIR, 'swagger', 'delete_text.yaml')
 POST_RESULT_YAML_PATH =  os.path.join(BASE_DIR, 'swagger', 'save_result.yaml')
+POST_RESULT_BATCH_YAML_PATH = os.path.join(BASE_DIR, 'swagger', 'save_result_batch.yaml')
 GET_BEST_DATA_YAML_PATH = os.path.join(BASE_DIR, 'swagger', 'get_best_data.yaml')
+GET_RESULT_PERCENTILE_YAML_PATH = os.path.join(BASE_DIR, 'swagger', 'get_result_percentile.yaml')
+GET_RESULT_RECEIPT_YAML_PATH = os.path.join(BASE_DIR, 'swagger', 'get_result_receipt.yaml')
 POST_FAVORITE_YAML_PATH = os.path.join(BASE_DIR, 'swagger', 'post_favorite_text.yaml')
 GET_USER_TEXT_RESULT_YAML_PATH = os.path.join(BASE_DIR, 'swagger', 'get_user_text_result.yaml')
 GET_RESULT_DETAIL_YAML_PATH = os.path.join(BASE_DIR, 'swagger', 'get_user_detail_result.yaml')
 DELETE_RESULT_YAML_PATH = os.path.join(BASE_DIR, 'swagger', 'delete_result.yaml')
+GET_TEXT_CHANGES_YAML_PATH = os.path.join(BASE_DIR, 'swagger', 'get_text_changes.yaml')
+
+# 엔드포인트별 기본 Cache-Control (CACHE_CONTROL 설정으로 덮어쓸 수 있음)
+# ETag와 함께 매 요청 재검증하도록 no-cache를 기본으로 사용합니다.
+LIST_CACHE_CONTROL = 'no-cache'
+DETAIL_CACHE_CONTROL = 'no-cache'
+PRIVATE_CACHE_CONTROL = 'private, no-cache'
 
 
 # 0. 글쓰기 페이지 (HTML 폼 제공 및 저장 - 이미지 업로드 기능 추가)
@@ -94,7 +113,10 @@ def add_text():
                 image_url=image_url
             )
             db.session.add(new_entry)
+            db.session.flush()
+            catalog_version = record_text_change(new_entry.id, 'add')
             db.session.commit()
+            publish_catalog_version(catalog_version)
             
             current_app.logger.info(f"✅ [{title}] 등록 성공")
 
@@ -111,31 +133,154 @@ def add_text():
     
     return render_template('add_text.html')
 
+# 목록 조회 시 본문(content)을 제외한 메타데이터 컬럼
+TEXT_META_COLUMNS = (
+    TypingText.id,
+    TypingText.genre,
+    TypingText.title,
+    TypingText.author,
+    TypingText.image_url,
+)
+
+
+def _catalog_enabled():
+    """인메모리 카탈로그 캐시 사용 여부 (TEXT_CATALOG_CACHE 설정)"""
+    return current_app.config.get('TEXT_CATALOG_CACHE', True)
+
+
+def _text_summary(t, include_content=True):
+    item = {
+        "id": t["id"],
+        "genre": t["genre"],
+        "title": t["title"],
+        "author": t["author"],
+        "image_url": t["image_url"]
+    }
+    if include_content:
+        item["content"] = t["content"]
+    return item
+
+
+def _query_texts(genre=None, after_id=None, limit=None, include_content=True):
+    """캐시를 사용하지 않을 때 DB에서 직접 글 목록을 조회합니다. (content는 필요할 때만 SELECT)"""
+    columns = TEXT_META_COLUMNS + ((TypingText.content,) if include_content else ())
+
+    query = db.session.query(*columns)
+    if genre:
+        query = query.filter(TypingText.genre == genre)
+    if after_id is not None:
+        query = query.filter(TypingText.id > after_id)
+    query = query.order_by(TypingText.id.asc())
+    if limit is not None:
+        query = query.limit(limit)
+    return [r._asdict() for r in query.all()]
+
+
+def _query_text_detail(text_id, user_id, include_text=True):
+    """
+    글 정보, 찜 여부, 유저의 최고 기록(personal_bests)을 하나의 JOIN 쿼리로 조회합니다.
+    글이 없으면 None을 반환합니다.
+
+    Returns:
+        dict: {"text": 글 dict 또는 None(include_text=False), "is_favorite": bool, "my_best": dict 또는 None}
+    """
+    text_columns = (TEXT_META_COLUMNS + (TypingText.content,)) if include_text else (TypingText.id,)
+    row = db.session.query(
+        *text_columns,
+        favorites.c.user_id.label('favorite_user_id'),
+        PersonalBest.cpm.label('best_cpm'),
+        PersonalBest.wpm.label('best_wpm'),
+        PersonalBest.accuracy.label('best_accuracy'),
+        PersonalBest.combo.label('best_combo'),
+        PersonalBest.created_at.label('best_created_at')
+    ).outerjoin(
+        favorites, and_(favorites.c.text_id == TypingText.id, favorites.c.user_id == user_id)
+    ).outerjoin(
+        PersonalBest, and_(PersonalBest.text_id == TypingText.id, PersonalBest.user_id == user_id)
+    ).filter(TypingText.id == text_id).first()
+
+    if row is None:
+        return None
+
+    my_best = None
+    if row.best_cpm is not None:
+        my_best = {
+            "cpm": row.best_cpm,
+            "wpm": row.best_wpm,
+            "accuracy": row.best_accuracy,
+            "combo": row.best_combo,
+            "date": row.best_created_at.strftime('%Y-%m-%d')
+        }
+
+    return {
+        "text": {c.key: getattr(row, c.key) for c in text_columns} if include_text else None,
+        "is_favorite": row.favorite_user_id is not None,
+        "my_best": my_best
+    }
+
+
+def _list_texts(genre=None):
+    """
+    글 목록을 id 기준 키셋(cursor) 페이지네이션으로 조회합니다.
+    카탈로그 캐시가 켜져 있으면 메모리 스냅샷에서, 꺼져 있으면 DB에서 조회합니다.
+
+    쿼리 파라미터:
+        - limit: 페이지 크기 (기본 50, 최대 200)
+        - cursor: 이전 응답의 meta.next_cursor
+        - include_content: false면 본문을 제외 (DB 조회 시 content 컬럼을 SELECT하지 않음)
+        - paginate: false면 기존처럼 전체 목록을 한 번에 반환
+
+    Returns:
+        tuple: (texts_list, meta) - paginate=false인 경우 meta는 None
+    Raises:
+        ValueError: 커서 형식이 잘못된 경우
+    """
+    include_content = get_bool_arg('include_content', default=True)
+    limit = get_page_size() if get_bool_arg('paginate', default=True) else None
+
+    after_id = None
+    cursor = request.args.get('cursor')
+    if limit is not None and cursor:
+        (after_id,) = decode_cursor(cursor, size=1)
+        if not isinstance(after_id, int):
+            raise ValueError("잘못된 커서 형식입니다.")
+
+    fetch_limit = limit + 1 if limit is not None else None
+    if _catalog_enabled():
+        rows = get_catalog().list_texts(genre=genre, after_id=after_id, limit=fetch_limit)
+    else:
+        rows = _query_texts(genre=genre, after_id=after_id, limit=fetch_limit, include_content=include_content)
+
+    texts_list = [_text_summary(t, include_content) for t in rows]
+    if limit is None:
+        return texts_list, None
+    return page_meta(texts_list, limit, lambda t: [t["id"]])
+
+
 # 1. 메인용: 글 전체 조회
 @text_blueprint.route('/all', methods=['GET'])
 @swag_from(GET_ALL_TEXTS_YAML_PATH) # YAML 경로 설정 확인하세요!
 def get_all_texts():
     try:
-        # DB의 모든 텍스트를 ID 순으로 정렬하여 싹 다 가져옴
-        texts = TypingText.query.order_by(TypingText.id.asc()).all()
-        
-        texts_list = [{
-            "id": t.id,
-            "genre": t.genre,
-            "title": t.title,
-            "author": t.author,
-            "content": t.content,
-            "image_url": t.image_url
-        } for t in texts]
+        # 카탈로그 버전이 같으면 DB 조회/직렬화 없이 304 반환
+        etag = listing_etag(get_catalog_version(), request.args.items(multi=True))
+        if is_not_modified(etag):
+            return not_modified_response(etag, LIST_CACHE_CONTROL)
+
+        # ID 순 키셋 페이지네이션 (paginate=false 시 전체 조회)
+        texts_list, meta = _list_texts()
 
         current_app.logger.info(f" [전체조회] 총 {len(texts_list)}개의 텍스트를 불러왔습니다.")
 
-        return api_response(
+        return with_cache_headers(api_response(
             success=True, 
             data=texts_list, 
-            message=f"전체 글 {len(texts_list)}개를 성공적으로 가져왔습니다."
-        )
+            message=f"전체 글 {len(texts_list)}개를 성공적으로 가져왔습니다.",
+            meta=meta
+        ), etag, LIST_CACHE_CONTROL)
 
+    except ValueError as e:
+        return api_response(success=False, data=[], error_code=400, message=str(e), status_code=400)
     except Exception as e:
         current_app.logger.error(f"❌ 전체 텍스트 조회 중 에러: {str(e)}")
         return api_response(
@@ -155,39 +300,37 @@ def get_random_texts(limit_val):
     try:
         # 1. 파라미터 추출 및 유효성 검사
         u_id = request.args.get('user_id') # 유저 ID 수신
+        genre_param = request.args.get('genre') # 장르 필터 (선택)
         limit = request.args.get('limit', default=limit_val, type=int)
         if limit > 50: 
             limit = 50
 
         # 2. 랜덤 글 데이터 가져오기
-
-        
-
-        if current_app.config['SQLALCHEMY_DATABASE_URI'].startswith('sqlite'):
-            texts = TypingText.query.order_by(func.random()).limit(limit).all()
+        # id 배열에서 limit개만 뽑고, 해당 글만 PK로 가져옵니다. (ORDER BY RAND() 전체 정렬 제거)
+        sampled_ids = get_sampler().sample(limit, genre=genre_param)
+        if _catalog_enabled():
+            catalog = get_catalog()
+            texts = [catalog.get_text(text_id) for text_id in sampled_ids]
         else:
-            texts = TypingText.query.order_by(func.rand()).limit(limit).all()
+            rows = {t.id: t for t in TypingText.query.filter(TypingText.id.in_(sampled_ids)).all()} if sampled_ids else {}
+            texts = [serialize_text(rows[text_id]) if text_id in rows else None for text_id in sampled_ids]
+        # 샘플러 갱신 직후 삭제된 글은 제외
+        texts = [t for t in texts if t is not None]
 
-        # 3. 유저가 있다면 찜한 글 ID 목록을 Set으로 추출 (성능 최적화)
+        # 3. 유저가 있다면 뽑힌 글 중 찜한 글 ID만 Set으로 추출
         favorite_ids = set()
-        if u_id:
-            user = User.query.get(u_id)
-            if user:
-                # 유저가 찜한 모든 글의 ID만 모아서 집합으로 만듭니다.
-                favorite_ids = {f.id for f in user.favorite_texts}
+        if u_id and sampled_ids:
+            favorite_ids = {
+                row.text_id for row in db.session.query(favorites.c.text_id)
+                .filter(favorites.c.user_id == u_id, favorites.c.text_id.in_(sampled_ids))
+            }
 
         # 4. 데이터 가공 (is_favorite 필드 추가)
         texts_list = []
         for t in texts:
-            texts_list.append({
-                "id": t.id,
-                "genre": t.genre,
-                "title": t.title,
-                "author": t.author,
-                "content": t.content,
-                "image_url": t.image_url,
-                "is_favorite": t.id in favorite_ids # 집합에 ID가 있으면 True, 없으면 False
-            })
+            item = _text_summary(t)
+            item["is_favorite"] = t["id"] in favorite_ids # 집합에 ID가 있으면 True, 없으면 False
+            texts_list.append(item)
 
         current_app.logger.info(f" [랜덤조회] 유저 {u_id if u_id else '비회원'} - {len(texts_list)}개 반환")
 
@@ -210,27 +353,26 @@ def get_texts_by_genre():
     try:
         genre_param = request.args.get('genre')
 
+        # 카탈로그 버전이 같으면 DB 조회/직렬화 없이 304 반환
+        etag = listing_etag(get_catalog_version(), request.args.items(multi=True))
+        if is_not_modified(etag):
+            return not_modified_response(etag, LIST_CACHE_CONTROL)
+
+        texts_list, meta = _list_texts(genre=genre_param)
+
         if genre_param:
-            texts = TypingText.query.filter_by(genre=genre_param).all()
             message = f"'{genre_param}' 장르의 글 목록을 성공적으로 가져왔습니다."
         else:
-            texts = TypingText.query.all()
             message = "전체 글 목록을 성공적으로 가져왔습니다."
-        
-        texts_list = [{
-            "id": t.id, 
-            "genre": t.genre, 
-            "title": t.title, 
-            "author": t.author,
-            "content": t.content,
-            "image_url": t.image_url
-        } for t in texts]
 
-        return api_response(
+        return with_cache_headers(api_response(
             success=True, 
             data=texts_list, 
-            message=message
-        )
+            message=message,
+            meta=meta
+        ), etag, LIST_CACHE_CONTROL)
+    except ValueError as e:
+        return api_response(success=False, data=[], error_code=400, message=str(e), status_code=400)
     except Exception as e:
         current_app.logger.error(f"장르별 목록 조회 중 오류: {str(e)}")
         return api_response(
@@ -241,12 +383,77 @@ def get_texts_by_genre():
             status_code=500
         )
 
+# 델타 동기화: 한 번에 반환할 변경 개수 기본값 / 상한
+DEFAULT_CHANGES_LIMIT = 500
+MAX_CHANGES_LIMIT = 2000
+
+# 3. 카탈로그 델타 동기화 (since 버전 이후 추가/삭제된 글만 반환)
+@text_blueprint.route('/changes', methods=['GET'])
+@swag_from(GET_TEXT_CHANGES_YAML_PATH)
+def get_text_changes():
+    try:
+        since = request.args.get('since', type=int)
+        if since is None or since < 0:
+            return api_response(success=False, error_code=400, message="since(0 이상의 정수)가 필요합니다.", status_code=400)
+
+        include_content = get_bool_arg('include_content', default=True)
+        limit = get_page_size(default=DEFAULT_CHANGES_LIMIT, max_size=MAX_CHANGES_LIMIT)
+
+        latest_ops, version, has_more = get_changes_since(since, limit)
+
+        # 마지막 변경이 add인 글은 현재 데이터를, delete인 글은 id만(툼스톤) 내려줍니다.
+        added_ids = [text_id for text_id, op in latest_ops.items() if op == 'add']
+        if _catalog_enabled():
+            catalog = get_catalog()
+            texts = {text_id: catalog.get_text(text_id) for text_id in added_ids}
+        else:
+            rows = TypingText.query.filter(TypingText.id.in_(added_ids)).all() if added_ids else []
+            texts = {t.id: serialize_text(t) for t in rows}
+
+        added = [_text_summary(texts[text_id], include_content) for text_id in sorted(added_ids) if texts.get(text_id)]
+        # 로그상 add지만 이미 지워진 글은 삭제로 취급
+        deleted = sorted(
+            [text_id for text_id, op in latest_ops.items() if op == 'delete'] +
+            [text_id for text_id in added_ids if not texts.get(text_id)]
+        )
+
+        current_app.logger.info(f"🔄 [델타조회] v{since} -> v{version}: 추가 {len(added)}개, 삭제 {len(deleted)}개")
+
+        return api_response(
+            success=True,
+            data={
+                "version": version,
+                "added": added,
+                "deleted": deleted,
+                "has_more": has_more
+            },
+            message=f"버전 {since} 이후 변경 사항을 성공적으로 가져왔습니다."
+        )
+
+    except Exception as e:
+        current_app.logger.error(f"❌ 델타 조회 에러: {str(e)}")
+        return api_response(success=False, error_code=500, message="변경 사항을 불러오는 중 서버 오류가 발생했습니다.", status_code=500)
+
 @text_blueprint.route('/<int:text_id>', methods=['GET'])
 @swag_from(GET_TEXT_DETAIL_YAML_PATH)
 def get_text_by_id(text_id):
     try:
-        # 1. 글 정보 조회
-        t = TypingText.query.get(text_id)
+        # 1. 로그인한 유저 정보 확인 (찜 여부 및 최고 기록 조회용)
+        u_id = request.args.get('user_id', type=int)
+
+        # 2. 글 정보 + 찜 여부 + 최고 기록을 한 번에 조회
+        #    (캐시 사용 시 글은 메모리 스냅샷에서, 유저 정보가 없으면 DB 조회 없음)
+        detail = None
+        if _catalog_enabled():
+            catalog = get_catalog()
+            t = catalog.get_text(text_id)
+            etag = catalog.get_etag(text_id)
+            if t and u_id:
+                detail = _query_text_detail(text_id, u_id, include_text=False)
+        else:
+            detail = _query_text_detail(text_id, u_id, include_text=True)
+            t = detail["text"] if detail else None
+            etag = text_etag(t) if t else None
         
         if not t:
             return api_response(
@@ -256,51 +463,33 @@ def get_text_by_id(text_id):
                 status_code=404
             )
 
-        # 2. 로그인한 유저 정보 확인 (찜 여부 및 최고 기록 조회용)
-        u_id = request.args.get('user_id') 
-        best_record = None
-        is_favorite = False # 기본값은 False
+        # 유저별 정보가 없는 응답은 글 내용 해시(ETag)로 조건부 응답
+        if not u_id and is_not_modified(etag):
+            return not_modified_response(etag, DETAIL_CACHE_CONTROL)
 
-        if u_id:
-            user = User.query.get(u_id)
-            if user:
-                # 찜 여부 확인
-                is_favorite = user.favorite_texts.filter_by(id=text_id).first() is not None
-
-                # 해당 유저의 이 글에 대한 최고 기록 조회
-                best = TypingResult.query.filter_by(user_id=u_id, text_id=text_id)\
-                       .order_by(TypingResult.cpm.desc()).first()
-                
-                if best:
-                    best_record = {
-                        "cpm": best.cpm, 
-                        "wpm": best.wpm, 
-                        "accuracy": best.accuracy, 
-                        "combo": best.combo,
-                        "date": best.created_at.strftime('%Y-%m-%d')
-                    }
+        is_favorite = bool(detail and detail["is_favorite"])
+        best_record = detail["my_best"] if detail else None
 
         # 3. 모든 데이터를 규격화된 포맷으로 합치기
+        text_info = _text_summary(t)
+        text_info["is_favorite"] = is_favorite
         data = {
-            "text_info" : {
-                "id": t.id, 
-                "genre": t.genre, 
-                "title": t.title, 
-                "author": t.author, 
-                "content": t.content,
-                "image_url": t.image_url,
-                "is_favorite": is_favorite 
-            }, 
+            "text_info" : text_info, 
             "my_best": best_record 
         }
 
-        current_app.logger.info(f"🔍 [상세조회] 유저 {u_id if u_id else '비회원'} - '{t.title}' (찜:{is_favorite}) 조회 완료")
+        current_app.logger.info(f"🔍 [상세조회] 유저 {u_id if u_id else '비회원'} - '{t['title']}' (찜:{is_favorite}) 조회 완료")
 
-        return api_response(
+        response = api_response(
             success=True, 
             data=data, 
             message="글 상세 정보와 최고 기록을 성공적으로 가져왔습니다."
         )
+        if u_id:
+            # 유저별 응답은 설정과 관계없이 공유 캐시에 저장되지 않도록 합니다.
+            response[0].headers['Cache-Control'] = PRIVATE_CACHE_CONTROL
+            return response
+        return with_cache_headers(response, etag, DETAIL_CACHE_CONTROL)
 
     except Exception as e:
         current_app.logger.error(f"상세 조회 중 서버 에러: {str(e)}")
@@ -327,8 +516,16 @@ def delete_text(text_id):
                 status_code=404
             )
 
+        # 이 글에 기록이 있던 유저들의 장르별 최고 기록은 글(과 결과)을 지운 뒤 남은 기록으로 다시 만듭니다.
+        player_ids = [uid for (uid,) in db.session.query(TypingResult.user_id)
+                      .filter(TypingResult.text_id == text_id, TypingResult.user_id.isnot(None)).distinct()]
+
         db.session.delete(text)
+        db.session.flush()
+        rebuild_genre_bests(text.genre, player_ids)
+        catalog_version = record_text_change(text_id, 'delete')
         db.session.commit()
+        publish_catalog_version(catalog_version)
 
         current_app.logger.info(f"[글 삭제] ID: {text_id}, 제목: '{text.title}' 삭제 완료")
 
@@ -347,9 +544,35 @@ def delete_text(text_id):
             status_code=500
         )
 
+def _enqueue_typing_result(parsed_data):
+    """
+    검증된 결과를 write-behind 큐에 넣고 202 응답을 반환합니다.
+    큐가 가득 찬 경우 None을 반환하여 동기 저장으로 처리하게 합니다.
+    """
+    error_message = validate_result_targets(parsed_data)
+    if error_message:
+        return api_response(success=False, error_code=404, message=error_message, status_code=404)
+
+    writer = get_result_writer(current_app._get_current_object())
+    provisional_id = writer.submit(parsed_data)
+    if provisional_id is None:
+        current_app.logger.warning("⚠️ [결과 write-behind] 큐가 가득 차 동기 저장으로 처리합니다.")
+        return None
+
+    return api_response(
+        success=True,
+        data={
+            "provisional_id": provisional_id,
+            "queued": True
+        },
+        message="연습 결과가 접수되었습니다. 잠시 후 기록과 랭킹에 반영됩니다.",
+        status_code=202
+    )
+
 # 5. 타자 결과 저장 및 실시간 랭킹 점수 갱신
 @text_blueprint.route('/results', methods=['POST'])
 @swag_from(POST_RESULT_YAML_PATH)
+@idempotent
 def save_typing_result():
     try:
         data = request.get_json()
@@ -358,6 +581,12 @@ def save_typing_result():
         is_valid, error_message, parsed_data = validate_result_data(data)
         if not is_valid:
             return api_response(success=False, error_code=400, message=error_message, status_code=400)
+
+        # (선택) write-behind 모드: 검증 후 큐에 넣고 바로 응답, 저장은 flusher가 묶어서 처리
+        if current_app.config.get('RESULT_WRITE_BEHIND'):
+            queued = _enqueue_typing_result(parsed_data)
+            if queued is not None:
+                return queued
         
         # 2. 결과 기록(TypingResult) 객체 생성
         new_result = TypingResult(
@@ -384,15 +613,17 @@ def save_typing_result():
             parsed_data['combo']
         )
 
-        # 4. 최종 DB 반영
-        db.session.commit()
+        # 4. 유저-글별 최고 기록(personal_bests) 및 명예의 전당 갱신 (결과 id가 필요하므로 flush 후)
+        db.session.flush()
+        if upsert_personal_best(new_result):
+            update_hall_of_fame(new_result)
 
-        # 5. 유저 캐시 무효화 (랭킹·프로필·전체유저 갱신)
-        invalidate_user_cache()
+        # 장르별 최고 기록 및 일간/주간/시즌 랭킹 누적값 갱신
+        update_genre_bests(new_result)
+        apply_result_to_periods(new_result)
 
-        current_app.logger.info(f"🏆 유저 {user.username} 결과 저장 및 랭킹 점수({user.ranking_score}) 갱신 완료")
-
-        return api_response(
+        # 5. 응답 생성 (Idempotency-Key 요청이면 결과와 같은 트랜잭션에 응답 기록) 및 최종 DB 반영
+        response = record_response(api_response(
             success=True, 
             data={
                 "result_id": new_result.id, 
@@ -404,14 +635,104 @@ def save_typing_result():
             }, 
             message="연습 결과 저장 및 랭킹 업데이트 성공",
             status_code=201
-        )
+        ))
+        db.session.commit()
+
+        # 6. 유저 캐시 무효화 (이 유저의 프로필 + 전체유저 목록 버전, 랭킹은 커밋 시 리더보드에 반영)
+        invalidate_user_cache(user.id)
+
+        current_app.logger.info(f"🏆 유저 {user.username} 결과 저장 및 랭킹 점수({user.ranking_score}) 갱신 완료")
+
+        return response
 
     except Exception as e:
         db.session.rollback() 
         current_app.logger.error(f"결과 저장 에러: {str(e)}")
         return api_response(success=False, error_code=500, message="서버 오류 발생", status_code=500)
 
-# 6. 글별 최고 점수
+# 한 번에 받을 수 있는 최대 결과 개수
+MAX_RESULT_BATCH_SIZE = 100
+
+# 5-1. 타자 결과 묶음 저장 (오프라인/키오스크 동기화용)
+@text_blueprint.route('/results/batch', methods=['POST'])
+@swag_from(POST_RESULT_BATCH_YAML_PATH)
+@idempotent
+def save_typing_results_batch():
+    try:
+        data = request.get_json(silent=True) or {}
+        items = data.get('results')
+
+        if not isinstance(items, list) or not items:
+            return api_response(success=False, error_code=400, message="results 목록이 필요합니다.", status_code=400)
+        if len(items) > MAX_RESULT_BATCH_SIZE:
+            return api_response(success=False, error_code=400,
+                                message=f"한 번에 최대 {MAX_RESULT_BATCH_SIZE}개까지 저장할 수 있습니다.", status_code=400)
+
+        # 1. 항목별 검증 (validate_result_data 재사용)
+        outcomes = [None] * len(items)
+        valid = []
+        for index, item in enumerate(items):
+            is_valid, error_message, parsed_data = validate_result_data(item if isinstance(item, dict) else None)
+            if is_valid:
+                try:
+                    parsed_data['user_id'] = int(parsed_data['user_id'])
+                    parsed_data['text_id'] = int(parsed_data['text_id'])
+                except (ValueError, TypeError):
+                    is_valid, error_message = False, "user_id / text_id 형식이 올바르지 않습니다."
+            if is_valid:
+                valid.append((index, parsed_data))
+            else:
+                outcomes[index] = {"index": index, "success": False, "error": error_message}
+
+        # 2. 유저/글 존재 여부를 한 번에 확인
+        user_ids = {p['user_id'] for _, p in valid}
+        text_ids = {p['text_id'] for _, p in valid}
+        known_users = {uid for (uid,) in db.session.query(User.id).filter(User.id.in_(user_ids))} if user_ids else set()
+        known_texts = {tid for (tid,) in db.session.query(TypingText.id).filter(TypingText.id.in_(text_ids))} if text_ids else set()
+
+        to_save = []
+        for index, parsed_data in valid:
+            if parsed_data['user_id'] not in known_users:
+                outcomes[index] = {"index": index, "success": False, "error": "유저를 찾을 수 없습니다."}
+            elif parsed_data['text_id'] not in known_texts:
+                outcomes[index] = {"index": index, "success": False, "error": "글을 찾을 수 없습니다."}
+            else:
+                to_save.append((index, parsed_data))
+
+        # 3. 묶음 INSERT + 유저별 통계 증분 합산 (flush까지, commit은 응답 기록 후 한 번)
+        if to_save:
+            saved = apply_result_batch([parsed_data for _, parsed_data in to_save])
+            for (index, _), result in zip(to_save, saved):
+                outcomes[index] = {"index": index, "success": True, "result_id": result.id}
+
+        saved_count = len(to_save)
+        failed_count = len(items) - saved_count
+
+        # 4. 응답 생성 (Idempotency-Key 요청이면 결과와 같은 트랜잭션에 응답 기록) 및 한 번의 commit
+        response = record_response(api_response(
+            success=saved_count > 0,
+            data={
+                "saved": saved_count,
+                "failed": failed_count,
+                "results": outcomes
+            },
+            error_code=None if saved_count else 400,
+            message=f"연습 결과 {saved_count}건 저장, {failed_count}건 실패",
+            status_code=201 if saved_count else 400
+        ))
+        if to_save:
+            db.session.commit()
+            invalidate_user_cache(*{parsed_data['user_id'] for _, parsed_data in to_save})
+
+        current_app.logger.info(f"📦 [결과 묶음저장] {saved_count}건 저장, {failed_count}건 실패")
+        return response
+
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"❌ 결과 묶음저장 에러: {str(e)}")
+        return api_response(success=False, error_code=500, message="서버 오류 발생", status_code=500)
+
+# 6. 글별 최고 점수 (명예의 전당 상위 n명)
 @text_blueprint.route('/results/best', methods=['GET'])
 @swag_from(GET_BEST_DATA_YAML_PATH)
 def get_global_best_score():
@@ -421,13 +742,17 @@ def get_global_best_score():
         if not t_id:
             return api_response(success=False, error_code=400, message="text_id가 필요합니다.", status_code=400)
 
-      
-        best = db.session.query(TypingResult, User.username, User.profile_pic)\
-                .join(User, TypingResult.user_id == User.id)\
-                .filter(TypingResult.text_id == t_id)\
-                .order_by(TypingResult.cpm.desc()).first()
+        n = request.args.get('n', default=1, type=int)
+        n = max(1, min(n, HALL_OF_FAME_SIZE))
+
+        # 결과 저장/삭제 시 유지되는 명예의 전당(최대 HALL_OF_FAME_SIZE행)에서 상위 n명만 조회
+        rows = db.session.query(HallOfFame, User.username, User.profile_pic)\
+                .join(User, HallOfFame.user_id == User.id)\
+                .filter(HallOfFame.text_id == t_id)\
+                .order_by(HallOfFame.cpm.desc(), HallOfFame.result_id.asc())\
+                .limit(n).all()
         
-        if not best:
+        if not rows:
             return api_response(
                 success=True, 
                 data={
@@ -436,33 +761,99 @@ def get_global_best_score():
                     "best_cpm": 0, 
                     "best_wpm": 0, 
                     "best_accuracy": 0,
-                    "best_combo": 0
+                    "best_combo": 0,
+                    "top_records": []
                 }, 
                 message="아직 등록된 기록이 없습니다."
             )
 
-        # 데이터 언팩 (쿼리 결과에서 객체와 유저 정보 분리)
-        res, uname, upic = best
+        top_records = []
+        for rank, (res, uname, upic) in enumerate(rows, start=1):
+            top_records.append({
+                "rank": rank,
+                "user_id": res.user_id,
+                "username": uname,
+                "profile_pic": upic,
+                "cpm": res.cpm,
+                "wpm": res.wpm,
+                "accuracy": res.accuracy,
+                "combo": res.combo,
+                "date": res.created_at.strftime('%Y-%m-%d')
+            })
+
+        # 1등 정보는 기존 응답 필드로 그대로 제공
+        first = top_records[0]
         data = {
-            "top_player": uname, 
-            "profile_pic": upic,
-            "best_cpm": res.cpm,
-            "best_wpm": res.wpm, 
-            "best_accuracy": res.accuracy,
-            "best_combo": res.combo,
-            "date": res.created_at.strftime('%Y-%m-%d')
+            "top_player": first["username"], 
+            "profile_pic": first["profile_pic"],
+            "best_cpm": first["cpm"],
+            "best_wpm": first["wpm"], 
+            "best_accuracy": first["accuracy"],
+            "best_combo": first["combo"],
+            "date": first["date"],
+            "top_records": top_records
         }
 
         # [한글 로그 추가]
-        current_app.logger.info(f" 글 ID:{t_id}의 1등 '{uname}' ({res.cpm}타) 정보를 조회했습니다.")
+        current_app.logger.info(f" 글 ID:{t_id}의 1등 '{first['username']}' ({first['cpm']}타) 포함 상위 {len(top_records)}명 정보를 조회했습니다.")
 
         return api_response(success=True, data=data, message="1등 기록을 성공적으로 가져왔습니다.")
 
     except Exception as e:
         current_app.logger.error(f"❌ 명예의 전당 조회 오류: {str(e)}")
         return api_response(success=False, error_code=500, message="서버 오류 발생", status_code=500)
+
+
+# 6-1. CPM 백분위 ("전체 / 이 글에서 상위 몇 %")
+@text_blueprint.route('/results/percentile', methods=['GET'])
+@swag_from(GET_RESULT_PERCENTILE_YAML_PATH)
+def get_result_percentile():
+    try:
+        cpm = request.args.get('cpm', type=int)
+        if cpm is None or cpm < 0:
+            return api_response(success=False, error_code=400, message="0 이상의 cpm이 필요합니다.", status_code=400)
+        text_id = request.args.get('text_id', type=int)
+
+        # 고정 구간 히스토그램의 누적합으로 계산 (결과 테이블을 세지 않음)
+        data = {"cpm": cpm, "text_id": text_id, **get_cpm_percentile(cpm, text_id)}
+
+        current_app.logger.info(
+            f"📊 [백분위조회] CPM {cpm}: 전체 {data['global']['percentile']}%"
+            + (f", 글 {text_id} {data['text']['percentile']}%" if data['text'] else "")
+        )
+        return api_response(success=True, data=data, message="CPM 백분위를 성공적으로 계산했습니다.")
+
+    except Exception as e:
+        current_app.logger.error(f"❌ 백분위 조회 오류: {str(e)}")
+        return api_response(success=False, error_code=500, message="서버 오류 발생", status_code=500)
     
 
+# 6-2. write-behind 접수 ID(provisional_id)로 저장 결과 조회
+@text_blueprint.route('/results/receipt/<string:receipt_id>', methods=['GET'])
+@swag_from(GET_RESULT_RECEIPT_YAML_PATH)
+def get_result_receipt(receipt_id):
+    try:
+        result = TypingResult.query.filter_by(receipt_id=receipt_id).first()
+        if result:
+            data = {"receipt_id": receipt_id, "status": "saved", "result_id": result.id,
+                    "user_id": result.user_id, "text_id": result.text_id}
+            return api_response(success=True, data=data, message="결과가 저장되었습니다.")
+
+        failed = db.session.get(FailedResult, receipt_id)
+        if failed:
+            data = {"receipt_id": receipt_id, "status": "failed", "result_id": None,
+                    "user_id": failed.user_id, "text_id": failed.text_id}
+            return api_response(success=True, data=data, message="결과 저장에 실패했습니다. 다시 저장해 주세요.")
+
+        # 아직 큐에 있거나, 저장 전에 워커가 비정상 종료되어 유실된 경우
+        data = {"receipt_id": receipt_id, "status": "pending", "result_id": None, "user_id": None, "text_id": None}
+        return api_response(success=True, data=data, message="결과가 아직 저장되지 않았습니다.")
+
+    except Exception as e:
+        current_app.logger.error(f"❌ 접수 결과 조회 오류: {str(e)}")
+        return api_response(success=False, error_code=500, message="서버 오류 발생", status_code=500)
+
+
     # 7. 찜하기 토글 (등록/취소)
 @text_blueprint.route('/favorite', methods=['POST'])
 @swag_from(POST_FAVORITE_YAML_PATH) # 나중에 Swagger 파일 만들면 연결하세요!
@@ -618,15 +1009,20 @@ def delete_specific_result(text_id, user_id, result_id):
                 status_code=404
             )
 
-        # 2. 삭제 수행
+        # 2. 삭제 수행 (최고 기록이었다면 personal_bests / 명예의 전당을 남은 기록으로 먼저 교체)
+        genre = result.typing_text.genre
+        if repair_personal_best(result):
+            repair_hall_of_fame(result)
         db.session.delete(result)
         db.session.flush()  # 삭제를 먼저 반영
         
-        # 3. 유저 통계 재계산 (SQL 집계 함수 활용)
-        recalculated_stats = recalculate_user_statistics(user_id)
+        # 3. 유저 통계 재계산 (누적 합계에서 빼기 + 필요한 최고 기록만 인덱스 MAX로 복구)
+        recalculated_stats = recalculate_user_statistics(user_id, result)
         if recalculated_stats:
+            repair_genre_bests(result, genre)
+            remove_result_from_periods(result)
             db.session.commit()
-            invalidate_user_cache()
+            invalidate_user_cache(user_id)
             current_app.logger.info(f"🗑️ [결과삭제] 유저 {user_id}의 기록 {result_id} 삭제 및 통계 재계산 완료")
         else:
             db.session.rollback()
@@ -1,11 +1,15 @@
 import os
+from datetime import datetime
 
 from flask import Blueprint, jsonify, request, current_app
-from app.models import User, TypingResult, TypingText
-from app.utils import api_response
+from app.models import User, TypingResult, TypingText, GenreBest, ALL_GENRES, KST, FORM_HALF_LIFE_DAYS
+from app.utils import api_response, get_page_size, decode_cursor, page_meta, DEFAULT_PAGE_SIZE
 from app.database import db
-from app.redis_client import cache_get, cache_set
+from app.redis_client import cache_get, cache_set, cache_get_or_set, namespaced_key
+from app.leaderboard import get_ranking_page, get_user_rank, get_ranking_around
+from app.periods import PERIOD_TYPES, PERIOD_SNAPSHOT_SIZE, get_period_ranking, period_bounds
 from flasgger import swag_from
+from sqlalchemy import func, select, and_, or_
 
 
 user_blueprint = Blueprint('user', __name__)
@@ -18,6 +22,47 @@ GET_HISTORY_ALL_YAML_PATH = os.path.join(BASE_DIR, 'swagger', 'get_history_all.y
 GET_HISTORY_RECENT_YAML_PATH = os.path.join(BASE_DIR, 'swagger', 'get_history_recent.yaml')
 GET_HISTORY_GENRE_YAML_PATH = os.path.join(BASE_DIR, 'swagger', 'get_history_genre.yaml')
 GET_USER_RANKING_YAML_PATH = os.path.join(BASE_DIR, 'swagger', 'get_user_ranking.yaml')
+GET_MY_RANKING_YAML_PATH = os.path.join(BASE_DIR, 'swagger', 'get_my_ranking.yaml')
+GET_RANKING_AROUND_YAML_PATH = os.path.join(BASE_DIR, 'swagger', 'get_ranking_around.yaml')
+GET_PERIOD_RANKING_YAML_PATH = os.path.join(BASE_DIR, 'swagger', 'get_period_ranking.yaml')
+GET_GENRE_RANKING_YAML_PATH = os.path.join(BASE_DIR, 'swagger', 'get_genre_ranking.yaml')
+GET_FORM_RANKING_YAML_PATH = os.path.join(BASE_DIR, 'swagger', 'get_form_ranking.yaml')
+
+# 최근 기록의 글 본문 미리보기 길이 (DB에서 잘라서 읽음)
+HISTORY_PREVIEW_LENGTH = 100
+
+# 내 주변 랭킹에서 위아래로 보여줄 최대 인원
+MAX_AROUND_K = 50
+
+# 장르별 랭킹 지표 -> genre_bests 컬럼 (각 컬럼은 (genre, 컬럼) 인덱스로 정렬 조회)
+GENRE_RANKING_METRICS = {
+    'cpm': GenreBest.best_cpm,
+    'wpm': GenreBest.best_wpm,
+    'accuracy': GenreBest.best_accuracy,
+    'combo': GenreBest.max_combo,
+}
+# /user/users 정렬 -> (키셋 정렬 컬럼, 내림차순 여부). 각 정렬은 같은 순서의 인덱스를 탑니다.
+USER_LIST_SORTS = {
+    'id': ((User.id,), False),
+    'username': ((User.username,), False),              # username unique 인덱스
+    'ranking_score': ((User.ranking_score, User.id), True),  # ix_users_ranking_score_id
+}
+DEFAULT_USER_SORT = 'id'
+
+# /user/users fields= 로 고를 수 있는 필드 -> (응답 그룹, 컬럼). user_id는 항상 포함
+USER_LIST_FIELDS = {
+    'username': ('account', User.username),
+    'email': ('account', User.email),
+    'profile_pic': ('account', User.profile_pic),
+    'ranking_score': ('account', User.ranking_score),
+    'play_count': ('stats', User.play_count),
+    'max_combo': ('stats', User.max_combo),
+    'avg_accuracy': ('stats', User.avg_accuracy),
+    'best_cpm': ('stats', User.best_cpm),
+    'avg_cpm': ('stats', User.avg_cpm),
+    'best_wpm': ('stats', User.best_wpm),
+    'avg_wpm': ('stats', User.avg_wpm),
+}
 GET_USER_FAVORITE_META_YAML_PATH = os.path.join(BASE_DIR, 'swagger', 'get_user_favorites_meta.yaml')
 
 # 1. 내 프로필 요약 정보
@@ -52,7 +97,8 @@ def get_user_profile(user_id):
                 "best_cpm": user.best_cpm,
                 "avg_cpm": user.avg_cpm,
                 "best_wpm": user.best_wpm,
-                "avg_wpm": user.avg_wpm
+                "avg_wpm": user.avg_wpm,
+                "current_form": user.current_form()
             }
         }
 
@@ -70,96 +116,230 @@ def get_user_profile(user_id):
         current_app.logger.error(f"❌ 프로필 조회 중 서버 에러: {str(e)}")
         return api_response(success=False, error_code=500, message="조회 중 오류가 발생했습니다.", status_code=500)
 
+
+def _after_keyset(columns, values, descending):
+    """(c1, c2, ...) 가 커서 값보다 뒤인 행 조건 (정렬 인덱스를 그대로 타는 OR 전개식)"""
+    conditions = []
+    for i, column in enumerate(columns):
+        beyond = column < values[i] if descending else column > values[i]
+        conditions.append(and_(*[c == v for c, v in zip(columns[:i], values[:i])], beyond))
+    return or_(*conditions)
+
+
+def _parse_ranking_cursor(cursor):
+    """
+    랭킹 커서 [지표 값, id, 마지막 순위]를 검증합니다. (순위를 커서에 담아 COUNT 없이 다음 페이지 순위를 이어 붙임)
+
+    Returns:
+        tuple: (키셋 값 [지표 값, id] 또는 None, 이전 페이지 마지막 순위)
+    Raises:
+        ValueError: 커서 형식이 잘못된 경우
+    """
+    if not cursor:
+        return None, 0
+    value, row_id, rank = decode_cursor(cursor, size=3)
+    if isinstance(value, bool) or not isinstance(value, (int, float)) \
+            or not all(isinstance(v, int) and not isinstance(v, bool) for v in (row_id, rank)) or rank < 0:
+        raise ValueError("잘못된 커서 형식입니다.")
+    return [value, row_id], rank
+
+
+def users_page_cache_key(sort=DEFAULT_USER_SORT, fields=tuple(USER_LIST_FIELDS), limit=DEFAULT_PAGE_SIZE, cursor=None):
+    """유저 목록 한 페이지의 캐시 키 (정렬/필드/크기/커서별로 따로 저장, 결과 저장 시 네임스페이스 버전으로 무효화)"""
+    return namespaced_key('users', f"page:{sort}:{','.join(fields)}:{limit}:{cursor or ''}")
+
+
+def _load_users_page(sort, fields, limit, after=None):
+    """
+    유저 목록 한 페이지를 DB에서 만듭니다.
+    요청한 필드 + 정렬 키 컬럼만 Core select로 읽으므로 ORM 객체를 만들지 않습니다.
+
+    Args:
+        sort: USER_LIST_SORTS의 키
+        fields: USER_LIST_FIELDS의 키 목록
+        limit: 페이지 크기
+        after: 이전 페이지 마지막 행의 정렬 키 값 (decode_cursor 결과)
+    """
+    sort_columns, descending = USER_LIST_SORTS[sort]
+    columns = list(dict.fromkeys([User.id, *sort_columns, *(USER_LIST_FIELDS[f][1] for f in fields)]))
+
+    query = select(*columns)
+    if after is not None:
+        query = query.where(_after_keyset(sort_columns, after, descending))
+    query = query.order_by(*(c.desc() if descending else c.asc() for c in sort_columns)).limit(limit + 1)
+    rows = db.session.execute(query).all()
+
+    user_list = []
+    for row in rows:
+        item = {"account": {"user_id": row.id}, "stats": {}}
+        for field in fields:
+            group, column = USER_LIST_FIELDS[field]
+            item[group][field] = getattr(row, column.key)
+        item["_cursor"] = [getattr(row, c.key) for c in sort_columns]
+        user_list.append(item)
+
+    user_list, meta = page_meta(user_list, limit, lambda u: u["_cursor"])
+    for item in user_list:
+        del item["_cursor"]
+    meta.update({"sort": sort, "fields": list(fields)})
+
+    data = {"users": user_list, "users_len": len(user_list)}
+    return {"data": data, "meta": meta, "message": "유저 목록을 성공적으로 가져왔습니다."}
+
+
+def _parse_users_page_args():
+    """
+    /user/users 쿼리 파라미터를 검증합니다.
+
+    Returns:
+        tuple: (sort, fields, limit, cursor, after)
+    Raises:
+        ValueError: 정렬/필드/커서가 잘못된 경우
+    """
+    sort = request.args.get('sort', DEFAULT_USER_SORT)
+    if sort not in USER_LIST_SORTS:
+        raise ValueError(f"정렬은 {', '.join(USER_LIST_SORTS)} 중 하나여야 합니다.")
+
+    fields_param = request.args.get('fields')
+    if fields_param:
+        requested = [f.strip() for f in fields_param.split(',') if f.strip()]
+        unknown = [f for f in requested if f not in USER_LIST_FIELDS]
+        if unknown:
+            raise ValueError(f"지원하지 않는 필드입니다: {', '.join(unknown)}")
+        # 캐시 키가 요청 순서에 따라 갈리지 않도록 정의 순서로 정렬
+        fields = tuple(f for f in USER_LIST_FIELDS if f in requested)
+    else:
+        fields = tuple(USER_LIST_FIELDS)
+
+    limit = get_page_size()
+    cursor = request.args.get('cursor')
+    after = None
+    if cursor:
+        sort_columns, _ = USER_LIST_SORTS[sort]
+        after = decode_cursor(cursor, size=len(sort_columns))
+        for column, value in zip(sort_columns, after):
+            if not isinstance(value, column.type.python_type) or isinstance(value, bool):
+                raise ValueError("잘못된 커서 형식입니다.")
+    return sort, fields, limit, cursor, after
+
+
 # 랭킹 조회용
 @user_blueprint.route('/users', methods=['GET'])
 @swag_from(GET_ALL_USER_PROFILE_YAML_PATH)
 def get_all_users():
     try:
-        # Redis 캐시 조회
-        cache_key = "user:users:all"
-        cached = cache_get(cache_key)
-        if cached:
-            current_app.logger.info(f"📋 [전체유저조회] Redis 캐시 히트 ({cached['data']['users_len']}명)")
-            return api_response(success=True, data=cached["data"], message=cached["message"])
-
-        # 1. 모든 유저 정보를 DB에서 가져옵니다.
-        users = User.query.all()
-
-        # 2. 질문자님이 작성하신 구조 그대로 리스트에 담습니다.
-        user_list = []
-        for user in users:
-            user_list.append({
-                "account": {
-                    "user_id": user.id,
-                    "username": user.username,
-                    "email": user.email,
-                    "profile_pic": user.profile_pic,
-                    "ranking_score": user.ranking_score  
-                },
-                "stats": {
-                    "play_count": user.play_count,
-                    "max_combo": user.max_combo,
-                    "avg_accuracy": user.avg_accuracy,
-                    "best_cpm": user.best_cpm,
-                    "avg_cpm": user.avg_cpm,
-                    "best_wpm": user.best_wpm,
-                    "avg_wpm": user.avg_wpm
-                }
-            })
+        sort, fields, limit, cursor, after = _parse_users_page_args()
+    except ValueError as e:
+        return api_response(success=False, error_code=400, message=str(e), status_code=400)
 
-        current_app.logger.info(f" 데이터 누락 없이 총 {len(user_list)}명의 정보를 전송합니다.")
-
-        data = {"users": user_list, "users_len": len(user_list)}
-        cache_set(cache_key, {"data": data, "message": "모든 유저의 상세 데이터를 성공적으로 가져왔습니다."})
+    try:
+        # 페이지 단위로 캐시 (없으면 한 워커만 DB에서 해당 페이지만 다시 계산)
+        cache_key = users_page_cache_key(sort, fields, limit, cursor)
+        cached, hit = cache_get_or_set(cache_key, lambda: _load_users_page(sort, fields, limit, after))
+        if hit:
+            current_app.logger.info(f"📋 [전체유저조회] Redis 캐시 히트 ({cached['data']['users_len']}명)")
+        else:
+            current_app.logger.info(f"📋 [전체유저조회] {sort} 순 {cached['data']['users_len']}명의 정보를 전송합니다.")
 
-        return api_response(
-            success=True, 
-            data=data, 
-            message="모든 유저의 상세 데이터를 성공적으로 가져왔습니다."
-        )
+        return api_response(success=True, data=cached["data"], message=cached["message"], meta=cached["meta"])
 
     except Exception as e:
         current_app.logger.error(f"❌ 전체 조회 중 서버 에러: {str(e)}")
         return api_response(success=False, message="데이터 조회 중 오류가 발생했습니다.", status_code=500)
+def _history_page(user_id, limit, genre=None, with_preview=False):
+    """
+    유저의 연습 기록을 (created_at, id) 최신순 키셋 페이지네이션으로 조회합니다.
+    글 메타 정보는 같은 쿼리에서 JOIN으로 읽고 (행마다 추가 조회 없음),
+    미리보기는 DB에서 HISTORY_PREVIEW_LENGTH자까지만 잘라 읽으므로 본문 전체를 가져오지 않습니다.
+
+    쿼리 파라미터:
+        - cursor: 이전 응답의 meta.next_cursor
+
+    Returns:
+        tuple: (history, meta)
+    Raises:
+        ValueError: 커서 형식이 잘못된 경우
+    """
+    columns = [
+        TypingResult.id, TypingResult.cpm, TypingResult.wpm, TypingResult.accuracy,
+        TypingResult.combo, TypingResult.created_at,
+        TypingText.id.label('text_id'), TypingText.title, TypingText.author,
+        TypingText.genre, TypingText.image_url,
+    ]
+    if with_preview:
+        columns.append(func.substr(TypingText.content, 1, HISTORY_PREVIEW_LENGTH).label('content_preview'))
+
+    # INNER JOIN을 사용하여 TypingText가 존재하는(삭제되지 않은) 결과만 필터링
+    query = select(*columns).join(TypingText, TypingText.id == TypingResult.text_id)\
+        .where(TypingResult.user_id == user_id)
+    if genre is not None:
+        query = query.where(TypingText.genre == genre)
+
+    cursor = request.args.get('cursor')
+    if cursor:
+        created_at, result_id = decode_cursor(cursor, size=2)
+        try:
+            created_at = datetime.fromisoformat(created_at)
+        except (TypeError, ValueError):
+            raise ValueError("잘못된 커서 형식입니다.")
+        if not isinstance(result_id, int):
+            raise ValueError("잘못된 커서 형식입니다.")
+        query = query.where(or_(
+            TypingResult.created_at < created_at,
+            and_(TypingResult.created_at == created_at, TypingResult.id < result_id)
+        ))
+
+    rows = db.session.execute(
+        query.order_by(TypingResult.created_at.desc(), TypingResult.id.desc()).limit(limit + 1)
+    ).all()
+
+    history = []
+    for r in rows:
+        text_info = {
+            "id": r.text_id,
+            "title": r.title,
+            "author": r.author,
+            "genre": r.genre,
+            "image_url": r.image_url
+        }
+        if with_preview:
+            text_info["content_preview"] = r.content_preview
+        history.append({
+            "result_id": r.id,
+            "cpm": r.cpm,
+            "wpm": r.wpm,
+            "accuracy": r.accuracy,
+            "combo": r.combo,
+            "date": r.created_at.strftime('%Y-%m-%d %H:%M'),
+            "text_info": text_info,
+            "_cursor": [r.created_at.isoformat(), r.id]
+        })
+
+    history, meta = page_meta(history, limit, lambda h: h["_cursor"])
+    for item in history:
+        del item["_cursor"]
+    return history, meta
+
+
 # 2. 유저 연습 결과 조회 <All>
 @user_blueprint.route('/history/all/<int:user_id>', methods=['GET'])
 @swag_from(GET_HISTORY_ALL_YAML_PATH)
 def get_all_history(user_id):
     
     try:
-        # INNER JOIN을 사용하여 TypingText가 존재하는(삭제되지 않은) 결과만 필터링
-        results = db.session.query(TypingResult)\
-                  .join(TypingText)\
-                  .filter(TypingResult.user_id == user_id)\
-                  .order_by(TypingResult.created_at.desc()).all()
-        
-        history = []
-        for r in results:
-            t = r.typing_text # join 했으므로 바로 접근 가능
-            history.append({
-                "result_id": r.id,
-                "cpm": r.cpm,
-                "wpm": r.wpm,
-                "accuracy": r.accuracy,
-                "combo": r.combo,
-                "date": r.created_at.strftime('%Y-%m-%d %H:%M'),
-                "text_info": {
-                    "id": t.id,
-                    "title": t.title,
-                    "author": t.author,
-                    "genre": t.genre,
-                    "image_url": t.image_url
-                }
-            })
+        history, meta = _history_page(user_id, get_page_size())
 
         # [로그 추가]
-        current_app.logger.info(f"📊 [전체조회] 유저 {user_id}의 전체 기록 {len(history)}개를 로드했습니다.")
+        current_app.logger.info(f"📊 [전체조회] 유저 {user_id}의 기록 {len(history)}개를 로드했습니다.")
 
         return api_response(
             success=True, 
             data=history, 
-            message=f"총 {len(history)}개의 기록을 성공적으로 조회했습니다."
+            message=f"총 {len(history)}개의 기록을 성공적으로 조회했습니다.",
+            meta=meta
         )
+    except ValueError as e:
+        return api_response(success=False, error_code=400, message=str(e), status_code=400)
     except Exception as e:
         current_app.logger.error(f"❌ 전체 기록 조회 오류: {str(e)}")
         return api_response(success=False, message="전체 기록 조회 중 오류가 발생했습니다.", status_code=500)
@@ -170,42 +350,20 @@ def get_all_history(user_id):
 def get_recent_history(user_id):
     
     try:
-        limit_val = request.args.get('limit', default=5, type=int)
-
-        # 1. DB 조회 (연관된 TypingText 정보를 한 번에 가져오기 위해 조인 쿼리 고려 가능)
-        results = TypingResult.query.filter_by(user_id=user_id)\
-                  .order_by(TypingResult.created_at.desc())\
-                  .limit(limit_val).all()
-        
-        # 2. 결과 가공 (모든 정보 포함)
-        history = []
-        for r in results:
-            t = r.typing_text  # 모델의 relationship 활용
-            history.append({
-                "result_id": r.id,
-                "cpm": r.cpm,
-                "wpm": r.wpm,
-                "accuracy": r.accuracy,
-                "combo": r.combo,
-                "date": r.created_at.strftime('%Y-%m-%d %H:%M'),
-                "text_info": {
-                    "id": t.id if t else None,
-                    "title": t.title if t else "삭제된 글",
-                    "author": t.author if t else "정보 없음",
-                    "genre": t.genre if t else "정보 없음",
-                    "image_url": t.image_url if t else None,
-                    "content_preview": t.content if t else "없음"
-                }
-            })
+        # 결과 + 글 정보 + 본문 미리보기를 한 번의 JOIN 쿼리로 조회
+        history, meta = _history_page(user_id, get_page_size(default=5), with_preview=True)
 
         current_app.logger.info(f"📜 [기록조회] 유저 {user_id}의 최근 기록 {len(history)}개를 반환했습니다.")
 
         return api_response(
             success=True, 
             data=history, 
-            message=f"최근 {len(history)}개 상세 기록 조회를 완료했습니다."
+            message=f"최근 {len(history)}개 상세 기록 조회를 완료했습니다.",
+            meta=meta
         )
 
+    except ValueError as e:
+        return api_response(success=False, error_code=400, message=str(e), status_code=400)
     except Exception as e:
         current_app.logger.error(f"❌ 최근 기록 조회 중 오류: {str(e)}")
         return api_response(success=False, message="서버 오류로 기록을 불러오지 못했습니다.", status_code=500)
@@ -222,30 +380,7 @@ def get_history_by_genre(user_id):
             return api_response(success=False, error_code=400, message="조회할 장르를 지정해주세요.", status_code=400)
 
         # TypingText 테이블과 JOIN하여 장르 필터링 수행
-        results = db.session.query(TypingResult)\
-                  .join(TypingText)\
-                  .filter(TypingResult.user_id == user_id)\
-                  .filter(TypingText.genre == genre_param)\
-                  .order_by(TypingResult.created_at.desc()).all()
-        
-        history = []
-        for r in results:
-            t = r.typing_text
-            history.append({
-                "result_id": r.id,
-                "cpm": r.cpm,
-                "wpm": r.wpm,
-                "accuracy": r.accuracy,
-                "combo": r.combo,
-                "date": r.created_at.strftime('%Y-%m-%d %H:%M'),
-                "text_info": {
-                    "id": t.id,
-                    "title": t.title,
-                    "author": t.author,
-                    "genre": t.genre,
-                    "image_url": t.image_url
-                }
-            })
+        history, meta = _history_page(user_id, get_page_size(), genre=genre_param)
 
         # [로그 추가] 
         current_app.logger.info(f"📂 [장르조회] 유저 {user_id}번이 '{genre_param}' 장르 기록 {len(history)}개를 조회했습니다.")
@@ -253,68 +388,275 @@ def get_history_by_genre(user_id):
         return api_response(
             success=True, 
             data=history, 
-            message=f"'{genre_param}' 장르 기록 {len(history)}개를 성공적으로 가져왔습니다."
+            message=f"'{genre_param}' 장르 기록 {len(history)}개를 성공적으로 가져왔습니다.",
+            meta=meta
         )
+    except ValueError as e:
+        return api_response(success=False, error_code=400, message=str(e), status_code=400)
     except Exception as e:
         current_app.logger.error(f"❌ 장르별 조회 오류: {str(e)}")
         return api_response(success=False, error_code=500, message="조회 중 서버 오류가 발생했습니다.", status_code=500)
     
+def _ranking_entry(rank, user):
+    """랭킹 목록의 한 항목 (순위 + 계정 정보 + 상세 통계)"""
+    return {
+        "rank": rank,
+        "account": {
+            "user_id": user.id,
+            "username": user.username,
+            "email": user.email,
+            "profile_pic": user.profile_pic,
+            "ranking_score": user.ranking_score
+        },
+        "stats": {
+            "play_count": user.play_count,
+            "max_combo": user.max_combo,
+            "avg_accuracy": user.avg_accuracy,
+            "best_cpm": user.best_cpm,
+            "avg_cpm": user.avg_cpm,
+            "best_wpm": user.best_wpm,
+            "avg_wpm": user.avg_wpm
+        }
+    }
+
+
+def _ranking_entries(ranked, first_rank):
+    """리더보드의 [(user_id, 점수), ...] 순서대로 유저를 PK로 한 번에 조회해 랭킹 항목을 만듭니다."""
+    user_ids = [user_id for user_id, _ in ranked]
+    users = {u.id: u for u in User.query.filter(User.id.in_(user_ids)).all()} if user_ids else {}
+    return [
+        _ranking_entry(first_rank + index, users[user_id])
+        for index, user_id in enumerate(user_ids) if user_id in users
+    ]
+
+
 # 5. 전체 유저 랭킹 조회 (모든 통계 정보 포함)
 @user_blueprint.route('/ranking', methods=['GET'])
 @swag_from(GET_USER_RANKING_YAML_PATH)
 def get_user_ranking():
     try:
-        limit_val = request.args.get('limit', default=10, type=int)
+        limit_val = get_page_size(default=10)
+        offset = max(0, request.args.get('offset', default=0, type=int))
 
-        # Redis 캐시 조회
-        cache_key = f"user:ranking:{limit_val}"
-        cached = cache_get(cache_key)
-        if cached:
-            current_app.logger.info(f"🏆 [랭킹조회] Redis 캐시 히트 (TOP {limit_val})")
-            return api_response(success=True, data=cached["data"], message=cached["message"])
+        # 리더보드(정렬 집합)에서 해당 구간의 유저 id만 가져온 뒤 PK로 조회
+        ranked, total = get_ranking_page(offset, limit_val)
+        ranking_list = _ranking_entries(ranked, offset + 1)
 
-        # ranking_score 내림차순 정렬
-        top_users = User.query.filter(User.ranking_score != None)\
-                        .order_by(User.ranking_score.desc())\
-                        .limit(limit_val).all()
-
-        ranking_list = []
-        for index, user in enumerate(top_users):
-            ranking_list.append({
-                "rank": index + 1,
-                "account": {
-                    "user_id": user.id,
-                    "username": user.username,
-                    "email": user.email,
-                    "profile_pic": user.profile_pic,
-                    "ranking_score": user.ranking_score
-                },
+        current_app.logger.info(f"🏆 [랭킹조회] {offset + 1}위부터 {len(ranking_list)}명 반환 (전체 {total}명)")
+
+        return api_response(
+            success=True,
+            data=ranking_list,
+            message=f"상위 {len(ranking_list)}명의 상세 정보를 성공적으로 가져왔습니다.",
+            meta={"offset": offset, "limit": limit_val, "total": total}
+        )
+
+    except Exception as e:
+        current_app.logger.error(f"❌ 랭킹 조회 에러: {str(e)}")
+        return api_response(success=False, error_code=500, message="서버 오류 발생", status_code=500)
+
+
+# 5-1. 특정 유저의 정확한 순위 조회
+@user_blueprint.route('/ranking/me/<int:user_id>', methods=['GET'])
+@swag_from(GET_MY_RANKING_YAML_PATH)
+def get_my_ranking(user_id):
+    try:
+        found = get_user_rank(user_id)
+        if not found:
+            return api_response(success=False, error_code=404, message="랭킹에서 유저를 찾을 수 없습니다.", status_code=404)
+
+        data = {"user_id": user_id, **found}
+        current_app.logger.info(f"🏆 [내순위조회] 유저 {user_id}: {found['rank']}위 / {found['total']}명")
+        return api_response(success=True, data=data, message=f"현재 {found['rank']}위입니다.")
+
+    except Exception as e:
+        current_app.logger.error(f"❌ 내 순위 조회 에러: {str(e)}")
+        return api_response(success=False, error_code=500, message="서버 오류 발생", status_code=500)
+
+
+# 5-2. 내 주변 랭킹 조회 (위아래 k명)
+@user_blueprint.route('/ranking/around/<int:user_id>', methods=['GET'])
+@swag_from(GET_RANKING_AROUND_YAML_PATH)
+def get_ranking_around_me(user_id):
+    try:
+        k = max(1, min(request.args.get('k', default=5, type=int), MAX_AROUND_K))
+
+        found = get_ranking_around(user_id, k)
+        if not found:
+            return api_response(success=False, error_code=404, message="랭킹에서 유저를 찾을 수 없습니다.", status_code=404)
+
+        players = _ranking_entries(found["players"], found["first_rank"])
+        current_app.logger.info(f"🏆 [주변랭킹조회] 유저 {user_id}: {found['rank']}위 기준 위아래 {k}명")
+
+        return api_response(
+            success=True,
+            data=players,
+            message=f"{found['rank']}위 주변 {len(players)}명의 순위를 가져왔습니다.",
+            meta={"user_id": user_id, "rank": found["rank"], "k": k, "total": found["total"]}
+        )
+
+    except Exception as e:
+        current_app.logger.error(f"❌ 주변 랭킹 조회 에러: {str(e)}")
+        return api_response(success=False, error_code=500, message="서버 오류 발생", status_code=500)
+
+
+# 5-3. 기간별 랭킹 조회 (일간/주간/시즌)
+@user_blueprint.route('/ranking/period/<period_type>', methods=['GET'])
+@swag_from(GET_PERIOD_RANKING_YAML_PATH)
+def get_period_ranking_list(period_type):
+    try:
+        if period_type not in PERIOD_TYPES:
+            return api_response(success=False, error_code=400,
+                                message=f"기간 종류는 {', '.join(PERIOD_TYPES)} 중 하나여야 합니다.", status_code=400)
+
+        limit_val = get_page_size(default=10, max_size=PERIOD_SNAPSHOT_SIZE)
+        key = request.args.get('key')
+        if key:
+            try:
+                period_bounds(period_type, key)
+            except ValueError:
+                return api_response(success=False, error_code=400, message="기간 키 형식이 올바르지 않습니다.", status_code=400)
+
+        found = get_period_ranking(period_type, key, limit_val)
+        if found is None:
+            return api_response(success=False, error_code=404, message="해당 기간의 랭킹 기록이 없습니다.", status_code=404)
+
+        start, end = period_bounds(period_type, found["period_key"])
+        current_app.logger.info(
+            f"📅 [기간랭킹조회] {period_type}:{found['period_key']} 상위 {len(found['ranking'])}명 "
+            f"({'스냅샷' if found['archived'] else '진행 중'})"
+        )
+
+        return api_response(
+            success=True,
+            data=found["ranking"],
+            message=f"{found['period_key']} 랭킹 상위 {len(found['ranking'])}명을 가져왔습니다.",
+            meta={
+                "period_type": period_type,
+                "period_key": found["period_key"],
+                "archived": found["archived"],
+                "participants": found["participants"],
+                "start": start.isoformat(),
+                "end": end.isoformat(),
+                "limit": limit_val
+            }
+        )
+
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"❌ 기간 랭킹 조회 에러: {str(e)}")
+        return api_response(success=False, error_code=500, message="서버 오류 발생", status_code=500)
+
+
+# 5-4. 장르별 / 지표별 랭킹 조회
+@user_blueprint.route('/ranking/genre', methods=['GET'])
+@swag_from(GET_GENRE_RANKING_YAML_PATH)
+def get_genre_ranking():
+    try:
+        metric = request.args.get('metric', 'cpm')
+        if metric not in GENRE_RANKING_METRICS:
+            return api_response(success=False, error_code=400,
+                                message=f"지표는 {', '.join(GENRE_RANKING_METRICS)} 중 하나여야 합니다.", status_code=400)
+        genre = request.args.get('genre') or ALL_GENRES
+        limit_val = get_page_size(default=10)
+        column = GENRE_RANKING_METRICS[metric]
+        try:
+            after, last_rank = _parse_ranking_cursor(request.args.get('cursor'))
+        except ValueError as e:
+            return api_response(success=False, error_code=400, message=str(e), status_code=400)
+
+        # genre_bests의 (genre, 지표, user_id) 인덱스를 역순으로 따라 필요한 구간만 읽습니다. (결과 테이블 GROUP BY / COUNT 없음)
+        keyset = [column, GenreBest.user_id]
+        query = db.session.query(GenreBest, User.username, User.profile_pic)\
+            .join(User, User.id == GenreBest.user_id)\
+            .filter(GenreBest.genre == genre)
+        if after is not None:
+            query = query.filter(_after_keyset(keyset, after, descending=True))
+        rows = query.order_by(*(c.desc() for c in keyset)).limit(limit_val + 1).all()
+
+        ranking_list = [
+            {
+                "rank": last_rank + index,
+                "account": {"user_id": best.user_id, "username": username, "profile_pic": profile_pic},
+                "value": getattr(best, column.key),
                 "stats": {
-                    "play_count": user.play_count,
-                    "max_combo": user.max_combo,
-                    "avg_accuracy": user.avg_accuracy,
-                    "best_cpm": user.best_cpm,
-                    "avg_cpm": user.avg_cpm,
-                    "best_wpm": user.best_wpm,
-                    "avg_wpm": user.avg_wpm
+                    "best_cpm": best.best_cpm,
+                    "best_wpm": best.best_wpm,
+                    "best_accuracy": best.best_accuracy,
+                    "max_combo": best.max_combo
                 }
-            })
+            }
+            for index, (best, username, profile_pic) in enumerate(rows, 1)
+        ]
+        ranking_list, meta = page_meta(ranking_list, limit_val,
+                                       lambda e: [e["value"], e["account"]["user_id"], e["rank"]])
 
-        current_app.logger.info(f"🏆 [랭킹조회] TOP {limit_val} 유저 데이터 반환 완료")
+        genre_label = "전체 장르" if genre == ALL_GENRES else f"'{genre}' 장르"
+        current_app.logger.info(f"🏅 [장르랭킹조회] {genre_label} {metric} {last_rank + 1}위부터 {len(ranking_list)}명 반환")
 
-        cache_set(cache_key, {
-            "data": ranking_list,
-            "message": f"상위 {len(ranking_list)}명의 상세 정보를 성공적으로 가져왔습니다."
-        })
+        meta.update({"genre": None if genre == ALL_GENRES else genre, "metric": metric})
+        return api_response(
+            success=True,
+            data=ranking_list,
+            message=f"{genre_label} {metric} 랭킹 {len(ranking_list)}명을 가져왔습니다.",
+            meta=meta
+        )
 
+    except Exception as e:
+        current_app.logger.error(f"❌ 장르 랭킹 조회 에러: {str(e)}")
+        return api_response(success=False, error_code=500, message="서버 오류 발생", status_code=500)
+
+
+
+# 5-5. 현재 폼 랭킹 조회 (최근 판 위주, 쉬면 점점 줄어듦)
+@user_blueprint.route('/ranking/form', methods=['GET'])
+@swag_from(GET_FORM_RANKING_YAML_PATH)
+def get_form_ranking():
+    try:
+        limit_val = get_page_size(default=10)
+        try:
+            after, last_rank = _parse_ranking_cursor(request.args.get('cursor'))
+        except ValueError as e:
+            return api_response(success=False, error_code=400, message=str(e), status_code=400)
+
+        # form_key 순서 = 지금 시점의 감쇠된 폼 순서이므로 (form_key, id) 인덱스를 역순으로 따라 필요한 구간만 읽습니다. (COUNT 없음)
+        keyset = [User.form_key, User.id]
+        query = User.query.filter(User.play_count > 0)
+        if after is not None:
+            query = query.filter(_after_keyset(keyset, after, descending=True))
+        players = query.order_by(*(c.desc() for c in keyset)).limit(limit_val + 1).all()
+
+        now = datetime.now(KST)
+        ranking_list = [
+            {
+                "rank": last_rank + index,
+                "account": {"user_id": user.id, "username": user.username, "profile_pic": user.profile_pic},
+                "value": user.current_form(now),
+                "stats": {
+                    "form_cpm": round(user.form_cpm, 2),
+                    "form_accuracy": round(user.form_accuracy, 2),
+                    "last_played_at": user.form_played_at.isoformat() if user.form_played_at else None
+                },
+                "_cursor": [user.form_key, user.id, last_rank + index]
+            }
+            for index, user in enumerate(players, 1)
+        ]
+        ranking_list, meta = page_meta(ranking_list, limit_val, lambda e: e["_cursor"])
+        for entry in ranking_list:
+            del entry["_cursor"]
+
+        current_app.logger.info(f"🔥 [폼랭킹조회] {last_rank + 1}위부터 {len(ranking_list)}명 반환")
+
+        meta["half_life_days"] = FORM_HALF_LIFE_DAYS
         return api_response(
             success=True,
             data=ranking_list,
-            message=f"상위 {len(ranking_list)}명의 상세 정보를 성공적으로 가져왔습니다."
+            message=f"현재 폼 랭킹 {len(ranking_list)}명을 가져왔습니다.",
+            meta=meta
         )
 
     except Exception as e:
-        current_app.logger.error(f"❌ 랭킹 조회 에러: {str(e)}")
+        current_app.logger.error(f"❌ 폼 랭킹 조회 에러: {str(e)}")
         return api_response(success=False, error_code=500, message="서버 오류 발생", status_code=500)
     
 
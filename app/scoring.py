@@ -0,0 +1,430 @@
+"""
+랭킹 점수 공식 버전 관리 및 일괄 재계산
+
+- 공식은 RANKING_FORMULAS에 버전별로 등록하고, 현재 사용 중인 버전은 app_state에 저장합니다.
+  (결과 저장/삭제 UPDATE는 app_state의 버전을 같은 문장 안에서 읽어 점수를 계산하고, 그 버전을 행에 함께 저장)
+- 공식을 바꾸면 저장된 버전이 다른 유저/진행 중인 기간 랭킹 행만 RECOMPUTE_CHUNK 단위로 읽어 NumPy로 한 번에 계산하고,
+  UPDATE ... CASE 한 문장으로 씁니다. (ORM 객체를 만들지 않음)
+- 섀도 모드: 후보 공식을 현재 공식과 나란히 계산해 순위 변동만 보고하고, 아무것도 쓰지 않습니다.
+"""
+import threading
+import time
+
+import click
+import numpy as np
+from flask.cli import with_appcontext
+from sqlalchemy import select, update, case, func
+
+from app.database import db
+from app.models import User, AppState, PeriodStat
+from app.redis_client import invalidate_user_cache
+from app.leaderboard import apply_leaderboard_changes
+
+FORMULA_VERSION_KEY = 'ranking_formula_version'
+DEFAULT_FORMULA_VERSION = 1
+# 다른 워커가 바꾼 공식 버전을 확인하는 주기 (초, 조회/섀도 비교용 캐시)
+FORMULA_CHECK_INTERVAL = 5
+# 재계산 시 한 번에 읽고 쓰는 행 수
+RECOMPUTE_CHUNK = 1000
+
+
+class RankingFormula:
+    """
+    랭킹 점수 공식
+    점수 = (최고타수 * w_best_cpm) + (평균정확도 * w_avg_accuracy) + (평균타수 * w_avg_cpm)
+          + (최고콤보 * w_max_combo) + min(판수 // bonus_per_plays, max_play_bonus)
+    """
+
+    def __init__(self, version, best_cpm, avg_accuracy, avg_cpm, max_combo,
+                 bonus_per_plays=10, max_play_bonus=50, description=''):
+        self.version = version
+        self.weights = {
+            'best_cpm': best_cpm,
+            'avg_accuracy': avg_accuracy,
+            'avg_cpm': avg_cpm,
+            'max_combo': max_combo,
+        }
+        self.bonus_per_plays = bonus_per_plays
+        self.max_play_bonus = max_play_bonus
+        self.description = description
+
+    def score(self, best_cpm, avg_accuracy, avg_cpm, max_combo, play_count):
+        """유저 1명의 점수 (결과 저장/삭제 시 사용)"""
+        w = self.weights
+        score = (
+            (best_cpm * w['best_cpm']) +
+            (avg_accuracy * w['avg_accuracy']) +
+            (avg_cpm * w['avg_cpm']) +
+            (max_combo * w['max_combo'])
+        )
+        play_bonus = min((play_count // self.bonus_per_plays), self.max_play_bonus)
+        return int(score + play_bonus)
+
+    def score_array(self, best_cpm, avg_accuracy, avg_cpm, max_combo, play_count):
+        """
+        여러 유저의 점수를 한 번에 계산합니다. (인자는 같은 길이의 NumPy 배열)
+        score()와 같은 순서로 더하므로 유저별 결과가 정확히 같습니다.
+        """
+        w = self.weights
+        score = (
+            (best_cpm * w['best_cpm']) +
+            (avg_accuracy * w['avg_accuracy']) +
+            (avg_cpm * w['avg_cpm']) +
+            (max_combo * w['max_combo'])
+        )
+        play_bonus = np.minimum(play_count // self.bonus_per_plays, self.max_play_bonus)
+        return np.trunc(score + play_bonus).astype(np.int64)
+
+    def sql_score(self, best_cpm, avg_accuracy, avg_cpm, max_combo, play_count):
+        """
+        score()와 같은 계산을 SQL 식으로 만듭니다. (결과 저장 UPDATE 안에서 바뀐 값으로 점수를 함께 계산할 때 사용)
+        인자는 컬럼 또는 SQL 식이며, 가중치와 통계가 음수가 아니므로 FLOOR가 int()의 버림과 같습니다.
+        """
+        w = self.weights
+        score = (
+            (best_cpm * w['best_cpm']) +
+            (avg_accuracy * w['avg_accuracy']) +
+            (avg_cpm * w['avg_cpm']) +
+            (max_combo * w['max_combo'])
+        )
+        bonus = play_count // self.bonus_per_plays
+        play_bonus = case((bonus < self.max_play_bonus, bonus), else_=self.max_play_bonus)
+        return func.floor(score + play_bonus)
+
+    def describe(self):
+        return {
+            "version": self.version,
+            "weights": dict(self.weights),
+            "bonus_per_plays": self.bonus_per_plays,
+            "max_play_bonus": self.max_play_bonus,
+            "description": self.description,
+        }
+
+
+# 등록된 공식 (새 공식은 버전을 올려 추가하고, 섀도 모드로 비교한 뒤 적용)
+RANKING_FORMULAS = {
+    1: RankingFormula(1, best_cpm=0.5, avg_accuracy=5.0, avg_cpm=0.2, max_combo=0.1,
+                      description="최고타수 중심 + 정확도 가점 + 판수 보너스(10판당 1점, 최대 50점)"),
+    # 후보: 한 번의 최고기록보다 평균 실력과 정확도 비중을 높임 (적용 전 섀도 비교 필요)
+    2: RankingFormula(2, best_cpm=0.3, avg_accuracy=10.0, avg_cpm=0.4, max_combo=0.1,
+                      description="평균타수 중심 + 정확도 가점 2배 + 판수 보너스(10판당 1점, 최대 50점)"),
+}
+
+_active_lock = threading.Lock()
+_active_version = None
+_checked_at = 0.0
+
+
+def get_formula(version):
+    """등록된 공식을 반환합니다. (없으면 ValueError)"""
+    formula = RANKING_FORMULAS.get(version)
+    if formula is None:
+        raise ValueError(f"등록되지 않은 랭킹 공식 버전입니다: {version}")
+    return formula
+
+
+def _read_active_version():
+    value = db.session.query(AppState.value).filter(AppState.key == FORMULA_VERSION_KEY).scalar()
+    return int(value) if value else DEFAULT_FORMULA_VERSION
+
+
+def get_active_formula():
+    """
+    현재 사용 중인 공식 (app_state 값을 FORMULA_CHECK_INTERVAL초 동안 캐시)
+    점수를 DB에 쓰는 경로는 캐시 대신 active_score_sql()을 사용합니다.
+    """
+    global _active_version, _checked_at
+    now = time.monotonic()
+    if _active_version is None or now - _checked_at >= FORMULA_CHECK_INTERVAL:
+        with _active_lock:
+            if _active_version is None or now - _checked_at >= FORMULA_CHECK_INTERVAL:
+                _active_version = _read_active_version()
+                _checked_at = now
+    return get_formula(_active_version)
+
+
+def active_version_sql():
+    """app_state의 현재 공식 버전을 읽는 스칼라 서브쿼리 (UPDATE 문 안에서 커밋된 버전을 바로 따르도록)"""
+    return func.coalesce(
+        select(AppState.value).where(AppState.key == FORMULA_VERSION_KEY).scalar_subquery(),
+        DEFAULT_FORMULA_VERSION
+    )
+
+
+def active_score_sql(best_cpm, avg_accuracy, avg_cpm, max_combo, play_count):
+    """
+    현재 공식 버전으로 계산한 점수 SQL 식 (등록된 공식별 sql_score를 버전으로 고르는 CASE)
+    같은 문장에서 formula_version도 active_version_sql()로 저장하면, 공식 변경과 엇갈린 저장은
+    이전 버전이 행에 남으므로 apply_ranking_formula가 그 행만 다시 계산합니다.
+    """
+    args = (best_cpm, avg_accuracy, avg_cpm, max_combo, play_count)
+    return case(
+        {version: formula.sql_score(*args) for version, formula in RANKING_FORMULAS.items()},
+        value=active_version_sql(),
+        else_=get_formula(DEFAULT_FORMULA_VERSION).sql_score(*args)
+    )
+
+
+def _set_active_version(version):
+    """app_state에 현재 공식 버전을 저장하고 이 워커의 캐시를 갱신합니다. (commit 포함)"""
+    global _active_version, _checked_at
+    updated = db.session.execute(
+        update(AppState).where(AppState.key == FORMULA_VERSION_KEY).values(value=version)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if not updated:
+        db.session.add(AppState(key=FORMULA_VERSION_KEY, value=version))
+    db.session.commit()
+    with _active_lock:
+        _active_version = version
+        _checked_at = time.monotonic()
+
+
+def _iter_user_chunks(chunk_size, stale_for=None):
+    """유저 통계를 id 순서로 chunk_size명씩 NumPy 배열로 읽습니다. (stale_for: 이 버전으로 계산되지 않은 유저만)"""
+    last_id = 0
+    while True:
+        query = select(User.id, User.best_cpm, User.avg_accuracy, User.avg_cpm, User.max_combo,
+                       User.play_count, User.ranking_score).where(User.id > last_id)
+        if stale_for is not None:
+            query = query.where(User.formula_version != stale_for)
+        rows = db.session.execute(query.order_by(User.id.asc()).limit(chunk_size)).all()
+        if not rows:
+            return
+        columns = np.array(rows, dtype=np.float64).T
+        yield {
+            'ids': columns[0].astype(np.int64),
+            'best_cpm': columns[1],
+            'avg_accuracy': columns[2],
+            'avg_cpm': columns[3],
+            'max_combo': columns[4],
+            'play_count': columns[5].astype(np.int64),
+            'ranking_score': columns[6].astype(np.int64),
+        }
+        last_id = int(rows[-1][0])
+
+
+def _score_users(formula, chunk):
+    return formula.score_array(chunk['best_cpm'], chunk['avg_accuracy'], chunk['avg_cpm'],
+                               chunk['max_combo'], chunk['play_count'])
+
+
+def _recompute_user_scores(formula, chunk_size):
+    """
+    다른 버전으로 계산된 유저 점수를 다시 계산하고 formula_version을 올립니다.
+    읽은 뒤 결과가 저장된 유저(play_count가 달라진 유저)는 건너뜁니다. (그 저장이 이전 버전을 읽었다면
+    행에 이전 버전이 남으므로 apply_ranking_formula의 다음 회차에서 다시 읽음)
+
+    Returns:
+        tuple: (읽은 유저 수, 다시 쓴 유저 수)
+    """
+    scanned = rewritten = 0
+    for chunk in _iter_user_chunks(chunk_size, stale_for=formula.version):
+        scanned += len(chunk['ids'])
+        scores = _score_users(formula, chunk)
+        ids = chunk['ids'].tolist()
+        rewritten += db.session.execute(
+            update(User)
+            .where(User.id.in_(ids), User.formula_version != formula.version,
+                   User.play_count == case(dict(zip(ids, chunk['play_count'].tolist())), value=User.id))
+            .values(ranking_score=case(dict(zip(ids, scores.tolist())), value=User.id),
+                    formula_version=formula.version)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.session.commit()
+
+        # Core UPDATE는 ORM 이벤트를 거치지 않으므로 점수가 바뀐 유저만 리더보드/캐시에 직접 반영합니다.
+        moved = chunk['ids'][scores != chunk['ranking_score']].tolist()
+        if moved:
+            apply_leaderboard_changes(dict(
+                db.session.query(User.id, User.ranking_score).filter(User.id.in_(moved)).all()
+            ))
+            invalidate_user_cache(*moved)
+    return scanned, rewritten
+
+
+def _recompute_period_scores(formula, chunk_size):
+    """
+    다른 버전으로 계산된 진행 중인 기간 랭킹(period_stats) 점수를 다시 계산합니다. (보관된 스냅샷은 그대로)
+
+    Returns:
+        tuple: (읽은 행 수, 다시 쓴 행 수)
+    """
+    scanned = rewritten = 0
+    stale = PeriodStat.formula_version != formula.version
+    periods = db.session.query(PeriodStat.period_type, PeriodStat.period_key).filter(stale).distinct().all()
+    for period_type, period_key in periods:
+        last_user_id = 0
+        while True:
+            rows = db.session.execute(
+                select(PeriodStat.user_id, PeriodStat.best_cpm, PeriodStat.total_accuracy, PeriodStat.total_cpm,
+                       PeriodStat.max_combo, PeriodStat.play_count)
+                .where(PeriodStat.period_type == period_type, PeriodStat.period_key == period_key,
+                       PeriodStat.user_id > last_user_id, stale)
+                .order_by(PeriodStat.user_id.asc()).limit(chunk_size)
+            ).all()
+            if not rows:
+                break
+            last_user_id = int(rows[-1][0])
+            scanned += len(rows)
+
+            columns = np.array(rows, dtype=np.float64).T
+            play_count = columns[5].astype(np.int64)
+            count = np.maximum(play_count, 1)
+            scores = formula.score_array(columns[1], columns[2] / count, columns[3] / count,
+                                         columns[4], play_count)
+
+            user_ids = columns[0].astype(np.int64).tolist()
+            rewritten += db.session.execute(
+                update(PeriodStat)
+                .where(PeriodStat.period_type == period_type, PeriodStat.period_key == period_key,
+                       PeriodStat.user_id.in_(user_ids), stale,
+                       PeriodStat.play_count == case(dict(zip(user_ids, play_count.tolist())),
+                                                     value=PeriodStat.user_id))
+                .values(score=case(dict(zip(user_ids, scores.tolist())), value=PeriodStat.user_id),
+                        formula_version=formula.version)
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            db.session.commit()
+    return scanned, rewritten
+
+
+def apply_ranking_formula(version, chunk_size=RECOMPUTE_CHUNK):
+    """
+    공식 버전을 바꾸고, 저장된 버전이 다른 유저 / 진행 중인 기간 랭킹 행만 다시 계산합니다.
+    버전을 먼저 커밋하므로 이후의 저장은 UPDATE 안에서 새 버전을 읽습니다. 재계산과 엇갈려 이전 버전으로 저장된 행은
+    행의 버전이 그대로 남으므로, 이전 버전 행이 없어질 때까지 그 행만 다시 읽습니다. (같은 버전으로 다시 실행해도 안전)
+
+    Returns:
+        dict: {"version", "previous_version", "scanned_users", "updated_users", "updated_period_rows", "elapsed_ms"}
+    """
+    formula = get_formula(version)
+    started = time.perf_counter()
+    previous_version = _read_active_version()
+    _set_active_version(formula.version)
+
+    scanned = updated_users = updated_periods = 0
+    while True:
+        user_rows, user_updates = _recompute_user_scores(formula, chunk_size)
+        period_rows, period_updates = _recompute_period_scores(formula, chunk_size)
+        scanned += user_rows
+        updated_users += user_updates
+        updated_periods += period_updates
+        if not user_rows and not period_rows:
+            break
+
+    return {
+        "version": formula.version,
+        "previous_version": previous_version,
+        "scanned_users": scanned,
+        "updated_users": updated_users,
+        "updated_period_rows": updated_periods,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 2),
+    }
+
+
+def _ranks(ids, scores):
+    """(점수 내림차순, user_id 오름차순) 기준 1부터 시작하는 순위 배열 (리더보드와 같은 정렬)"""
+    order = np.lexsort((ids, -scores))
+    ranks = np.empty(len(ids), dtype=np.int64)
+    ranks[order] = np.arange(1, len(ids) + 1)
+    return ranks
+
+
+def shadow_ranking_formula(version, top_n=100, movers=10, chunk_size=RECOMPUTE_CHUNK):
+    """
+    후보 공식을 현재 공식과 나란히 계산해 순위 변동을 비교합니다. (DB에 쓰지 않음)
+
+    Returns:
+        dict: 점수가 바뀌는 유저 수, 평균/최대 순위 변동, 상위 top_n 유지 비율, 스피어만 상관계수,
+              순위 변동이 가장 큰 유저 movers명
+    """
+    live = get_active_formula()
+    candidate = get_formula(version)
+
+    ids, live_scores, candidate_scores = [], [], []
+    for chunk in _iter_user_chunks(chunk_size):
+        ids.append(chunk['ids'])
+        live_scores.append(_score_users(live, chunk))
+        candidate_scores.append(_score_users(candidate, chunk))
+
+    report = {"live_version": live.version, "candidate_version": candidate.version, "users": 0}
+    if not ids:
+        return report
+
+    ids = np.concatenate(ids)
+    live_scores = np.concatenate(live_scores)
+    candidate_scores = np.concatenate(candidate_scores)
+    live_ranks = _ranks(ids, live_scores)
+    candidate_ranks = _ranks(ids, candidate_scores)
+    shift = live_ranks - candidate_ranks  # 양수면 순위 상승
+
+    n = len(ids)
+    top_n = min(top_n, n)
+    live_top = set(ids[live_ranks <= top_n].tolist())
+    candidate_top = set(ids[candidate_ranks <= top_n].tolist())
+    spearman = 1.0 if n < 2 else 1 - 6 * float(np.sum(shift.astype(np.float64) ** 2)) / (n * (n ** 2 - 1))
+
+    biggest = np.argsort(-np.abs(shift), kind='stable')[:movers]
+    report.update({
+        "users": n,
+        "changed_scores": int(np.count_nonzero(live_scores != candidate_scores)),
+        "changed_ranks": int(np.count_nonzero(shift)),
+        "mean_abs_rank_shift": round(float(np.mean(np.abs(shift))), 2),
+        "max_rank_shift": int(np.max(np.abs(shift))),
+        "top_n": top_n,
+        "top_n_overlap": round(len(live_top & candidate_top) / top_n, 4),
+        "spearman": round(spearman, 6),
+        "biggest_movers": [
+            {
+                "user_id": int(ids[i]),
+                "live_rank": int(live_ranks[i]),
+                "candidate_rank": int(candidate_ranks[i]),
+                "live_score": int(live_scores[i]),
+                "candidate_score": int(candidate_scores[i]),
+            }
+            for i in biggest if shift[i] != 0
+        ],
+    })
+    return report
+
+
+@click.group('ranking-formula')
+def ranking_formula_command():
+    """랭킹 점수 공식 조회 / 섀도 비교 / 적용"""
+
+
+@ranking_formula_command.command('show')
+@with_appcontext
+def show_formula_command():
+    """현재 공식과 등록된 공식 목록을 출력합니다."""
+    active = get_active_formula()
+    for version in sorted(RANKING_FORMULAS):
+        mark = '*' if version == active.version else ' '
+        click.echo(f"{mark} v{version}: {RANKING_FORMULAS[version].describe()}")
+
+
+@ranking_formula_command.command('shadow')
+@click.argument('version', type=int)
+@click.option('--top-n', default=100, show_default=True, help='상위 몇 명의 유지 비율을 볼지')
+@with_appcontext
+def shadow_formula_command(version, top_n):
+    """후보 공식을 현재 공식과 비교합니다. (DB에 쓰지 않음)"""
+    report = shadow_ranking_formula(version, top_n=top_n)
+    for key, value in report.items():
+        if key != 'biggest_movers':
+            click.echo(f"{key}: {value}")
+    for mover in report.get('biggest_movers', []):
+        click.echo(f"  유저 {mover['user_id']}: {mover['live_rank']}위 -> {mover['candidate_rank']}위 "
+                   f"({mover['live_score']} -> {mover['candidate_score']})")
+
+
+@ranking_formula_command.command('apply')
+@click.argument('version', type=int)
+@with_appcontext
+def apply_formula_command(version):
+    """공식 버전을 바꾸고 전체 점수를 다시 계산합니다."""
+    summary = apply_ranking_formula(version)
+    click.echo(f"✅ 랭킹 공식 v{summary['previous_version']} -> v{summary['version']}: "
+               f"유저 {summary['scanned_users']}명 중 {summary['updated_users']}명, "
+               f"기간 랭킹 {summary['updated_period_rows']}행 갱신 ({summary['elapsed_ms']}ms)")
@@ -1,14 +1,106 @@
-from flask import jsonify
+import base64
+import json
+from flask import jsonify, request, current_app
 
-def api_response(success=True, data=None, error_code=None, message=None, status_code=200):
+# 목록 API 페이지 크기 기본값 / 상한
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+def api_response(success=True, data=None, error_code=None, message=None, status_code=200, meta=None):
     """
     프론트엔드에게 보낼 공통 응답 규격
+    meta: 페이지네이션 정보 등 부가 정보 (전달된 경우에만 응답에 포함)
     """
-    return jsonify({
+    body = {
         "success": success,
         "data": data,         # 성공 시 결과값 (리스트, 딕셔너리 등)
         "error": {            # 실패 시 정보 (성공 시엔 None)
             "code": error_code,
             "message": message
         } if not success else None
-    }), status_code
\ No newline at end of file
+    }
+    if meta is not None:
+        body["meta"] = meta
+    return jsonify(body), status_code
+
+
+def get_bool_arg(name, default=False):
+    """쿼리 스트링의 true/false 값을 bool로 변환합니다."""
+    value = request.args.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ('1', 'true', 'yes', 'y')
+
+
+def get_page_size(default=DEFAULT_PAGE_SIZE, max_size=MAX_PAGE_SIZE):
+    """limit 파라미터를 1 ~ max_size 범위로 보정하여 반환합니다."""
+    limit = request.args.get('limit', default=default, type=int)
+    return max(1, min(limit, max_size))
+
+
+def encode_cursor(values):
+    """키셋 페이지네이션용 커서를 URL-safe 문자열로 인코딩합니다."""
+    raw = json.dumps(values, separators=(',', ':'), default=str).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor, size=None):
+    """
+    encode_cursor로 만든 커서를 복원합니다.
+    형식이 잘못되었거나 값 개수(size)가 맞지 않으면 ValueError를 발생시킵니다.
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except Exception:
+        raise ValueError("잘못된 커서 형식입니다.")
+    if not isinstance(values, list) or (size is not None and len(values) != size):
+        raise ValueError("잘못된 커서 형식입니다.")
+    return values
+
+
+def page_meta(items, limit, cursor_of):
+    """
+    limit + 1개를 조회한 결과에서 다음 페이지 여부를 판단하고 meta 정보를 만듭니다.
+
+    Returns:
+        tuple: (현재 페이지 items, meta dict)
+    """
+    has_more = len(items) > limit
+    items = items[:limit]
+    next_cursor = encode_cursor(cursor_of(items[-1])) if has_more and items else None
+    return items, {"limit": limit, "has_more": has_more, "next_cursor": next_cursor}
+
+
+def is_not_modified(etag):
+    """요청의 If-None-Match 헤더가 etag와 일치하는지 확인합니다."""
+    return bool(etag) and request.if_none_match.contains_weak(etag)
+
+
+def _cache_control_for_endpoint(default):
+    """CACHE_CONTROL 설정(엔드포인트별)에서 Cache-Control 값을 찾고, 없으면 default를 사용합니다."""
+    return current_app.config.get('CACHE_CONTROL', {}).get(request.endpoint, default)
+
+
+def not_modified_response(etag, cache_control=None):
+    """본문 없이 304 Not Modified 응답을 만듭니다."""
+    response = current_app.response_class(status=304)
+    response.set_etag(etag)
+    value = _cache_control_for_endpoint(cache_control)
+    if value:
+        response.headers['Cache-Control'] = value
+    return response
+
+
+def with_cache_headers(result, etag=None, cache_control=None):
+    """
+    api_response 결과에 ETag / Cache-Control 헤더를 붙입니다.
+    ETag는 200 응답에만 붙입니다.
+    """
+    response, status_code = result
+    if etag and status_code == 200:
+        response.set_etag(etag)
+    value = _cache_control_for_endpoint(cache_control)
+    if value:
+        response.headers['Cache-Control'] = value
+    return response, status_code
@@ -14,8 +14,8 @@ def check_server_health(target_host, max_retries=10, retry_delay=3):
     
     for i in range(max_retries):
         try:
-            # 간단한 엔드포인트로 서버 확인
-            response = requests.get(f"{target_host}/text/all", timeout=5)
+            # 간단한 엔드포인트로 서버 확인 (본문 없이 1건만 조회)
+            response = requests.get(f"{target_host}/text/all?limit=1&include_content=false", timeout=5)
             if response.status_code == 200:
                 print(f"✅ 서버 준비 완료! ({i+1}번째 시도)")
                 return True
@@ -11,6 +11,8 @@ from app.models import User, TypingText, TypingResult
 def app():
     """테스트 세션 동안 딱 한 번 앱과 DB 테이블을 생성합니다."""
     os.environ['ENV'] = 'testing'
+    # 히스토그램 flusher 스레드 없이 테스트에서 직접 flush
+    os.environ['HISTOGRAM_FLUSH_INTERVAL'] = '0'
     app = create_app(config_mode='testing')
     
     with app.app_context():
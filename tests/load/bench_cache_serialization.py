@@ -0,0 +1,84 @@
+"""
+캐시 직렬화 방식 비교 벤치마크: 이전 JSON 문자열 vs json/msgpack (+ zlib/brotli 압축)
+
+실행:
+    python tests/load/bench_cache_serialization.py            # 유저 2000명, 100회 반복
+    python tests/load/bench_cache_serialization.py 10000 50   # 유저 10000명, 50회 반복
+
+실제 API와 같은 페이로드(유저 목록 한 페이지 캐시 항목, 랭킹 상위 100명 응답)를 만들어
+방식별 인코딩/디코딩 시간과 저장 바이트 수를 비교합니다. (Redis 왕복 비용은 제외)
+"""
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from app import create_app
+from app.database import db
+from app.models import User
+from app.redis_client import COMPRESSORS, encode_value, decode_value
+from app.leaderboard import rebuild_leaderboard, get_ranking_page
+from app.utils import MAX_PAGE_SIZE
+from app.routes.user.views import _load_users_page, _ranking_entries, USER_LIST_FIELDS
+
+
+def make_user(i):
+    cpm = random.randint(150, 900)
+    return User(
+        username=f"bench_{i}", email=f"bench_{i}@test.com",
+        profile_pic=f"https://example.com/profile/{i}.png",
+        play_count=random.randint(1, 3000), best_cpm=cpm, best_wpm=cpm // 5,
+        avg_cpm=round(cpm * 0.8, 2), avg_wpm=round(cpm * 0.16, 2),
+        avg_accuracy=round(random.uniform(85.0, 100.0), 2), max_combo=random.randint(10, 500),
+        ranking_score=random.randint(0, 5000)
+    )
+
+
+def measure(func, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    return (time.perf_counter() - started) / repeat * 1000, result
+
+
+def run(user_count, repeat):
+    app = create_app(config_mode='testing')
+    with app.app_context():
+        db.create_all()
+        db.session.add_all([make_user(i) for i in range(user_count)])
+        db.session.commit()
+        rebuild_leaderboard()
+        ranked, _ = get_ranking_page(0, 100)
+        payloads = {
+            f"user:users:page({MAX_PAGE_SIZE})": _load_users_page('id', tuple(USER_LIST_FIELDS), MAX_PAGE_SIZE),
+            "ranking:100": {"data": _ranking_entries(ranked, 1)},
+        }
+
+    variants = [("json (이전 방식)", None, None)]
+    for serializer in ("json", "msgpack"):
+        for compression in ["none"] + list(COMPRESSORS):
+            variants.append((f"{serializer} + {compression}", serializer, compression))
+
+    for key, value in payloads.items():
+        print(f"\n[{key}] 유저 {user_count}명, {repeat}회 평균")
+        print(f"  {'방식':<20}{'바이트':>12}{'인코딩(ms)':>14}{'디코딩(ms)':>14}")
+        for label, serializer, compression in variants:
+            if serializer is None:
+                encode_ms, data = measure(lambda: json.dumps(value, default=str), repeat)
+                decode_ms, _ = measure(lambda: json.loads(data), repeat)
+                size = len(data.encode())
+            else:
+                encode_ms, data = measure(lambda: encode_value(value, serializer, compression), repeat)
+                decode_ms, decoded = measure(lambda: decode_value(data), repeat)
+                assert decoded == value
+                size = len(data)
+            print(f"  {label:<20}{size:>12,}{encode_ms:>14.3f}{decode_ms:>14.3f}")
+
+
+if __name__ == '__main__':
+    user_count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    run(user_count, repeat)
@@ -0,0 +1,77 @@
+"""
+결과 저장 처리량 비교 벤치마크: 단건 저장(POST /text/results) vs 묶음 저장(POST /text/results/batch)
+
+실행:
+    python tests/load/bench_result_batch.py              # 기본 1000건, 묶음 크기 50
+    python tests/load/bench_result_batch.py 5000 100     # 5000건, 묶음 크기 100
+    BENCH_DATABASE=/tmp/bench.db python tests/load/bench_result_batch.py   # 파일 DB로 측정 (커밋 비용 포함)
+
+테스트 클라이언트로 앱을 직접 호출하므로 네트워크 비용은 제외되고, 요청당 처리 비용만 비교합니다.
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from app import create_app
+from app.database import db
+from app.models import User, TypingText
+
+
+def make_result(user_id, text_id):
+    cpm = random.randint(200, 800)
+    return {
+        "user_id": user_id,
+        "text_id": text_id,
+        "cpm": cpm,
+        "wpm": cpm // 5,
+        "accuracy": round(random.uniform(85.0, 100.0), 1),
+        "combo": random.randint(10, 200)
+    }
+
+
+def run(total, batch_size):
+    db_path = os.getenv('BENCH_DATABASE') or os.path.join(tempfile.mkdtemp(), 'bench.db')
+    # DATABASE_URL을 쓰는 production 설정으로 벤치마크 전용 DB 파일에 연결
+    os.environ['DATABASE_URL'] = 'sqlite:///' + db_path
+    app = create_app(config_mode='production')
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        users = [User(username=f"bench_{i}", email=f"bench_{i}@test.com") for i in range(10)]
+        text = TypingText(genre="IT", title="bench", author="bench", content="bench content")
+        db.session.add_all(users + [text])
+        db.session.commit()
+        user_ids = [u.id for u in users]
+        text_id = text.id
+
+        client = app.test_client()
+        payloads = [make_result(random.choice(user_ids), text_id) for _ in range(total)]
+
+        # 1. 단건 저장
+        started = time.perf_counter()
+        for body in payloads:
+            assert client.post('/text/results', json=body).status_code == 201
+        single_elapsed = time.perf_counter() - started
+
+        # 2. 묶음 저장
+        started = time.perf_counter()
+        for i in range(0, total, batch_size):
+            r = client.post('/text/results/batch', json={"results": payloads[i:i + batch_size]})
+            assert r.status_code == 201
+        batch_elapsed = time.perf_counter() - started
+
+    print(f"결과 {total}건 저장 (DB: {db_path})")
+    print(f"  단건 저장   : {single_elapsed:8.3f}s  ({total / single_elapsed:8.1f}건/s)")
+    print(f"  묶음({batch_size:>3}개) : {batch_elapsed:8.3f}s  ({total / batch_elapsed:8.1f}건/s)")
+    print(f"  처리량 배수 : x{single_elapsed / batch_elapsed:.1f}")
+
+
+if __name__ == '__main__':
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    batch_size = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    run(total, min(batch_size, 100))
@@ -17,7 +17,7 @@ class TypingFullCircuitTest(HttpUser):
 
     def ensure_text_id(self):
         """기본 지문 ID 확보"""
-        with self.client.get("/text/all", name="[Setup] Get Initial Text", catch_response=True) as r:
+        with self.client.get("/text/all?include_content=false", name="[Setup] Get Initial Text", catch_response=True) as r:
             if r.status_code == 200:
                 data = r.json().get('data', [])
                 if data:
@@ -1,6 +1,7 @@
 import pytest
 import io, random
-from tests.utils import random_string, pick_random, random_number
+import threading
+from tests.utils import random_string, pick_random, random_number, FakeRedis
 from unittest.mock import patch
 from app.models import User, TypingText, TypingResult
 from app.database import db
@@ -516,8 +517,746 @@ class TestTextAPI:
         # 5. 빈 JSON 본문 전송 테스트
         r = client.post('/text/results', json={})
         assert r.status_code == 400
-        
-   
-      
-    
-   
\ No newline at end of file
+
+    def test_TC216_텍스트_목록_커서_페이지네이션_확인(self, client):
+        """limit/cursor 페이지네이션으로 전체 목록을 중복 없이 순회하는지 검증"""
+        r = client.get('/text/all?paginate=false')
+        assert r.status_code == 200
+        expect_ids = [t["id"] for t in r.get_json()["data"]]
+
+        page_ids = []
+        cursor = None
+        while True:
+            q = '?limit=3' + (f'&cursor={cursor}' if cursor else '')
+            r = client.get(f'/text/all{q}')
+            assert r.status_code == 200
+            r_data = r.get_json()
+            assert len(r_data["data"]) <= 3
+            page_ids.extend(t["id"] for t in r_data["data"])
+            cursor = r_data["meta"]["next_cursor"]
+            if not r_data["meta"]["has_more"]:
+                assert cursor is None
+                break
+
+        assert page_ids == expect_ids
+        assert page_ids == sorted(page_ids)
+
+    def test_TC217_텍스트_메타데이터_전용_조회_확인(self, client):
+        """include_content=false 시 본문 없이 메타데이터만 반환하는지 검증"""
+        r = client.get('/text/?genre=IT&include_content=false&limit=5')
+        assert r.status_code == 200
+        result = r.get_json()["data"]
+
+        expect_res_attr = {'author', 'genre', 'id', 'image_url', 'title'}
+        for attr in result:
+            assert set(attr.keys()) == expect_res_attr
+            assert attr["genre"] == "IT"
+
+        # 잘못된 커서는 400
+        r = client.get('/text/all?cursor=not-a-cursor')
+        assert r.status_code == 400
+        assert r.get_json()["success"] is False
+
+    @patch('app.routes.text.views.s3')
+    def test_TC218_카탈로그_캐시_버전_무효화_확인(self, mock_s3, client, app, create_text):
+        """글 추가/삭제 및 다른 워커의 버전 증가가 캐시 조회에 즉시 반영되는지 검증"""
+        from app.routes.text.catalog import record_text_change
+
+        # 1. 캐시 적재 후 글 추가 -> 바로 목록에 보여야 함
+        client.get('/text/all?paginate=false')
+        response, _ = create_text(genre="IT")
+        new_text_id = response.get_json()['data']['id']
+
+        ids = [t["id"] for t in client.get('/text/all?paginate=false').get_json()["data"]]
+        assert new_text_id in ids
+        assert client.get(f'/text/{new_text_id}').status_code == 200
+
+        # 2. 다른 워커가 DB에 직접 쓰고 버전만 올린 경우 (현재 워커 스냅샷은 모름)
+        other = TypingText(genre="IT", title="other-worker", author="w2", content="from another worker")
+        db.session.add(other)
+        db.session.flush()
+        record_text_change(other.id, 'add')
+        db.session.commit()
+        other_id = other.id
+
+        ids = [t["id"] for t in client.get('/text/?genre=IT&paginate=false').get_json()["data"]]
+        assert other_id in ids
+
+        # 3. 삭제 후에는 목록/상세 모두에서 사라져야 함
+        assert client.delete(f'/text/{new_text_id}').status_code == 200
+        ids = [t["id"] for t in client.get('/text/all?paginate=false').get_json()["data"]]
+        assert new_text_id not in ids
+        assert client.get(f'/text/{new_text_id}').status_code == 404
+
+        # 4. 캐시를 끈 DB 직접 조회 결과와 동일해야 함
+        cached = client.get('/text/all?limit=7').get_json()
+        app.config['TEXT_CATALOG_CACHE'] = False
+        try:
+            uncached = client.get('/text/all?limit=7').get_json()
+        finally:
+            app.config['TEXT_CATALOG_CACHE'] = True
+        assert cached["data"] == uncached["data"]
+        assert cached["meta"] == uncached["meta"]
+
+    @patch('app.routes.text.views.s3')
+    def test_TC219_텍스트_장르별_랜덤_조회_확인(self, mock_s3, client, create_text):
+        """장르 필터 랜덤 조회 시 해당 장르 글만 중복 없이 반환하는지 검증"""
+        for _ in range(3):
+            create_text(genre="poem")
+
+        r = client.get('/text/main/10?genre=poem')
+        assert r.status_code == 200
+        result = r.get_json()['data']
+
+        ids = [t["id"] for t in result]
+        assert 0 < len(ids) <= 10
+        assert len(ids) == len(set(ids))
+        for t in result:
+            assert t["genre"] == "poem"
+
+        # 없는 장르는 빈 목록
+        r = client.get('/text/main/5?genre=no-such-genre')
+        assert r.status_code == 200
+        assert r.get_json()['data'] == []
+
+    @patch('app.routes.text.views.s3')
+    def test_TC220_ETag_조건부_응답_확인(self, mock_s3, client, app, create_text):
+        """목록/상세 ETag 발급, If-None-Match 일치 시 304, 변경 시 새 ETag 발급 검증"""
+        # 1. 목록: 같은 버전이면 304 (본문 없음)
+        r = client.get('/text/all?limit=5')
+        etag = r.headers.get('ETag')
+        assert r.status_code == 200 and etag
+        assert r.headers.get('Cache-Control') == 'no-cache'
+
+        r = client.get('/text/all?limit=5', headers={'If-None-Match': etag})
+        assert r.status_code == 304
+        assert r.data == b''
+
+        # 쿼리 파라미터가 다르면 다른 ETag
+        assert client.get('/text/all?limit=6').headers.get('ETag') != etag
+
+        # 2. 글이 추가되면 버전이 바뀌어 200 + 새 ETag
+        response, _ = create_text(genre="IT")
+        new_text_id = response.get_json()['data']['id']
+        r = client.get('/text/all?limit=5', headers={'If-None-Match': etag})
+        assert r.status_code == 200
+        assert r.headers.get('ETag') != etag
+
+        # 3. 상세: 내용 해시 기반 ETag
+        r = client.get(f'/text/{new_text_id}')
+        detail_etag = r.headers.get('ETag')
+        assert r.status_code == 200 and detail_etag
+        r = client.get(f'/text/{new_text_id}', headers={'If-None-Match': detail_etag})
+        assert r.status_code == 304
+
+        # 유저별 응답에는 ETag를 붙이지 않음
+        r = client.get(f'/text/{new_text_id}?user_id=1', headers={'If-None-Match': detail_etag})
+        assert r.status_code == 200
+        assert r.headers.get('ETag') is None
+        assert 'private' in r.headers.get('Cache-Control')
+
+        # 4. 엔드포인트별 Cache-Control 설정
+        app.config['CACHE_CONTROL'] = {'text.get_texts_by_genre': 'public, max-age=30'}
+        try:
+            r = client.get('/text/?genre=IT')
+            assert r.headers.get('Cache-Control') == 'public, max-age=30'
+        finally:
+            app.config['CACHE_CONTROL'] = {}
+
+    @patch('app.routes.text.views.s3')
+    def test_TC221_카탈로그_델타_동기화_확인(self, mock_s3, client, create_text):
+        """since 버전 이후의 추가/삭제(툼스톤)만 반환하는지 검증"""
+        # 1. 전체 동기화 (since=0) - 현재 글 목록과 일치해야 함
+        full = client.get('/text/changes?since=0&limit=2000&include_content=false').get_json()['data']
+        all_ids = [t["id"] for t in client.get('/text/all?paginate=false').get_json()['data']]
+        assert [t["id"] for t in full["added"]] == all_ids
+        assert 'content' not in full["added"][0]
+        version = full["version"]
+
+        # 2. 추가 후 since=version -> 새 글만 added
+        response, _ = create_text(genre="IT")
+        new_text_id = response.get_json()['data']['id']
+        delta = client.get(f'/text/changes?since={version}').get_json()['data']
+        assert [t["id"] for t in delta["added"]] == [new_text_id]
+        assert delta["deleted"] == []
+        assert delta["version"] > version
+        assert 'content' in delta["added"][0]
+
+        # 3. 삭제 후에는 툼스톤으로 내려옴 (추가 후 삭제된 글도 deleted)
+        assert client.delete(f'/text/{new_text_id}').status_code == 200
+        delta = client.get(f'/text/changes?since={version}').get_json()['data']
+        assert delta["added"] == []
+        assert delta["deleted"] == [new_text_id]
+
+        # 4. limit 단위로 끊어서 받기
+        page = client.get('/text/changes?since=0&limit=1').get_json()['data']
+        assert page["has_more"] is True
+        assert page["version"] > 0
+
+        # 5. since 누락/음수는 400
+        assert client.get('/text/changes').status_code == 400
+        assert client.get('/text/changes?since=-1').status_code == 400
+
+    @patch('app.routes.text.views.s3')
+    def test_TC222_개인_최고기록_갱신_및_복구_확인(self, mock_s3, client, app, create_text, create_text_result, get_users):
+        """결과 저장 시 최고 기록이 갱신되고, 최고 기록 삭제 시 남은 기록으로 복구되는지 검증"""
+        user_id = pick_random(get_users())
+        response, _ = create_text(genre="IT")
+        text_id = response.get_json()['data']['id']
+
+        def my_best():
+            r = client.get(f'/text/{text_id}?user_id={user_id}')
+            assert r.status_code == 200
+            return r.get_json()['data']['my_best']
+
+        assert my_best() is None
+
+        result_ids = {}
+        for key, cpm in [('low', 300), ('first_top', 500), ('second_top', 500), ('lowest', 200)]:
+            r, _ = create_text_result(user_id, text_id, cpm=cpm)
+            assert r.status_code == 201
+            result_ids[key] = r.get_json()['data']['result_id']
+
+        assert my_best()['cpm'] == 500
+
+        # 캐시를 꺼도 같은 결과 (글 + 찜 + 최고 기록 단일 JOIN 조회)
+        app.config['TEXT_CATALOG_CACHE'] = False
+        try:
+            assert my_best()['cpm'] == 500
+        finally:
+            app.config['TEXT_CATALOG_CACHE'] = True
+
+        def delete_result(key):
+            r = client.delete(f'/text/results/{text_id}/{user_id}/{result_ids[key]}')
+            assert r.status_code == 200
+
+        # 최고 기록이 아닌 기록 삭제 -> 변화 없음
+        delete_result('lowest')
+        assert my_best()['cpm'] == 500
+
+        # 동점 최고 기록 중 하나를 지우면 남은 동점 기록으로 복구
+        delete_result('first_top')
+        assert my_best()['cpm'] == 500
+
+        delete_result('second_top')
+        assert my_best()['cpm'] == 300
+
+        delete_result('low')
+        assert my_best() is None
+
+    @patch('app.routes.text.helpers.HALL_OF_FAME_SIZE', 2)
+    @patch('app.routes.text.views.s3')
+    def test_TC223_명예의_전당_상위N_유지_확인(self, mock_s3, client, create_text, create_text_result):
+        """명예의 전당이 유저별 최고 기록 상위 N명으로 유지되고, 삭제 시 다시 채워지는지 검증"""
+        users = []
+        for _ in range(3):
+            name = f"hof_{random_string(6, 10)}"
+            user = User(username=name, email=f"{name}@test.com")
+            db.session.add(user)
+            users.append(user)
+        db.session.commit()
+        u1, u2, u3 = [u.id for u in users]
+
+        response, _ = create_text(genre="IT")
+        text_id = response.get_json()['data']['id']
+
+        def save(user_id, cpm):
+            r, _ = create_text_result(user_id, text_id, cpm=cpm)
+            assert r.status_code == 201
+            return r.get_json()['data']['result_id']
+
+        def top(n=10):
+            r = client.get(f'/text/results/best?text_id={text_id}&n={n}')
+            assert r.status_code == 200
+            return [(rec['user_id'], rec['cpm']) for rec in r.get_json()['data']['top_records']]
+
+        assert top() == []
+
+        save(u1, 300)
+        u2_best = save(u2, 500)
+        save(u2, 400)                      # 개인 최고 기록이 아니므로 변화 없음
+        assert top() == [(u2, 500), (u1, 300)]
+
+        save(u3, 300)                      # 꼴찌와 동점 -> 먼저 세운 기록 우선
+        assert top() == [(u2, 500), (u1, 300)]
+
+        save(u3, 600)                      # 정원 초과 -> 꼴찌(u1) 탈락
+        assert top() == [(u3, 600), (u2, 500)]
+        assert top(n=1) == [(u3, 600)]
+
+        r = client.get(f'/text/results/best?text_id={text_id}')
+        data = r.get_json()['data']
+        assert data['best_cpm'] == 600
+        assert len(data['top_records']) == 1
+
+        # u2의 최고 기록 삭제 -> u2는 400으로 내려가고 탈락했던 u1(300)보다 위
+        r = client.delete(f'/text/results/{text_id}/{u2}/{u2_best}')
+        assert r.status_code == 200
+        assert top() == [(u3, 600), (u2, 400)]
+
+    def test_TC224_유저통계_동시저장_유실없음_확인(self, tmp_path):
+        """여러 요청이 같은 유저의 결과를 동시에 저장해도 통계 증가분이 유실되지 않는지 검증"""
+        from sqlalchemy import create_engine
+        from sqlalchemy.orm import sessionmaker
+        from app.routes.text.helpers import update_user_statistics
+        from app.models import calculate_ranking_score
+
+        # 스레드마다 별도 연결이 필요하므로 파일 기반 SQLite 사용
+        engine = create_engine(f"sqlite:///{tmp_path / 'concurrency.db'}", connect_args={"timeout": 30})
+        db.metadata.create_all(engine)
+        Session = sessionmaker(bind=engine)
+
+        with Session() as s:
+            user = User(username="concurrent_user", email="concurrent@test.com")
+            s.add(user)
+            s.commit()
+            user_id = user.id
+
+        workers, saves_per_worker = 8, 5
+        cpm_values = [[random_number(100, 900) for _ in range(saves_per_worker)] for _ in range(workers)]
+        barrier = threading.Barrier(workers)
+        errors = []
+
+        def worker(values):
+            try:
+                for i, cpm in enumerate(values):
+                    with Session() as s:
+                        stale_user = s.get(User, user_id)
+                        # 모든 스레드가 같은(오래된) 값을 읽은 뒤 동시에 갱신하도록 맞춤
+                        if i == 0:
+                            barrier.wait()
+                        update_user_statistics(stale_user, cpm, cpm // 5, 95.0, cpm // 10)
+                        s.commit()
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=worker, args=(values,)) for values in cpm_values]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert errors == []
+
+        all_cpm = [cpm for values in cpm_values for cpm in values]
+        with Session() as s:
+            user = s.get(User, user_id)
+            assert user.play_count == workers * saves_per_worker
+            assert user.best_cpm == max(all_cpm)
+            assert user.max_combo == max(cpm // 10 for cpm in all_cpm)
+            assert user.avg_accuracy == 95.0
+            # 랭킹 점수도 같은 UPDATE 안에서 마지막 값으로 계산됨 (파이썬 공식과 같은 값)
+            assert user.ranking_score == calculate_ranking_score(
+                user.best_cpm, user.avg_accuracy, user.avg_cpm, user.max_combo, user.play_count)
+        engine.dispose()
+
+    @patch('app.routes.text.views.s3')
+    def test_TC225_유저통계_누적합계_정확도_확인(self, mock_s3, client, create_text, create_text_result):
+        """평균이 누적 합계 기준으로 정확히 계산되고, 삭제 시 합계 차감 및 최고 기록 복구가 되는지 검증"""
+        name = f"sum_{random_string(6, 10)}"
+        user = User(username=name, email=f"{name}@test.com")
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.id
+
+        response, _ = create_text(genre="IT")
+        text_id = response.get_json()['data']['id']
+
+        # 매 저장마다 반올림하면 오차가 쌓이는 값들
+        samples = [(301, 61, 90.333, 11), (302, 62, 91.667, 12), (700, 140, 92.111, 50), (303, 63, 93.889, 13)] * 3
+        result_ids = []
+        for cpm, wpm, accuracy, combo in samples:
+            r, _ = create_text_result(user_id, text_id, cpm=cpm, wpm=wpm, accuracy=accuracy, combo=combo)
+            assert r.status_code == 201
+            result_ids.append(r.get_json()['data']['result_id'])
+
+        def stats():
+            db.session.expire_all()
+            return db.session.get(User, user_id)
+
+        def expect(rows):
+            u = stats()
+            assert u.play_count == len(rows)
+            if not rows:
+                assert (u.avg_cpm, u.avg_wpm, u.avg_accuracy, u.best_cpm, u.best_wpm, u.max_combo) == (0, 0, 0, 0, 0, 0)
+                return
+            # 누적 합계는 정확히 일치, 평균은 반올림(0.005) 이내 (DB ROUND의 .5 처리 방식 차이 허용)
+            assert u.total_cpm == sum(row[0] for row in rows)
+            assert u.total_wpm == sum(row[1] for row in rows)
+            assert u.total_accuracy == pytest.approx(sum(row[2] for row in rows))
+            assert u.avg_cpm == pytest.approx(sum(row[0] for row in rows) / len(rows), abs=0.0051)
+            assert u.avg_wpm == pytest.approx(sum(row[1] for row in rows) / len(rows), abs=0.0051)
+            assert u.avg_accuracy == pytest.approx(sum(row[2] for row in rows) / len(rows), abs=0.0051)
+            assert u.best_cpm == max(row[0] for row in rows)
+            assert u.best_wpm == max(row[1] for row in rows)
+            assert u.max_combo == max(row[3] for row in rows)
+
+        expect(samples)
+
+        # 최고 기록(700타) 결과를 모두 지우면 남은 기록의 최대값으로 복구
+        remaining = list(zip(result_ids, samples))
+        for result_id, row in list(remaining):
+            if row[0] == 700:
+                r = client.delete(f'/text/results/{text_id}/{user_id}/{result_id}')
+                assert r.status_code == 200
+                remaining.remove((result_id, row))
+                expect([row for _, row in remaining])
+
+        for result_id, _ in list(remaining):
+            r = client.delete(f'/text/results/{text_id}/{user_id}/{result_id}')
+            assert r.status_code == 200
+            remaining.pop(0)
+            expect([row for _, row in remaining])
+
+    @patch('app.routes.text.views.s3')
+    def test_TC226_결과저장_write_behind_묶음저장_확인(self, mock_s3, client, app, create_text, create_text_result):
+        """write-behind 모드에서 결과가 202로 접수되고, flush 시 한 번에 저장/통계 반영되는지 검증"""
+        from app.routes.text.ingest import shutdown_result_writer, get_result_writer
+
+        name = f"wb_{random_string(6, 10)}"
+        user = User(username=name, email=f"{name}@test.com")
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.id
+
+        response, _ = create_text(genre="IT")
+        text_id = response.get_json()['data']['id']
+
+        def play_count():
+            db.session.expire_all()
+            return db.session.get(User, user_id).play_count
+
+        app.config.update(RESULT_WRITE_BEHIND=True, RESULT_FLUSH_INTERVAL_MS=3600 * 1000, RESULT_FLUSH_BATCH=1000)
+        try:
+            provisional_ids = set()
+            for cpm in (300, 400, 500):
+                r, _ = create_text_result(user_id, text_id, cpm=cpm)
+                assert r.status_code == 202
+                provisional_ids.add(r.get_json()['data']['provisional_id'])
+            assert len(provisional_ids) == 3
+
+            # 없는 글은 큐에 넣기 전에 404
+            r, _ = create_text_result(user_id, 99999)
+            assert r.status_code == 404
+
+            # flush 전에는 반영되지 않음
+            assert play_count() == 0
+
+            def receipt(provisional_id):
+                r = client.get(f'/text/results/receipt/{provisional_id}')
+                assert r.status_code == 200
+                return r.get_json()['data']
+
+            assert {receipt(pid)['status'] for pid in provisional_ids} == {'pending'}
+            # flush 때 실패할 결과 (검증 후 글이 사라진 경우와 같음)
+            broken_id = get_result_writer(app).submit(
+                {"user_id": user_id, "text_id": 99999, "cpm": 100, "wpm": 20, "accuracy": 90.0, "combo": 1})
+
+            # 종료 훅: 남은 결과를 모두 저장 (실패한 결과만 빼고)
+            assert shutdown_result_writer() == 3
+            assert play_count() == 3
+            assert TypingResult.query.filter_by(user_id=user_id, text_id=text_id).count() == 3
+
+            # 접수 ID -> 실제 결과 ID / 실패 여부
+            saved = [receipt(pid) for pid in provisional_ids]
+            assert {s['status'] for s in saved} == {'saved'}
+            assert {s['result_id'] for s in saved} == {
+                r.id for r in TypingResult.query.filter_by(user_id=user_id, text_id=text_id).all()}
+            assert receipt(broken_id)['status'] == 'failed'
+            best = client.get(f'/text/{text_id}?user_id={user_id}').get_json()['data']['my_best']
+            assert best['cpm'] == 500
+
+            # 큐가 가득 차면 동기 저장(201)으로 처리
+            app.config['RESULT_QUEUE_MAX'] = 1
+            r1, _ = create_text_result(user_id, text_id)
+            r2, _ = create_text_result(user_id, text_id)
+            assert (r1.status_code, r2.status_code) == (202, 201)
+            assert shutdown_result_writer() == 1
+            assert play_count() == 5
+        finally:
+            shutdown_result_writer()
+            app.config.update(RESULT_WRITE_BEHIND=False, RESULT_QUEUE_MAX=10000,
+                              RESULT_FLUSH_INTERVAL_MS=20, RESULT_FLUSH_BATCH=500)
+
+    @patch('app.routes.text.views.s3')
+    def test_TC227_결과저장_멱등키_재시도_확인(self, mock_s3, client, create_text):
+        """같은 Idempotency-Key로 재시도하면 다시 저장하지 않고 최초 응답을 반환하는지 검증"""
+        from datetime import datetime, timedelta
+        from app.models import IdempotencyKey, KST
+
+        name = f"idem_{random_string(6, 10)}"
+        user = User(username=name, email=f"{name}@test.com")
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.id
+
+        response, _ = create_text(genre="IT")
+        text_id = response.get_json()['data']['id']
+
+        body = {"user_id": user_id, "text_id": text_id, "cpm": 400, "wpm": 80, "accuracy": 97.5, "combo": 30}
+        key = f"retry-{random_string(8, 12)}"
+        headers = {"Idempotency-Key": key}
+
+        first = client.post('/text/results', json=body, headers=headers)
+        assert first.status_code == 201
+
+        # 재시도: 같은 응답, 추가 저장 없음
+        replay = client.post('/text/results', json=body, headers=headers)
+        assert replay.status_code == 201
+        assert replay.headers.get('Idempotent-Replayed') == 'true'
+        assert replay.get_json() == first.get_json()
+        assert TypingResult.query.filter_by(user_id=user_id).count() == 1
+        db.session.expire_all()
+        assert db.session.get(User, user_id).play_count == 1
+
+        # 같은 키로 다른 본문 -> 422
+        r = client.post('/text/results', json={**body, "cpm": 500}, headers=headers)
+        assert r.status_code == 422
+
+        # 실패 응답은 저장하지 않으므로 같은 키로 다시 시도 가능
+        bad_key = {"Idempotency-Key": f"bad-{random_string(8, 12)}"}
+        assert client.post('/text/results', json={**body, "cpm": None}, headers=bad_key).status_code == 400
+        assert client.post('/text/results', json=body, headers=bad_key).status_code == 201
+
+        # 만료된 키는 새 요청으로 처리
+        IdempotencyKey.query.filter(IdempotencyKey.key.like(f"%{key}")).update(
+            {"expires_at": IdempotencyKey.expires_at - timedelta(days=2)},
+            synchronize_session=False
+        )
+        db.session.commit()
+        r = client.post('/text/results', json=body, headers=headers)
+        assert r.status_code == 201
+        assert r.headers.get('Idempotent-Replayed') is None
+        assert TypingResult.query.filter_by(user_id=user_id).count() == 3
+
+        # 헤더가 없으면 기존과 동일하게 매번 저장
+        assert client.post('/text/results', json=body).status_code == 201
+        assert TypingResult.query.filter_by(user_id=user_id).count() == 4
+
+        # 다시 시도해도 키를 선점하지 못하면 (다른 요청이 막 가져간 경우) 저장하지 않고 409
+        from app import idempotency
+        with patch.object(idempotency, '_reserve', return_value=(idempotency.DatabaseIdempotencyStore(), (False, None))):
+            r = client.post('/text/results', json=body, headers={"Idempotency-Key": f"race-{random_string(8, 12)}"})
+        assert r.status_code == 409
+        assert TypingResult.query.filter_by(user_id=user_id).count() == 4
+
+        # 응답은 결과와 같은 트랜잭션에 DB로 기록되므로, 재시도가 Redis로 선점해도 DB 항목을 따라 재응답
+        row = IdempotencyKey.query.filter(IdempotencyKey.key.like(f"%{key}")).one()
+        assert row.status_code == 201 and row.expires_at > datetime.now(KST).replace(tzinfo=None)
+        redis_store = idempotency.RedisIdempotencyStore
+        with patch.object(idempotency, 'get_redis', return_value=object()), \
+                patch.object(redis_store, 'reserve', return_value=(True, None)), \
+                patch.object(redis_store, 'release') as release:
+            r = client.post('/text/results', json=body, headers=headers)
+        assert r.status_code == 201 and r.headers.get('Idempotent-Replayed') == 'true'
+        assert release.called
+        assert TypingResult.query.filter_by(user_id=user_id).count() == 4
+
+        # Redis 장애 중 DB로 선점한 요청과 Redis로 선점한 요청이 엇갈려 함께 실행돼도, 늦게 커밋하는 쪽은 롤백 (중복 저장 없음)
+        split_key = f"split-{random_string(8, 12)}"
+        db.session.add(IdempotencyKey(key=f"idem:text.save_typing_result:{split_key}", fingerprint="other",
+                                      expires_at=datetime.now(KST) + timedelta(seconds=60)))
+        db.session.commit()
+        with patch.object(idempotency, 'get_redis', return_value=object()), \
+                patch.object(redis_store, 'reserve', return_value=(True, None)), \
+                patch.object(redis_store, 'release'), \
+                patch.object(idempotency.DatabaseIdempotencyStore, 'lookup', return_value=None):
+            r = client.post('/text/results', json=body, headers={"Idempotency-Key": split_key})
+        assert r.status_code == 500
+        assert TypingResult.query.filter_by(user_id=user_id).count() == 4
+
+    @patch('app.routes.text.views.s3')
+    def test_TC228_결과_묶음저장_확인(self, mock_s3, client, create_text):
+        """묶음 저장 시 항목별 성공/실패가 반환되고 유저 통계가 합산 반영되는지 검증"""
+        users = []
+        for _ in range(2):
+            name = f"batch_{random_string(6, 10)}"
+            user = User(username=name, email=f"{name}@test.com")
+            db.session.add(user)
+            users.append(user)
+        db.session.commit()
+        u1, u2 = [u.id for u in users]
+
+        response, _ = create_text(genre="IT")
+        text_id = response.get_json()['data']['id']
+
+        def item(user_id, cpm, **extra):
+            return {"user_id": user_id, "text_id": text_id, "cpm": cpm, "wpm": cpm // 5,
+                    "accuracy": 95.0, "combo": cpm // 10, **extra}
+
+        payload = {"results": [
+            item(u1, 300),
+            item(u1, 500),
+            {"user_id": u1, "text_id": text_id},     # 필수값 누락
+            item(u2, 400),
+            item(999999, 400),                       # 없는 유저
+            item(u2, 100, text_id=999999),           # 없는 글
+        ]}
+        r = client.post('/text/results/batch', json=payload)
+        assert r.status_code == 201
+        data = r.get_json()['data']
+        assert (data['saved'], data['failed']) == (3, 3)
+        assert [o['success'] for o in data['results']] == [True, True, False, True, False, False]
+        assert [o['index'] for o in data['results']] == list(range(6))
+
+        saved_ids = [o['result_id'] for o in data['results'] if o['success']]
+        assert TypingResult.query.filter(TypingResult.id.in_(saved_ids)).count() == 3
+
+        db.session.expire_all()
+        user1, user2 = db.session.get(User, u1), db.session.get(User, u2)
+        assert (user1.play_count, user1.best_cpm, user1.avg_cpm, user1.total_cpm) == (2, 500, 400.0, 800)
+        assert (user2.play_count, user2.best_cpm) == (1, 400)
+        assert user1.ranking_score > 0
+
+        best = client.get(f'/text/{text_id}?user_id={u1}').get_json()['data']['my_best']
+        assert best['cpm'] == 500
+        top = client.get(f'/text/results/best?text_id={text_id}&n=10').get_json()['data']['top_records']
+        assert [(rec['user_id'], rec['cpm']) for rec in top] == [(u1, 500), (u2, 400)]
+
+        # 모두 실패하거나 형식이 잘못되면 400
+        assert client.post('/text/results/batch', json={"results": [item(999999, 100)]}).status_code == 400
+        assert client.post('/text/results/batch', json={"results": []}).status_code == 400
+        assert client.post('/text/results/batch', json={"results": [item(u1, 100)] * 101}).status_code == 400
+
+    @patch('app.routes.text.views.s3')
+    def test_TC229_결과저장시_해당유저_캐시만_무효화(self, mock_s3, client, create_text):
+        """결과 저장 시 키 스캔 없이 해당 유저 프로필만 지우고 목록 캐시는 네임스페이스 버전으로 무효화하는지 검증"""
+        from app.routes.user.views import users_page_cache_key
+        import app.redis_client as redis_client
+
+        users = []
+        for _ in range(2):
+            name = f"cache_{random_string(6, 10)}"
+            user = User(username=name, email=f"{name}@test.com")
+            db.session.add(user)
+            users.append(user)
+        db.session.commit()
+        player, other = [u.id for u in users]
+
+        response, _ = create_text(genre="IT")
+        text_id = response.get_json()['data']['id']
+
+        fake = FakeRedis()
+        redis_client._redis_client = fake
+        try:
+            # 1. 프로필/전체유저 캐시 채우기
+            for user_id in (player, other):
+                assert client.get(f'/user/profile/{user_id}').status_code == 200
+            client.get('/user/users')
+            old_users_key = users_page_cache_key()
+            assert {f"user:profile:{player}", f"user:profile:{other}", old_users_key} <= set(fake.store)
+
+            # 2. 결과 저장 -> 캐시 무효화 파이프라인 1번 (+ 리더보드 반영 파이프라인 1번)
+            fake.commands.clear()
+            body = {"user_id": player, "text_id": text_id, "cpm": 99999, "wpm": 9999, "accuracy": 100.0, "combo": 999}
+            assert client.post('/text/results', json=body).status_code == 201
+            assert sum(1 for c in fake.commands if c[0] == 'pipeline') == 2
+
+            assert f"user:profile:{player}" not in fake.store
+            assert f"user:profile:{other}" in fake.store
+            assert fake.store["user:ns:users"] == b"1"
+            assert users_page_cache_key() != old_users_key
+
+            # 3. 새 버전 키로 다시 조회하므로 갱신된 통계가 보임
+            users = client.get('/user/users').get_json()['data']['users']
+            stats = next(u['stats'] for u in users if u['account']['user_id'] == player)
+            assert stats['best_cpm'] == 99999
+        finally:
+            redis_client._redis_client = None
+            redis_client.clear_local_cache()
+
+    @patch('app.routes.text.views.s3')
+    def test_TC230_CPM_백분위_히스토그램_확인(self, mock_s3, client, create_text):
+        """결과 저장/삭제가 커밋 후 히스토그램 증분으로 모였다가 flush 시 반영되고, 백분위가 누적합으로 계산되는지 검증"""
+        from app import histograms
+        from app.models import CpmHistogramBin
+
+        def percentile(cpm, text_id):
+            histograms.clear_histogram_cache()
+            r = client.get(f'/text/results/percentile?cpm={cpm}&text_id={text_id}')
+            assert r.status_code == 200
+            return r.get_json()['data']
+
+        histograms.flush_histograms()
+        user = User(username=f"hist_{random_string(6, 10)}", email=f"hist_{random_string(6, 10)}@test.com")
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.id
+        response, _ = create_text(genre="IT")
+        text_id = response.get_json()['data']['id']
+        global_before = percentile(0, text_id)['global']['total']
+
+        def post(cpm):
+            body = {"user_id": user_id, "text_id": text_id, "cpm": cpm, "wpm": 50, "accuracy": 95.0, "combo": 10}
+            r = client.post('/text/results', json=body)
+            assert r.status_code == 201
+            return r.get_json()['data']['result_id']
+
+        slowest = post(100)
+        for cpm in (200, 300, 400):
+            post(cpm)
+
+        # 1. flush 전에는 DB 히스토그램에 없음 -> flush 후 반영
+        assert percentile(250, text_id)['text'] == {"percentile": None, "total": 0}
+        assert histograms.flush_histograms() > 0
+        data = percentile(250, text_id)
+        assert data['text'] == {"percentile": 50.0, "total": 4}
+        assert data['global']['total'] == global_before + 4
+        assert percentile(305, text_id)['text']['percentile'] == 62.5  # 30번 구간 안에서 보간
+        assert percentile(99999, text_id)['text']['percentile'] == 100.0
+
+        # 2. 결과 삭제는 빼기로 반영
+        assert client.delete(f'/text/results/{text_id}/{user_id}/{slowest}').status_code == 200
+        post(500)
+        histograms.flush_histograms()
+        assert percentile(150, text_id)['text'] == {"percentile": 0.0, "total": 4}
+
+        # 3. 글을 삭제하면 그 글의 결과만큼 전체에서 빠지고 글 히스토그램 행도 정리
+        assert client.delete(f'/text/{text_id}').status_code == 200
+        histograms.flush_histograms()
+        assert CpmHistogramBin.query.filter_by(text_id=text_id).count() == 0
+        assert percentile(0, text_id)['global']['total'] == global_before
+
+        assert client.get('/text/results/percentile').status_code == 400
+        assert client.get('/text/results/percentile?cpm=-1').status_code == 400
+        db.session.delete(db.session.get(User, user_id))
+        db.session.commit()
+
+    @patch('app.routes.text.views.s3')
+    def test_TC231_카탈로그_버전_Redis_미러링_실패_및_동기화_확인(self, mock_s3, client, create_text, monkeypatch):
+        """Redis 미러링이 실패해도 DB 버전으로 넘어가고, 시작 시 동기화가 버전을 뒤로 돌리지 않는지 검증"""
+        import app.redis_client as redis_client
+        from app.routes.text import catalog
+
+        key = catalog.REDIS_CATALOG_VERSION_KEY
+        fake = FakeRedis()
+        redis_client._redis_client = fake
+        try:
+            db_version = catalog._read_db_version()
+
+            # 1. 시작 시 동기화: 뒤처진 값은 올리고, DB 초기화로 앞선 값은 DB 값으로 내림
+            fake.store[key] = str(db_version - 1).encode()
+            catalog.sync_catalog_version()
+            assert int(fake.store[key]) == db_version
+            fake.store[key] = str(db_version + 100).encode()
+            catalog.sync_catalog_version()
+            assert int(fake.store[key]) == db_version
+
+            # 2. 글 추가 후 미러링 실패 -> Redis는 이전 버전이지만 이 워커는 DB 버전을 사용
+            with monkeypatch.context() as m:
+                m.setattr(catalog, 'counter_set_max', lambda *args: False)
+                create_text(genre="IT")
+            new_version = catalog._read_db_version()
+            assert new_version == db_version + 1 and int(fake.store[key]) == db_version
+            assert catalog.get_catalog_version() == new_version
+            assert int(fake.store[key]) == new_version  # 다음 조회 때 Redis를 따라잡게 함
+
+            # 3. 다른 워커 입장: 미러링이 끝내 안 돼도 확인 주기가 지나면 DB 버전을 봄
+            fake.store[key] = str(db_version).encode()
+            monkeypatch.setattr(catalog, '_unpublished_version', None)
+            monkeypatch.setattr(catalog, '_next_recheck', 0.0)
+            assert catalog.get_catalog_version() == new_version
+            assert int(fake.store[key]) == new_version
+        finally:
+            redis_client._redis_client = None
+            redis_client.clear_local_cache()
@@ -1,5 +1,9 @@
 import pytest
-from tests.utils import random_string, pick_random, random_number
+import json
+import threading
+from tests.utils import random_string, pick_random, random_number, FakeRedis
+from app.models import User
+from app.database import db
 
 
 @pytest.fixture(scope='class')
@@ -224,4 +228,788 @@ class TestUserAPI:
         r_data = r.get_json()
         assert r_data['success'] is False
         # api_response 유틸리티의 중첩 구조 확인
-        assert "유저" in r_data['error']['message']
\ No newline at end of file
+        assert "유저" in r_data['error']['message']
+
+    def test_TC309_메모리캐시_및_single_flight_확인(self, client):
+        """워커 메모리 캐시가 Redis 왕복을 줄이고, 동시 미스 시 한 곳에서만 계산하는지 검증"""
+        import app.redis_client as redis_client
+
+        fake = FakeRedis()
+        redis_client._redis_client = fake
+        redis_client.clear_local_cache()
+        try:
+            # 1. 저장 TTL에 지터 적용 + 두 번째 조회부터는 메모리 캐시에서 반환
+            redis_client.cache_set("user:test:hot", {"v": 1})
+            ttl = redis_client.USER_CACHE_TTL
+            assert ttl <= fake.ttls["user:test:hot"] <= ttl + int(ttl * redis_client.CACHE_TTL_JITTER)
+            fake.commands.clear()
+            assert redis_client.cache_get("user:test:hot") == {"v": 1}
+            assert redis_client.cache_get("user:test:hot") == {"v": 1}
+            assert fake.commands.count(('get', "user:test:hot")) == 1
+
+            # 2. 같은 워커에서 동시에 미스가 나도 loader는 한 번만 실행
+            calls = []
+            barrier = threading.Barrier(8)
+
+            def loader():
+                calls.append(1)
+                threading.Event().wait(0.05)
+                return {"rows": [1, 2, 3]}
+
+            results = []
+
+            def worker():
+                barrier.wait()
+                results.append(redis_client.cache_get_or_set("user:test:cold", loader)[0])
+
+            threads = [threading.Thread(target=worker) for _ in range(8)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            assert len(calls) == 1
+            assert results == [{"rows": [1, 2, 3]}] * 8
+            assert "lock:user:test:cold" not in fake.store
+
+            # 3. 다른 워커가 Redis 락을 잡고 계산 중이면 그 결과를 기다려 사용
+            fake.store["lock:user:test:shared"] = "other-worker"
+            threading.Timer(0.1, fake.setex, args=("user:test:shared", 60, json.dumps({"from": "other"}))).start()
+            value, hit = redis_client.cache_get_or_set("user:test:shared", lambda: pytest.fail("다시 계산하면 안 됩니다."))
+            assert (value, hit) == ({"from": "other"}, True)
+
+            # 4. 전체 유저 API도 같은 경로로 캐시
+            first = client.get('/user/users').get_json()
+            fake.commands.clear()
+            assert client.get('/user/users').get_json() == first
+            assert not [c for c in fake.commands if c[0] == 'set']
+        finally:
+            redis_client._redis_client = None
+            redis_client.clear_local_cache()
+
+        # 5. LRU: 최대 크기를 넘으면 가장 오래 안 쓴 항목부터 제거
+        lru = redis_client.LocalCache(max_size=2, ttl=60)
+        lru.set("a", 1)
+        lru.set("b", 2)
+        lru.get("a")
+        lru.set("c", 3)
+        assert lru.get("b") is redis_client._MISSING
+        assert (lru.get("a"), lru.get("c")) == (1, 3)
+
+    def test_TC310_캐시_직렬화_압축_확인(self, client):
+        """캐시 값이 헤더 + msgpack(큰 값은 압축)으로 저장되고, 이전 JSON 값도 읽히는지 검증"""
+        import app.redis_client as redis_client
+
+        small = {"data": {"users": [], "users_len": 0}, "message": "유저"}
+        large = {"data": [{"rank": i, "account": {"username": f"user{i}", "ranking_score": i * 1.5}}
+                          for i in range(200)], "message": "랭킹"}
+
+        for name in redis_client.SERIALIZERS:
+            for compression in list(redis_client.COMPRESSORS) + ['none']:
+                for value in (small, large):
+                    encoded = redis_client.encode_value(value, serializer=name, compression=compression)
+                    assert redis_client.decode_value(encoded) == value
+                    assert encoded[0] >> 4 == redis_client.SERIALIZERS[name].id
+
+        # 기준 크기 미만은 압축하지 않고, 이상이면 압축해서 더 작게 저장
+        assert redis_client.encode_value(small)[0] & 0x0F == 0
+        packed = redis_client.encode_value(large, serializer='msgpack', compression='none')
+        compressed = redis_client.encode_value(large, serializer='msgpack', compression='zlib')
+        assert compressed[0] & 0x0F == redis_client.ZlibCompressor.id
+        assert len(compressed) < len(packed) < len(redis_client.encode_value(large, serializer='json', compression='none'))
+
+        # 헤더 없는 이전 JSON 값
+        assert redis_client.decode_value(json.dumps(large)) == large
+
+        fake = FakeRedis()
+        redis_client._redis_client = fake
+        try:
+            redis_client.cache_set("user:test:packed", large)
+            assert fake.store["user:test:packed"][0] >> 4 == redis_client.MsgpackSerializer.id
+            redis_client.clear_local_cache()
+            assert redis_client.cache_get("user:test:packed") == large
+        finally:
+            redis_client._redis_client = None
+            redis_client.clear_local_cache()
+
+    def test_TC311_Redis_장애시_차단기_동작_확인(self, client, monkeypatch):
+        """Redis 연결 오류가 반복되면 차단기가 열려 Redis를 건너뛰고, 대기 후 재연결 확인에 성공하면 닫히는지 검증"""
+        import time
+        import app.redis_client as redis_client
+
+        class DownRedis(FakeRedis):
+            down = True
+
+            def _check(self):
+                self.commands.append(('call',))
+                if self.down:
+                    raise ConnectionError("Redis 연결 실패")
+
+            def ping(self):
+                self._check()
+                return True
+
+            def get(self, key):
+                self._check()
+                return super().get(key)
+
+        fake = DownRedis()
+        breaker = redis_client.CircuitBreaker(failure_threshold=3, window=10, base_delay=0.05, max_delay=0.2)
+        monkeypatch.setattr(redis_client, '_redis_client', fake)
+        monkeypatch.setattr(redis_client, '_breaker', breaker)
+        redis_client.clear_local_cache()
+
+        # 1. 연결 오류 3번이면 열리고, 이후에는 Redis를 호출하지 않음
+        for _ in range(3):
+            assert redis_client.cache_get("user:test:down") is None
+        assert breaker.state == 'open'
+        calls = len(fake.commands)
+        assert redis_client.cache_get("user:test:down") is None
+        assert client.get('/user/ranking?limit=3').status_code == 200
+        assert len(fake.commands) == calls
+
+        status = client.get('/admin/cache/status').get_json()['data']
+        assert status['breaker']['state'] == 'open'
+        assert status['connected'] is False
+
+        # 2. 대기 후 재연결 확인 실패 -> 대기 시간을 늘려 다시 열림
+        time.sleep(0.05 * 1.2 + 0.01)
+        assert redis_client.get_redis() is None
+        assert (breaker.state, breaker.open_count) == ('open', 2)
+
+        # 3. Redis 복구 후 재연결 확인 성공 -> 닫힘
+        fake.down = False
+        time.sleep(0.1 * 1.2 + 0.01)
+        assert redis_client.get_redis() is fake
+        assert breaker.state == 'closed'
+        assert client.get('/admin/cache/status').get_json()['data']['breaker']['open_count'] == 0
+
+        # 4. 연결과 무관한 오류(값 디코딩 실패 등)는 차단기에 집계하지 않음
+        fake.store["user:test:broken"] = b"\xff"
+        for _ in range(3):
+            assert redis_client.cache_get("user:test:broken") is None
+        assert breaker.state == 'closed'
+        redis_client.clear_local_cache()
+
+    def test_TC312_리더보드_순위_조회_확인(self, client, monkeypatch):
+        """랭킹 구간/내 순위가 리더보드에서 조회되고, 커밋된 점수 변경만 반영되는지 검증 (메모리 / Redis 정렬 집합)"""
+        import app.redis_client as redis_client
+        from app import leaderboard
+
+        base = 10 ** 7  # 다른 테스트 유저보다 항상 위에 오도록
+        users = []
+        for bonus in (30, 20, 10):
+            name = f"rank_{random_string(6, 10)}"
+            users.append(User(username=name, email=f"{name}@test.com", ranking_score=base + bonus))
+        db.session.add_all(users)
+        db.session.commit()
+        first, second, third = [u.id for u in users]
+
+        def ranking_ids(offset, limit):
+            r = client.get(f'/user/ranking?offset={offset}&limit={limit}').get_json()
+            assert [e['rank'] for e in r['data']] == list(range(offset + 1, offset + 1 + len(r['data'])))
+            return [e['account']['user_id'] for e in r['data']], r['meta']
+
+        def my_rank(user_id):
+            r = client.get(f'/user/ranking/me/{user_id}')
+            return r.get_json()['data']['rank'] if r.status_code == 200 else r.status_code
+
+        # 1. 메모리 리더보드 (Redis 미설정)
+        ids, meta = ranking_ids(1, 2)
+        assert ids == [second, third]
+        assert meta['total'] >= 3 and (meta['offset'], meta['limit']) == (1, 2)
+        assert [my_rank(u) for u in (first, second, third)] == [1, 2, 3]
+
+        # 커밋된 변경은 바로 반영, 롤백된 변경은 무시
+        db.session.get(User, third).ranking_score = base + 40
+        db.session.commit()
+        db.session.get(User, second).ranking_score = base + 100
+        db.session.flush()
+        db.session.rollback()
+        assert [my_rank(u) for u in (third, first, second)] == [1, 2, 3]
+
+        # 2. Redis 정렬 집합 (시작 시 DB에서 재적재)
+        fake = FakeRedis()
+        monkeypatch.setattr(redis_client, '_redis_client', fake)
+        assert leaderboard.rebuild_leaderboard() == User.query.count()
+        assert fake.zcard(leaderboard.LEADERBOARD_KEY) == User.query.count()
+        assert ranking_ids(0, 3)[0] == [third, first, second]
+        assert [my_rank(u) for u in (third, first, second)] == [1, 2, 3]
+
+        db.session.get(User, second).ranking_score = base + 50
+        db.session.commit()
+        assert fake.zscore(leaderboard.LEADERBOARD_KEY, leaderboard._member(second)) == base + 50
+        assert ranking_ids(0, 3)[0] == [second, third, first]
+
+        # 같은 트랜잭션 안의 세이브포인트 롤백은 커밋될 변경을 버리지 않음
+        from sqlalchemy.exc import IntegrityError
+        db.session.get(User, first).ranking_score = base + 45
+        db.session.flush()
+        try:
+            with db.session.begin_nested():
+                db.session.add(User(username=users[1].username, email=f"dup_{random_string(6, 10)}@test.com"))
+                db.session.flush()
+        except IntegrityError:
+            pass
+        db.session.commit()
+        assert ranking_ids(0, 3)[0] == [second, first, third]
+
+        # 동점이면 두 방식 모두 user_id 오름차순 (id 자릿수가 달라도 같은 순서)
+        tied = User(username=f"rank_{random_string(6, 10)}", email=f"tie_{random_string(6, 10)}@test.com",
+                    ranking_score=base + 50)
+        db.session.add(tied)
+        for user_id in (first, third):
+            db.session.get(User, user_id).ranking_score = base + 50
+        db.session.commit()
+        assert leaderboard._user_id(leaderboard._member(9)) == 9
+        assert fake.zrevrange(leaderboard.LEADERBOARD_KEY, 0, 0)[0] == leaderboard._member(first).encode()
+        expected = sorted([first, second, third, tied.id])
+        assert ranking_ids(0, 4)[0] == expected
+        monkeypatch.setattr(redis_client, '_redis_client', None)
+        leaderboard.rebuild_leaderboard()
+        assert ranking_ids(0, 4)[0] == expected
+        monkeypatch.setattr(redis_client, '_redis_client', fake)
+        db.session.delete(tied)
+        db.session.commit()
+
+        # 3. 삭제된 유저는 리더보드에서 제외
+        for user_id in (first, second, third):
+            db.session.delete(db.session.get(User, user_id))
+        db.session.commit()
+        assert my_rank(first) == 404
+        monkeypatch.setattr(redis_client, '_redis_client', None)
+        assert my_rank(first) == 404
+        assert first not in ranking_ids(0, 3)[0]
+
+    def test_TC313_내_주변_랭킹_조회_확인(self, client, monkeypatch):
+        """기준 유저 위아래 k명이 정확한 순위와 함께 반환되는지 검증 (메모리 / Redis 정렬 집합)"""
+        import random
+        import app.redis_client as redis_client
+        from app import leaderboard
+
+        base = 10 ** 7
+        users = []
+        for bonus in range(70, 0, -10):
+            name = f"around_{random_string(6, 10)}"
+            users.append(User(username=name, email=f"{name}@test.com", ranking_score=base + bonus))
+        db.session.add_all(users)
+        db.session.commit()
+        ids = [u.id for u in users]  # 1위 ~ 7위
+
+        def around(user_id, k=None):
+            url = f'/user/ranking/around/{user_id}' + (f'?k={k}' if k is not None else '')
+            r = client.get(url)
+            if r.status_code != 200:
+                return r.status_code
+            body = r.get_json()
+            return [(e['rank'], e['account']['user_id']) for e in body['data']], body['meta']
+
+        def check():
+            players, meta = around(ids[3], k=2)
+            assert players == [(rank, ids[rank - 1]) for rank in range(2, 7)]
+            assert (meta['rank'], meta['k']) == (4, 2)
+            assert around(ids[0], k=2)[0] == [(1, ids[0]), (2, ids[1]), (3, ids[2])]
+            assert around(ids[1])[0][:3] == [(1, ids[0]), (2, ids[1]), (3, ids[2])]  # 기본 k=5
+            assert around(ids[3], k=0)[1]['k'] == 1
+            assert around(999999) == 404
+
+        # 1. 메모리 리더보드
+        check()
+
+        # 2. Redis 정렬 집합
+        monkeypatch.setattr(redis_client, '_redis_client', FakeRedis())
+        leaderboard.rebuild_leaderboard()
+        check()
+        monkeypatch.setattr(redis_client, '_redis_client', None)
+
+        for user_id in ids:
+            db.session.delete(db.session.get(User, user_id))
+        db.session.commit()
+
+        # 3. 순위 구조: 무작위 추가/삭제 후에도 순위/구간 조회가 정렬 결과와 일치
+        tree, expected = leaderboard.OrderStatisticList(load=4), []
+        for _ in range(300):
+            key = (random.randint(-50, 0), random.randint(1, 30))
+            if key in expected:
+                assert tree.remove(key)
+                expected.remove(key)
+            else:
+                tree.add(key)
+                expected.append(key)
+                expected.sort()
+        assert len(tree) == len(expected)
+        assert [tree.index(key) for key in expected] == list(range(len(expected)))
+        assert tree.slice(5, 17) == expected[5:17]
+        assert tree.remove((1, 1)) is False
+
+    def test_TC314_기간별_랭킹_증분_집계_및_보관_확인(self, client, runner):
+        """결과 저장/삭제가 일간/주간/시즌 누적값에 증분 반영되고, 끝난 기간은 스냅샷으로 보관되는지 검증"""
+        from datetime import datetime
+        from app import periods
+        from app.models import TypingText, PeriodStat, PeriodSnapshot, calculate_ranking_score
+
+        name = f"period_{random_string(6, 10)}"
+        user = User(username=name, email=f"{name}@test.com")
+        text = TypingText(genre="IT", title="기간 랭킹", content="기간 랭킹 테스트 본문")
+        db.session.add_all([user, text])
+        db.session.commit()
+        user_id, text_id = user.id, text.id
+
+        def post(cpm, accuracy, combo):
+            body = {"user_id": user_id, "text_id": text_id, "cpm": cpm, "wpm": cpm // 5,
+                    "accuracy": accuracy, "combo": combo}
+            r = client.post('/text/results', json=body)
+            assert r.status_code == 201
+            return r.get_json()['data']['result_id']
+
+        def my_entry(period_type):
+            r = client.get(f'/user/ranking/period/{period_type}?limit=100')
+            assert r.status_code == 200
+            body = r.get_json()
+            assert body['meta']['archived'] is False
+            assert body['meta']['period_key'] == periods.period_key(period_type)
+            return next((e for e in body['data'] if e['account']['user_id'] == user_id), None), body['meta']
+
+        # 1. 저장 -> 세 기간 모두 같은 누적값
+        first = post(500, 90.0, 30)
+        post(300, 100.0, 50)
+        r = client.post('/text/results/batch', json={"results": [
+            {"user_id": user_id, "text_id": text_id, "cpm": 400, "wpm": 80, "accuracy": 95.0, "combo": 10}
+        ]})
+        assert r.status_code in (200, 201)
+        expected_score = calculate_ranking_score(500, 95.0, 400.0, 50, 3)
+        for period_type in periods.PERIOD_TYPES:
+            entry, meta = my_entry(period_type)
+            assert entry['stats']['play_count'] == 3
+            assert (entry['stats']['best_cpm'], entry['stats']['max_combo']) == (500, 50)
+            assert entry['stats']['score'] == expected_score
+            assert meta['participants'] >= 1
+
+        # 2. 기간 최고 기록을 삭제하면 그 기간 안의 남은 결과로 복구
+        r = client.delete(f'/text/results/{text_id}/{user_id}/{first}')
+        assert r.status_code == 200
+        entry, _ = my_entry('week')
+        assert (entry['stats']['play_count'], entry['stats']['best_cpm']) == (2, 400)
+        assert entry['stats']['score'] == calculate_ranking_score(400, 97.5, 350.0, 50, 2)
+
+        # 3. 끝난 기간은 스냅샷으로 보관되고 period_stats 행은 삭제
+        periods.apply_period_delta(user_id, datetime(2025, 1, 1, 12), 2, 900, 180, 190.0, 500, 100, 40)
+        db.session.commit()
+
+        # 보관 전 조회: 끝난 기간도 집계 행에서 읽기만 하고 보관/삭제하지 않음
+        body = client.get('/user/ranking/period/day?key=2025-01-01').get_json()
+        assert body['meta']['archived'] is False
+        assert any(e['account']['user_id'] == user_id for e in body['data'])
+        assert db.session.get(PeriodSnapshot, ('day', '2025-01-01')) is None
+        assert PeriodStat.query.filter_by(period_type='day', period_key='2025-01-01').count() == 1
+
+        result = runner.invoke(args=['archive-periods'])
+        assert result.exit_code == 0
+        assert PeriodStat.query.filter(PeriodStat.period_key.in_(['2025-01-01', '2025-W01', '2025-Q1'])).count() == 0
+        snapshot = db.session.get(PeriodSnapshot, ('day', '2025-01-01'))
+        assert snapshot.participants >= 1
+
+        r = client.get('/user/ranking/period/season?key=2025-Q1')
+        body = r.get_json()
+        assert body['meta']['archived'] is True
+        assert (body['meta']['start'], body['meta']['end']) == ('2025-01-01T00:00:00', '2025-04-01T00:00:00')
+        entry = next(e for e in body['data'] if e['account']['user_id'] == user_id)
+        assert (entry['stats']['play_count'], entry['stats']['avg_cpm']) == (2, 450.0)
+        assert periods.period_key('week', datetime(2025, 1, 1)) == '2025-W01'
+
+        # 보관 후 늦게 커밋된 결과는 다음 보관 때 기존 스냅샷에 합쳐짐 (유실되지 않음)
+        participants = snapshot.participants
+        periods.apply_period_delta(user_id, datetime(2025, 1, 1, 13), 1, 600, 120, 90.0, 600, 120, 60)
+        db.session.commit()
+        assert runner.invoke(args=['archive-periods']).exit_code == 0
+        assert PeriodStat.query.filter(PeriodStat.period_key.in_(['2025-01-01', '2025-W01', '2025-Q1'])).count() == 0
+        body = client.get('/user/ranking/period/day?key=2025-01-01').get_json()
+        entry = next(e for e in body['data'] if e['account']['user_id'] == user_id)
+        assert (entry['stats']['play_count'], entry['stats']['best_cpm'], entry['stats']['max_combo']) == (3, 600, 60)
+        assert entry['stats']['score'] == calculate_ranking_score(600, 280.0 / 3, 1500 / 3, 60, 3)
+        assert body['meta']['participants'] == participants
+
+        # 4. 잘못된 요청
+        assert client.get('/user/ranking/period/month').status_code == 400
+        assert client.get('/user/ranking/period/day?key=2025-13-45').status_code == 400
+        assert client.get('/user/ranking/period/day?key=2000-01-01').status_code == 404
+
+        db.session.delete(db.session.get(User, user_id))
+        db.session.delete(db.session.get(TypingText, text_id))
+        db.session.commit()
+
+    def test_TC315_장르별_지표별_랭킹_확인(self, client):
+        """장르/지표별 랭킹이 저장/삭제/글 삭제 시 증분으로 갱신되는지 검증"""
+        from app.models import TypingText, GenreBest
+
+        genre = f"genre_{random_string(6, 10)}"
+        users = []
+        for _ in range(2):
+            name = f"genre_{random_string(6, 10)}"
+            users.append(User(username=name, email=f"{name}@test.com"))
+        texts = [TypingText(genre=genre, title=f"장르 랭킹 {i}", content="장르 랭킹 테스트 본문") for i in range(2)]
+        db.session.add_all(users + texts)
+        db.session.commit()
+        (alice, bob), (text_a, text_b) = [u.id for u in users], [t.id for t in texts]
+
+        def post(user_id, text_id, cpm, accuracy, combo):
+            body = {"user_id": user_id, "text_id": text_id, "cpm": cpm, "wpm": cpm // 5,
+                    "accuracy": accuracy, "combo": combo}
+            r = client.post('/text/results', json=body)
+            assert r.status_code == 201
+            return r.get_json()['data']['result_id']
+
+        def board(metric, genre_param=genre):
+            r = client.get(f'/user/ranking/genre?genre={genre_param}&metric={metric}&limit=100')
+            assert r.status_code == 200
+            body = r.get_json()
+            assert [e['rank'] for e in body['data']] == list(range(1, len(body['data']) + 1))
+            return [(e['account']['user_id'], e['value']) for e in body['data']], body['meta']
+
+        alice_best = post(alice, text_a, 700, 92.0, 20)
+        post(alice, text_b, 400, 99.5, 15)
+        post(bob, text_b, 500, 97.0, 80)
+        r = client.post('/text/results/batch', json={"results": [
+            {"user_id": bob, "text_id": text_a, "cpm": 650, "wpm": 130, "accuracy": 95.0, "combo": 10}
+        ]})
+        assert r.status_code in (200, 201)
+
+        # 1. 지표별 정렬
+        ranking, meta = board('cpm')
+        assert ranking == [(alice, 700), (bob, 650)]
+        assert (meta['genre'], meta['metric'], meta['has_more'], meta['next_cursor']) == (genre, 'cpm', False, None)
+        assert board('combo')[0] == [(bob, 80), (alice, 20)]
+
+        # 키셋 커서로 다음 페이지 (순위는 이어서 매겨짐)
+        r = client.get(f'/user/ranking/genre?genre={genre}&metric=cpm&limit=1')
+        first_page = r.get_json()
+        assert [e['account']['user_id'] for e in first_page['data']] == [alice]
+        assert first_page['meta']['has_more'] is True
+        r = client.get(f"/user/ranking/genre?genre={genre}&metric=cpm&limit=1&cursor={first_page['meta']['next_cursor']}")
+        second_page = r.get_json()
+        assert [(e['rank'], e['account']['user_id']) for e in second_page['data']] == [(2, bob)]
+        assert second_page['meta']['has_more'] is False
+        assert client.get(f'/user/ranking/genre?genre={genre}&cursor=bad').status_code == 400
+        assert board('accuracy')[0] == [(alice, 99.5), (bob, 97.0)]
+        overall = dict(board('cpm', genre_param='')[0])
+        assert overall[alice] >= 700 and overall[bob] >= 650
+
+        # 2. 최고 기록을 삭제하면 해당 장르의 남은 기록으로 복구
+        assert client.delete(f'/text/results/{text_a}/{alice}/{alice_best}').status_code == 200
+        assert board('cpm')[0] == [(bob, 650), (alice, 400)]
+
+        # 3. 글을 삭제하면 그 글의 기록을 뺀 최고 기록으로 다시 계산
+        assert client.delete(f'/text/{text_b}').status_code == 200
+        assert board('cpm')[0] == [(bob, 650)]
+        assert GenreBest.query.filter_by(genre=genre, user_id=alice).first() is None
+
+        assert client.get('/user/ranking/genre?metric=speed').status_code == 400
+
+        for user_id in (alice, bob):
+            db.session.delete(db.session.get(User, user_id))
+        db.session.delete(db.session.get(TypingText, text_a))
+        db.session.commit()
+
+    def test_TC316_랭킹_공식_섀도_비교_및_일괄_재계산_확인(self, client, runner, monkeypatch):
+        """후보 공식을 섀도 모드로 비교(쓰기 없음)한 뒤 적용하면 전체 점수와 리더보드가 새 공식으로 바뀌는지 검증"""
+        import random
+        import numpy as np
+        from app import scoring
+        from app.models import TypingText
+        from app.routes.reports import views as report_views
+        from sqlalchemy import update
+
+        # 정확도 비중이 훨씬 큰 후보 공식
+        candidate = scoring.RankingFormula(3, best_cpm=0.1, avg_accuracy=50.0, avg_cpm=0.1, max_combo=0.0)
+        monkeypatch.setitem(scoring.RANKING_FORMULAS, 3, candidate)
+
+        # 1. 벡터 계산은 단건 계산과 정확히 같아야 함
+        rows = [(random.randint(0, 900), round(random.uniform(0, 100), 2), round(random.uniform(0, 700), 2),
+                 random.randint(0, 500), random.randint(0, 2000)) for _ in range(500)]
+        columns = [np.array(c, dtype=np.float64) for c in zip(*rows)]
+        columns[4] = columns[4].astype(np.int64)
+        for formula in (scoring.get_formula(1), scoring.get_formula(2), candidate):
+            assert formula.score_array(*columns).tolist() == [formula.score(*row) for row in rows]
+
+        base = 10 ** 4
+        fast = User(username=f"fast_{random_string(6, 10)}", email=f"fast_{random_string(6, 10)}@test.com",
+                    best_cpm=base, avg_cpm=base, avg_accuracy=50.0, max_combo=0, play_count=1)
+        exact = User(username=f"exact_{random_string(6, 10)}", email=f"exact_{random_string(6, 10)}@test.com",
+                     best_cpm=base - 500, avg_cpm=base - 500, avg_accuracy=100.0, max_combo=0, play_count=1)
+        for user in (fast, exact):
+            user.update_ranking_score()
+        db.session.add_all([fast, exact])
+        db.session.commit()
+        fast_id, exact_id = fast.id, exact.id
+
+        def my_rank(user_id):
+            return client.get(f'/user/ranking/me/{user_id}').get_json()['data']['rank']
+
+        assert my_rank(fast_id) < my_rank(exact_id)
+        before = {u.id: u.ranking_score for u in User.query.all()}
+
+        try:
+            # 2. 섀도 비교: 순위 변동만 보고하고 점수는 그대로
+            monkeypatch.setattr(report_views, 'INTERNAL_SYNC_KEY', 'test-internal-key')
+            headers = {'X-INTERNAL-KEY': 'test-internal-key'}
+            r = client.post('/admin/ranking/formula/shadow', json={"version": 3, "top_n": 10}, headers=headers)
+            report = r.get_json()['data']
+            assert (report['live_version'], report['candidate_version']) == (1, 3)
+            assert report['users'] == len(before) and report['changed_ranks'] > 0
+            assert 0 <= report['top_n_overlap'] <= 1 and -1 <= report['spearman'] <= 1
+            assert {u.id: u.ranking_score for u in User.query.all()} == before
+            assert client.post('/admin/ranking/formula/shadow', json={"version": 99}, headers=headers).status_code == 400
+            r = client.post('/admin/ranking/formula/shadow', json={"version": 3, "top_n": "many"}, headers=headers)
+            assert r.status_code == 400
+
+            # 관리용 API는 내부 키가 없으면 401, 틀리면 403 (점수는 그대로)
+            assert client.post('/admin/ranking/formula/shadow', json={"version": 3}).status_code == 401
+            r = client.post('/admin/ranking/formula/apply', json={"version": 3}, headers={'X-INTERNAL-KEY': 'wrong'})
+            assert r.status_code == 403
+            assert client.get('/admin/ranking/formula').get_json()['data']['active_version'] == 1
+
+            # 3. 적용: 이전 버전으로 계산된 행만 재계산 + 리더보드 반영, 이후 저장도 새 공식 사용
+            #    첫 회차 직후 이전 버전을 읽은 저장이 커밋되어도 행에 남은 버전으로 다음 회차에서 바로잡힘
+            recompute, stale_saves = scoring._recompute_user_scores, []
+
+            def recompute_then_stale_save(formula, chunk_size):
+                counts = recompute(formula, chunk_size)
+                if not stale_saves:
+                    stale_saves.append(fast_id)
+                    db.session.execute(update(User).where(User.id == fast_id).values(
+                        play_count=User.play_count + 1, formula_version=1,
+                        ranking_score=scoring.get_formula(1).score(base, 50.0, base, 0, 2)))
+                    db.session.commit()
+                return counts
+
+            monkeypatch.setattr(scoring, '_recompute_user_scores', recompute_then_stale_save)
+            result = runner.invoke(args=['ranking-formula', 'apply', '3'])
+            assert result.exit_code == 0, result.output
+            assert client.get('/admin/ranking/formula').get_json()['data']['active_version'] == 3
+            for user in User.query.all():
+                assert user.formula_version == 3
+                assert user.ranking_score == candidate.score(
+                    user.best_cpm, user.avg_accuracy, user.avg_cpm, user.max_combo, user.play_count)
+            assert my_rank(exact_id) < my_rank(fast_id)
+
+            # 다시 적용해도 이미 새 버전인 행은 읽지 않음
+            summary = scoring.apply_ranking_formula(3)
+            assert (summary['scanned_users'], summary['updated_users']) == (0, 0)
+
+            # 공식 변경 직후의 저장도 (워커 캐시와 무관하게) UPDATE 안에서 새 버전으로 계산
+            text = TypingText(genre="IT", title="공식 변경", content="공식 변경 테스트 본문")
+            db.session.add(text)
+            db.session.commit()
+            r = client.post('/text/results', json={"user_id": exact_id, "text_id": text.id, "cpm": 600,
+                                                   "wpm": 120, "accuracy": 90.0, "combo": 5})
+            assert r.status_code == 201
+            user = db.session.get(User, exact_id)
+            assert user.formula_version == 3
+            assert user.ranking_score == candidate.score(
+                user.best_cpm, user.avg_accuracy, user.avg_cpm, user.max_combo, user.play_count)
+        finally:
+            summary = scoring.apply_ranking_formula(1)
+            assert summary['previous_version'] in (1, 3)
+
+        assert db.session.get(User, fast_id).ranking_score == before[fast_id]
+        for user_id in (fast_id, exact_id):
+            db.session.delete(db.session.get(User, user_id))
+        db.session.delete(text)
+        db.session.commit()
+
+    def test_TC317_현재_폼_지수이동평균_및_감쇠_랭킹_확인(self, client):
+        """현재 폼이 판마다 O(1) 지수이동평균으로 갱신되고, 조회 시점 감쇠가 랭킹 순서에 반영되는지 검증"""
+        from datetime import datetime, timedelta
+        from app.models import TypingText, KST, FORM_ALPHA, FORM_HALF_LIFE_DAYS, calculate_form_key
+
+        users = []
+        for _ in range(3):
+            name = f"form_{random_string(6, 10)}"
+            users.append(User(username=name, email=f"{name}@test.com"))
+        text = TypingText(genre="IT", title="폼 랭킹", content="폼 랭킹 테스트 본문")
+        db.session.add_all(users + [text])
+        db.session.commit()
+        single, batched, resting = [u.id for u in users]
+
+        def post(user_id, cpm, accuracy):
+            body = {"user_id": user_id, "text_id": text.id, "cpm": cpm, "wpm": cpm // 5,
+                    "accuracy": accuracy, "combo": 10}
+            assert client.post('/text/results', json=body).status_code == 201
+
+        # 1. 첫 판은 그 값에서 시작하고, 이후 판은 가중치 FORM_ALPHA로 반영
+        post(single, 400, 90.0)
+        post(single, 600, 100.0)
+        expected_cpm = 400 * (1 - FORM_ALPHA) + 600 * FORM_ALPHA
+        expected_accuracy = 90.0 * (1 - FORM_ALPHA) + 100.0 * FORM_ALPHA
+        user = db.session.get(User, single)
+        assert user.form_cpm == pytest.approx(expected_cpm)
+        assert user.form_accuracy == pytest.approx(expected_accuracy)
+        assert user.current_form() == pytest.approx(expected_cpm * expected_accuracy / 100, rel=1e-3)
+        # 폼 정렬 키는 저장 UPDATE 안에서 SQL로 계산되어도 파이썬 정의와 같음
+        assert user.form_key == pytest.approx(
+            calculate_form_key(user.form_cpm, user.form_accuracy, user.form_played_at), abs=1e-6)
+
+        # 2. 묶음 저장도 순서대로 한 판씩 저장한 것과 같은 값
+        r = client.post('/text/results/batch', json={"results": [
+            {"user_id": batched, "text_id": text.id, "cpm": 400, "wpm": 80, "accuracy": 90.0, "combo": 10},
+            {"user_id": batched, "text_id": text.id, "cpm": 600, "wpm": 120, "accuracy": 100.0, "combo": 10},
+        ]})
+        assert r.status_code in (200, 201)
+        user = db.session.get(User, batched)
+        assert user.form_cpm == pytest.approx(expected_cpm)
+        assert user.form_accuracy == pytest.approx(expected_accuracy)
+        assert user.form_key == pytest.approx(
+            calculate_form_key(user.form_cpm, user.form_accuracy, user.form_played_at), abs=1e-6)
+
+        # 3. 더 잘 쳤어도 반감기만큼 쉬었으면 폼이 절반으로 줄어 순위가 밀림
+        post(resting, 800, 100.0)
+        user = db.session.get(User, resting)
+        user.form_played_at = datetime.now(KST) - timedelta(days=FORM_HALF_LIFE_DAYS)
+        user.update_form_key()
+        db.session.commit()
+        assert user.current_form() == pytest.approx(400.0, rel=1e-3)
+
+        r = client.get('/user/ranking/form?limit=100')
+        assert r.status_code == 200
+        body = r.get_json()
+        assert body['meta']['half_life_days'] == FORM_HALF_LIFE_DAYS
+        values = [e['value'] for e in body['data']]
+        assert values == sorted(values, reverse=True)
+        mine = [e['account']['user_id'] for e in body['data'] if e['account']['user_id'] in (single, batched, resting)]
+        assert set(mine[:2]) == {single, batched} and mine[2] == resting
+
+        profile = client.get(f'/user/profile/{resting}').get_json()['data']
+        assert profile['stats']['current_form'] == pytest.approx(400.0, rel=1e-3)
+
+        # 키셋 커서로 한 명씩 넘겨도 빠짐/중복 없이 같은 순서, 순위는 이어서 매겨짐
+        walked, cursor = [], None
+        while True:
+            page = client.get('/user/ranking/form?limit=1' + (f'&cursor={cursor}' if cursor else '')).get_json()
+            walked += [(e['rank'], e['account']['user_id']) for e in page['data']]
+            cursor = page['meta']['next_cursor']
+            if not page['meta']['has_more']:
+                break
+        assert walked == [(e['rank'], e['account']['user_id']) for e in body['data']]
+        assert client.get('/user/ranking/form?cursor=bad').status_code == 400
+
+        # 4. 오래 쉰 뒤 한 판: 반감기 2번만큼 감쇠된 폼(800 -> 200)에 새 판을 섞음
+        user.form_played_at = datetime.now(KST) - timedelta(days=2 * FORM_HALF_LIFE_DAYS)
+        user.update_form_key()
+        db.session.commit()
+        post(resting, 800, 100.0)
+        user = db.session.get(User, resting)
+        assert user.form_cpm == pytest.approx(800 * 0.25 * (1 - FORM_ALPHA) + 800 * FORM_ALPHA, rel=1e-6)
+        assert user.form_accuracy == pytest.approx(100.0)
+        assert user.current_form() == pytest.approx(320.0, rel=1e-3)
+
+        for user_id in (single, batched, resting):
+            db.session.delete(db.session.get(User, user_id))
+        db.session.delete(db.session.get(TypingText, text.id))
+        db.session.commit()
+
+    def test_TC318_전체_유저_키셋_페이지네이션_및_필드_선택_확인(self, client):
+        """/user/users 가 정렬별 키셋 커서로 빠짐/중복 없이 넘기고, fields= 로 고른 값만 반환하는지 검증"""
+        users = []
+        for score in (300, 300, 100):
+            name = f"page_{random_string(6, 10)}"
+            users.append(User(username=name, email=f"{name}@test.com", ranking_score=score))
+        db.session.add_all(users)
+        db.session.commit()
+        expected_total = User.query.count()
+
+        def walk(query):
+            seen, cursor, pages = [], None, 0
+            while True:
+                url = f'/user/users?{query}&limit=2' + (f'&cursor={cursor}' if cursor else '')
+                r = client.get(url)
+                assert r.status_code == 200
+                body = r.get_json()
+                assert len(body['data']['users']) <= 2
+                seen.extend(body['data']['users'])
+                pages += 1
+                cursor = body['meta']['next_cursor']
+                if not body['meta']['has_more']:
+                    assert cursor is None
+                    return seen, pages
+
+        # 1. 점수 내림차순 (동점은 id 내림차순), 요청한 필드만 포함
+        seen, pages = walk('sort=ranking_score&fields=ranking_score,username')
+        assert pages >= 2
+        ids = [u['account']['user_id'] for u in seen]
+        assert len(ids) == len(set(ids)) == expected_total
+        keys = [(u['account']['ranking_score'], u['account']['user_id']) for u in seen]
+        assert keys == sorted(keys, reverse=True)
+        assert all(set(u['account']) == {'user_id', 'username', 'ranking_score'} and u['stats'] == {} for u in seen)
+
+        # 2. 이름순
+        seen, _ = walk('sort=username&fields=best_cpm')
+        names = [db.session.get(User, u['account']['user_id']).username for u in seen]
+        assert names == sorted(names) and len(names) == expected_total
+        assert all(set(u['stats']) == {'best_cpm'} for u in seen)
+
+        # 3. 잘못된 정렬 / 필드 / 커서
+        assert client.get('/user/users?sort=email').status_code == 400
+        assert client.get('/user/users?fields=password').status_code == 400
+        assert client.get('/user/users?sort=ranking_score&cursor=abc').status_code == 400
+
+        for user in users:
+            db.session.delete(user)
+        db.session.commit()
+
+    def test_TC319_히스토리_커서_페이지네이션_및_미리보기_확인(self, client):
+        """히스토리가 (created_at, id) 커서로 빠짐/중복 없이 넘어가고, 글 정보를 한 쿼리로 읽으며 미리보기만 보내는지 검증"""
+        from datetime import datetime
+        from sqlalchemy import event
+        from app.models import TypingText, TypingResult
+        from app.routes.user.views import HISTORY_PREVIEW_LENGTH
+
+        name = f"hist_{random_string(6, 10)}"
+        user = User(username=name, email=f"{name}@test.com")
+        texts = [TypingText(genre=genre, title=f"히스토리 {genre}", content="가" * (HISTORY_PREVIEW_LENGTH * 3))
+                 for genre in ("poem", "novel")]
+        db.session.add_all([user] + texts)
+        db.session.commit()
+
+        # 같은 시각의 기록이 섞여 있어도 id로 순서가 정해져야 함
+        same_time = datetime(2026, 10, 1, 12, 0, 0)
+        results = [TypingResult(user_id=user.id, text_id=texts[i % 2].id, cpm=300 + i, wpm=60, accuracy=95.0, combo=10,
+                                created_at=same_time if i < 4 else datetime(2026, 10, 2, 12, 0, i))
+                   for i in range(7)]
+        db.session.add_all(results)
+        db.session.commit()
+        expected = sorted(results, key=lambda r: (r.created_at, r.id), reverse=True)
+
+        def walk(path):
+            seen, cursor = [], None
+            while True:
+                r = client.get(path + ('&' if '?' in path else '?') + 'limit=2' + (f'&cursor={cursor}' if cursor else ''))
+                assert r.status_code == 200
+                body = r.get_json()
+                seen.extend(body['data'])
+                cursor = body['meta']['next_cursor']
+                if not body['meta']['has_more']:
+                    return seen
+
+        seen = walk(f'/user/history/all/{user.id}')
+        assert [h['result_id'] for h in seen] == [r.id for r in expected]
+        poem = walk(f'/user/history/genre/{user.id}?genre=poem')
+        assert [h['result_id'] for h in poem] == [r.id for r in expected if r.text_id == texts[0].id]
+
+        # 글 정보 + 미리보기를 한 번의 SELECT로 조회하고, 본문은 미리보기 길이만큼만 전송
+        statements = []
+        listener = lambda conn, cursor, statement, *args: statements.append(statement)
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            r = client.get(f'/user/history/recent/{user.id}?limit=5')
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+        recent = r.get_json()['data']
+        assert [h['result_id'] for h in recent] == [r.id for r in expected[:5]]
+        assert all(len(h['text_info']['content_preview']) == HISTORY_PREVIEW_LENGTH for h in recent)
+        assert sum(1 for s in statements if s.lstrip().upper().startswith('SELECT')) == 1
+
+        assert client.get(f'/user/history/all/{user.id}?cursor=abc').status_code == 400
+
+        db.session.delete(user)
+        for text in texts:
+            db.session.delete(text)
+        db.session.commit()
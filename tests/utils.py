@@ -52,3 +52,146 @@ def random_number(min_val, max_val):
     """
     # random.randint는 양 끝값을 모두 포함하여(inclusive) 랜덤 숫자를 생성합니다.
     return random.randint(min_val, max_val)
+
+
+class FakeRedis:
+    """
+    테스트용 인메모리 Redis 대역 (app.redis_client._redis_client 자리에 넣어 사용)
+    캐시 무효화/키 구성 검증에 필요한 명령만 흉내내며, TTL은 값만 기록하고 만료시키지 않습니다.
+    실제 클라이언트(decode_responses=False)처럼 값은 bytes로 저장/반환합니다.
+    """
+
+    def __init__(self):
+        self.store = {}
+        self.zsets = {}
+        self.ttls = {}
+        self.commands = []
+
+    def ping(self):
+        self.commands.append(('ping',))
+        return True
+
+    def get(self, key):
+        self.commands.append(('get', key))
+        return self.store.get(key)
+
+    def set(self, key, value, nx=False, ex=None):
+        self.commands.append(('set', key))
+        if nx and key in self.store:
+            return None
+        self.store[key] = value if isinstance(value, bytes) else str(value).encode()
+        if ex is not None:
+            self.ttls[key] = ex
+        return True
+
+    def setex(self, key, ttl, value):
+        return self.set(key, value, ex=ttl)
+
+    def delete(self, *keys):
+        self.commands.append(('delete',) + keys)
+        removed = 0
+        for key in keys:
+            removed += self.store.pop(key, None) is not None
+            removed += self.zsets.pop(key, None) is not None
+            self.ttls.pop(key, None)
+        return removed
+
+    def rename(self, src, dst):
+        self.commands.append(('rename', src, dst))
+        for container in (self.store, self.zsets):
+            if src in container:
+                container[dst] = container.pop(src)
+
+    # --- Sorted Set (점수 내림차순, 동점이면 member 역순: Redis ZREVRANGE와 동일) ---
+    @staticmethod
+    def _member(member):
+        return member if isinstance(member, bytes) else str(member).encode()
+
+    def _zrev(self, key):
+        return sorted(self.zsets.get(key, {}).items(), key=lambda item: (item[1], item[0]), reverse=True)
+
+    def zadd(self, key, mapping):
+        self.commands.append(('zadd', key))
+        zset = self.zsets.setdefault(key, {})
+        added = 0
+        for member, score in mapping.items():
+            member = self._member(member)
+            added += member not in zset
+            zset[member] = float(score)
+        return added
+
+    def zrem(self, key, *members):
+        self.commands.append(('zrem', key))
+        zset = self.zsets.get(key, {})
+        return sum(zset.pop(self._member(m), None) is not None for m in members)
+
+    def zcard(self, key):
+        self.commands.append(('zcard', key))
+        return len(self.zsets.get(key, {}))
+
+    def zscore(self, key, member):
+        self.commands.append(('zscore', key))
+        return self.zsets.get(key, {}).get(self._member(member))
+
+    def zrevrank(self, key, member):
+        self.commands.append(('zrevrank', key))
+        member = self._member(member)
+        for rank, (m, _) in enumerate(self._zrev(key)):
+            if m == member:
+                return rank
+        return None
+
+    def zrevrange(self, key, start, end, withscores=False):
+        self.commands.append(('zrevrange', key))
+        items = self._zrev(key)
+        end = len(items) - 1 if end == -1 else end
+        items = items[max(0, start):end + 1]
+        return items if withscores else [m for m, _ in items]
+
+    def incr(self, key):
+        self.commands.append(('incr', key))
+        value = int(self.store.get(key, 0)) + 1
+        self.store[key] = str(value).encode()
+        return value
+
+    def eval(self, script, numkeys, *args):
+        """app.redis_client의 Lua 스크립트(락 해제, 최댓값 갱신, 비교 후 교체)만 흉내냅니다."""
+        keys, argv = args[:numkeys], args[numkeys:]
+        if "'DEL'" in script:
+            if self.store.get(keys[0]) == str(argv[0]).encode():
+                return self.delete(keys[0])
+            return 0
+        if "ARGV[2]" in script:
+            if self.store.get(keys[0]) == str(argv[0]).encode():
+                self.store[keys[0]] = str(argv[1]).encode()
+                return 1
+            return 0
+        current = int(self.store.get(keys[0], -1))
+        if int(argv[0]) > current:
+            self.store[keys[0]] = str(argv[0]).encode()
+            return 1
+        return 0
+
+    def scan_iter(self, match=None):
+        raise AssertionError("키 스캔은 사용하지 않아야 합니다.")
+
+    def pipeline(self, transaction=True):
+        return _FakePipeline(self)
+
+
+class _FakePipeline:
+    def __init__(self, redis):
+        self._redis = redis
+        self._calls = []
+
+    def __getattr__(self, name):
+        def queue(*args, **kwargs):
+            self._calls.append((name, args, kwargs))
+            return self
+        return queue
+
+    def execute(self):
+        self._redis.commands.append(('pipeline', len(self._calls)))
+        results = [getattr(self._redis, name)(*args, **kwargs) for name, args, kwargs in self._calls]
+        self._calls = []
+        return results